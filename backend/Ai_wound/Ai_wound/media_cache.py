@@ -0,0 +1,198 @@
+"""
+Local caches in front of Cloudinary (used by CloudinaryMediaStorage).
+
+DiskLRUCache: size-bounded, read-through disk cache for remote media (used by _open).
+Cloudinary public_ids are never overwritten (unique_filename, overwrite=False), so a cached copy
+never goes stale and entries are only dropped to stay under the size limit (least recently used
+first) or when the file is deleted.
+The cache lives on the filesystem only: every gunicorn worker on the host shares the same
+directory, recency is the file's mtime (touched on every hit) and writes are atomic renames.
+
+MetadataCache: in-process, entry-bounded LRU of file sizes (recorded at upload, so size() and
+exists() need no Admin API call) and of signed delivery URLs, memoized per public_id for a TTL.
+"""
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRUCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "bytes_served_from_cache": 0, "bytes_fetched": 0}
+        # Running estimate of the directory size; re-measured whenever it crosses the limit
+        self._size_estimate = self._scan_size()
+
+    def path_for(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        """Path of the cached copy (marked as recently used), or None on a miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except OSError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        self._count("bytes_served_from_cache", size)
+        return path
+
+    def put(self, key, chunks):
+        """Writes an iterable of byte chunks into the cache atomically and returns the cached path."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.partial-')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._count("bytes_fetched", size)
+        with self._lock:
+            self._size_estimate += size
+            over_limit = self._size_estimate > self.max_bytes
+        if over_limit:
+            self.evict()
+        return path
+
+    def discard(self, key):
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.startswith('.partial-'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, filename))
+                except OSError:
+                    continue  # removed by another worker
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, filename)))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Removes least recently used files until the cache is at 90% of its limit."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._size_estimate = total
+            self._counters["evictions"] += evicted
+        if evicted:
+            logger.info(f"Media cache evicted {evicted} file(s), {total / (1024 * 1024):.1f} MB left")
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = self._size_estimate
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "directory": self.directory,
+        }
+
+
+class MetadataCache:
+    def __init__(self, max_entries=10000, url_ttl=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.url_ttl = url_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()  # name -> size in bytes (known to exist)
+        self._urls = OrderedDict()  # name -> (url, expires_at)
+        self._counters = {"size_hits": 0, "size_misses": 0, "url_hits": 0, "url_misses": 0}
+
+    def _remember(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+
+    def record_size(self, name, size):
+        with self._lock:
+            self._remember(self._sizes, name, size)
+
+    def size(self, name):
+        """Known size of an existing file, or None if it has to be looked up."""
+        with self._lock:
+            size = self._sizes.get(name)
+            if size is None:
+                self._counters["size_misses"] += 1
+                return None
+            self._sizes.move_to_end(name)
+            self._counters["size_hits"] += 1
+            return size
+
+    def url(self, name, build):
+        """Memoized build(name) for url_ttl seconds."""
+        now = self._clock()
+        with self._lock:
+            cached = self._urls.get(name)
+            if cached and cached[1] > now:
+                self._urls.move_to_end(name)
+                self._counters["url_hits"] += 1
+                return cached[0]
+            self._counters["url_misses"] += 1
+        url = build(name)
+        with self._lock:
+            self._remember(self._urls, name, (url, now + self.url_ttl))
+        return url
+
+    def forget(self, name):
+        with self._lock:
+            self._sizes.pop(name, None)
+            self._urls.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "sizes": len(self._sizes),
+                "urls": len(self._urls),
+                "max_entries": self.max_entries,
+                "url_ttl": self.url_ttl,
+            }
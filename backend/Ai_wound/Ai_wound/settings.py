@@ -50,6 +50,16 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
 }
 
+# Uploads at or above this size are sent in chunks (bounded memory per upload), see storage_backends.py
+CLOUDINARY_LARGE_UPLOAD_THRESHOLD = int(os.getenv('CLOUDINARY_LARGE_UPLOAD_THRESHOLD', str(20 * 1024 * 1024)))
+CLOUDINARY_UPLOAD_CHUNK_SIZE = int(os.getenv('CLOUDINARY_UPLOAD_CHUNK_SIZE', str(6 * 1024 * 1024)))  # min 5 MB
+# Read-through LRU disk cache for downloaded media, shared by the workers on a host (0 disables)
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR')  # default: <tmp>/mediwound_media_cache
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+# Per-process cache of file sizes (recorded at upload) and signed URLs, so listings make no API calls
+MEDIA_METADATA_CACHE_ENTRIES = int(os.getenv('MEDIA_METADATA_CACHE_ENTRIES', '10000'))
+MEDIA_URL_CACHE_TTL = int(os.getenv('MEDIA_URL_CACHE_TTL', '3600'))  # seconds
+
 # Explicitly configure Cloudinary SDK so credentials are active at upload time
 if all(CLOUDINARY_STORAGE.values()):
     import cloudinary
@@ -71,6 +81,21 @@ if all(CLOUDINARY_STORAGE.values()):
         },
     }
 
+# On-prem sites: content-addressed local storage instead of Cloudinary (see storage_backends.py)
+CAS_MEDIA_ROOT = os.getenv('CAS_MEDIA_ROOT', str(BASE_DIR / 'media_cas'))
+CAS_MEDIA_URL = os.getenv('CAS_MEDIA_URL', '/cas/')
+# Internal nginx location aliasing CAS_MEDIA_ROOT; when set, Django only sends X-Accel-Redirect
+CAS_X_ACCEL_REDIRECT_PREFIX = os.getenv('CAS_X_ACCEL_REDIRECT_PREFIX')
+if os.getenv('MEDIA_STORAGE') == 'local':
+    STORAGES = {
+        "default": {
+            "BACKEND": "Ai_wound.storage_backends.ContentAddressedStorage",
+        },
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        },
+    }
+
 # Cache Configuration (Reduces Supabase Reads)
 CACHES = {
     'default': {
@@ -119,6 +144,7 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = [
     'accept', 'accept-encoding', 'authorization',
     'content-type', 'origin', 'x-csrftoken', 'x-requested-with',
+    'idempotency-key',
 ]
 
 
@@ -293,6 +319,25 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 # Default to match Gmail credentials
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# ── Background assessment processing (addpatient/jobs.py) ─────────────
+# Run workers with: python manage.py process_assessment_jobs
+ASSESSMENT_JOB_MAX_ATTEMPTS = int(os.getenv('ASSESSMENT_JOB_MAX_ATTEMPTS', '3'))
+ASSESSMENT_JOB_RETRY_DELAY = int(os.getenv('ASSESSMENT_JOB_RETRY_DELAY', '30'))        # seconds, doubled per attempt
+ASSESSMENT_JOB_LEASE_SECONDS = int(os.getenv('ASSESSMENT_JOB_LEASE_SECONDS', '600'))   # re-queue jobs of dead workers
+ASSESSMENT_JOB_INLINE_IMAGE_MAX_BYTES = int(os.getenv('ASSESSMENT_JOB_INLINE_IMAGE_MAX_BYTES', str(2 * 1024 * 1024)))  # larger uploads are re-read from storage
+ASSESSMENT_UPLOAD_WORKERS = int(os.getenv('ASSESSMENT_UPLOAD_WORKERS', '4'))             # concurrent image uploads per submission
+
+# ── ML service client (addpatient/ml_client.py) ──────────────────────
+ML_SERVICE_URL = os.getenv('ML_SERVICE_URL', 'http://localhost:8001/api/predict')
+# Several replicas: comma-separated base URLs, routed by queue depth from their /health (overrides ML_SERVICE_URL)
+ML_SERVICE_URLS = [url.strip() for url in os.getenv('ML_SERVICE_URLS', '').split(',') if url.strip()]
+ML_HEALTH_INTERVAL = float(os.getenv('ML_HEALTH_INTERVAL', '5'))                  # seconds between /health polls, 0 = off
+ML_SERVICE_TIMEOUT = float(os.getenv('ML_SERVICE_TIMEOUT', '60'))                 # seconds per call (read)
+ML_SERVICE_RETRIES = int(os.getenv('ML_SERVICE_RETRIES', '2'))                    # extra attempts on 429/5xx/connection errors
+ML_SERVICE_POOL_SIZE = int(os.getenv('ML_SERVICE_POOL_SIZE', '10'))               # keep-alive connections per process
+ML_BREAKER_FAILURES = int(os.getenv('ML_BREAKER_FAILURES', '5'))                  # consecutive failures that eject a replica
+ML_BREAKER_RESET_SECONDS = float(os.getenv('ML_BREAKER_RESET_SECONDS', '30'))     # open time before a half-open probe
+
 # ── Cookie & Session Security ─────────────────────────────────────────
 SESSION_COOKIE_SAMESITE = 'Lax'
 CSRF_COOKIE_SAMESITE = 'Lax'
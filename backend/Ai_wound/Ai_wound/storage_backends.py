@@ -2,14 +2,124 @@
 Custom Cloudinary storage backend for Django 6.0+
 Replaces django-cloudinary-storage (incompatible with Django 6.0).
 Uses the official cloudinary SDK directly.
+
+ContentAddressedStorage is the local/on-prem alternative with the same API; pick either one
+through STORAGES["default"] (MEDIA_STORAGE=local in settings.py).
 """
 import os
-import io
+import re
+import hashlib
+import posixpath
+import tempfile
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import cloudinary.utils
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.files.base import File
 from django.core.files.storage import Storage
+from django.utils._os import safe_join
 from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+from .media_cache import DiskLRUCache, MetadataCache
+
+# Files at or above this size are uploaded in chunks (Cloudinary's chunked "large" upload),
+# so a worker holds at most one chunk of the file in memory at a time.
+LARGE_UPLOAD_THRESHOLD = 20 * 1024 * 1024
+# Cloudinary requires at least 5 MB per chunk (except the last one)
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Without the disk cache, downloads are spooled to a temporary file past this size
+SPOOL_MAX_MEMORY = 2 * 1024 * 1024
+
+_session = None
+_media_cache = None
+_metadata_cache = None
+_shared_lock = threading.Lock()
+
+
+def _http_session():
+    """Process-wide keep-alive session for downloads (connection reuse, retries on 5xx)."""
+    global _session
+    with _shared_lock:
+        if _session is None:
+            _session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retries)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def get_media_cache():
+    """The local disk cache for downloaded media, or None when MEDIA_CACHE_MAX_BYTES is 0."""
+    global _media_cache
+    with _shared_lock:
+        max_bytes = getattr(settings, 'MEDIA_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        if _media_cache is None and max_bytes > 0:
+            directory = getattr(settings, 'MEDIA_CACHE_DIR', None) or os.path.join(
+                tempfile.gettempdir(), 'mediwound_media_cache'
+            )
+            _media_cache = DiskLRUCache(directory, max_bytes)
+        return _media_cache
+
+
+def get_metadata_cache():
+    """Process-wide cache of file sizes and signed URLs, so listings make no Cloudinary API calls."""
+    global _metadata_cache
+    with _shared_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache(
+                max_entries=getattr(settings, 'MEDIA_METADATA_CACHE_ENTRIES', 10000),
+                url_ttl=getattr(settings, 'MEDIA_URL_CACHE_TTL', 3600),
+            )
+        return _metadata_cache
+
+
+def reset_media_cache():
+    """Forgets the process-wide cache objects (tests, settings changes); files stay on disk."""
+    global _media_cache, _metadata_cache
+    with _shared_lock:
+        _media_cache = None
+        _metadata_cache = None
+
+
+class _NonClosingStream:
+    """
+    Read-only view of the content being saved. The Cloudinary SDK closes the stream it is given,
+    but Storage.save() callers may still need the file (e.g. to hand its bytes to the ML job).
+    """
+
+    def __init__(self, file, name):
+        self._file = file
+        self.name = name
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
 
 
 @deconstructible
@@ -20,46 +130,77 @@ class CloudinaryMediaStorage(Storage):
     """
 
     def _upload(self, name, content):
-        """Upload file content to Cloudinary and return the result."""
+        """
+        Upload file content to Cloudinary and return the result. The content is streamed to the
+        SDK rather than read here first; large files go up in fixed-size chunks.
+        """
         # Determine folder from the upload_to path
         folder = os.path.dirname(name) if '/' in name else ''
-        
-        # Read the file content
-        if hasattr(content, 'read'):
-            file_data = content.read()
-        else:
-            file_data = content
 
         # Build upload options
         upload_options = {
             'use_filename': True,
             'unique_filename': True,
             'overwrite': False,
+            'filename': os.path.basename(name),
         }
         if folder:
             upload_options['folder'] = folder
 
+        stream = _NonClosingStream(content, os.path.basename(name))
+        size = getattr(content, 'size', None)
+        if size is None:
+            size = cloudinary.utils.file_io_size(stream)
+
+        threshold = getattr(settings, 'CLOUDINARY_LARGE_UPLOAD_THRESHOLD', LARGE_UPLOAD_THRESHOLD)
+        if size >= threshold:
+            # Chunked upload: one chunk in memory at a time, each sent with its Content-Range
+            chunk_size = getattr(settings, 'CLOUDINARY_UPLOAD_CHUNK_SIZE', UPLOAD_CHUNK_SIZE)
+            return cloudinary.uploader.upload_large(
+                stream, resource_type='auto', chunk_size=chunk_size, **upload_options
+            )
+
         # Upload to Cloudinary as a raw file (supports images, PDFs, etc.)
-        result = cloudinary.uploader.upload(
-            file_data,
-            resource_type='auto',
-            **upload_options
-        )
-        return result
+        return cloudinary.uploader.upload(stream, resource_type='auto', **upload_options)
 
     def _save(self, name, content):
         """Save a file and return the Cloudinary public_id as the name."""
         content.seek(0)
         result = self._upload(name, content)
+        # Remember the size so size()/exists() on this file need no Admin API call
+        size = result.get('bytes', getattr(content, 'size', None))
+        if size is not None:
+            get_metadata_cache().record_size(result['public_id'], size)
         # Return the public_id — this is what gets stored in the DB field
         return result['public_id']
 
     def _open(self, name, mode='rb'):
-        """Open a file — download from Cloudinary."""
-        url = self.url(name)
-        import urllib.request
-        response = urllib.request.urlopen(url)
-        return io.BytesIO(response.read())
+        """
+        Open a file: served from the local media cache, downloaded from Cloudinary (streamed
+        to disk) on a miss. Returns a file on disk rather than an in-memory copy.
+        """
+        cache = get_media_cache()
+        if cache is not None:
+            path = cache.get(name)
+            if path is None:
+                with self._download(name) as response:
+                    path = cache.put(name, response.iter_content(DOWNLOAD_CHUNK_SIZE))
+            try:
+                return File(open(path, 'rb'), name=name)
+            except FileNotFoundError:
+                pass  # evicted by another worker in the meantime; fetch it directly
+
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        with self._download(name) as response:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                spooled.write(chunk)
+        spooled.seek(0)
+        return File(spooled, name=name)
+
+    def _download(self, name):
+        response = _http_session().get(self.url(name), stream=True, timeout=(3.05, 60))
+        response.raise_for_status()
+        return response
 
     def url(self, name):
         """Return the full Cloudinary URL for the given resource name/public_id."""
@@ -68,13 +209,25 @@ class CloudinaryMediaStorage(Storage):
         # If it's already a full URL, return it
         if name.startswith('http://') or name.startswith('https://'):
             return name
-        # Generate the Cloudinary URL from the public_id — signed for authorization
+        # Generate the Cloudinary URL from the public_id — signed for authorization, memoized
+        # since serializers ask for it for every image in a list response
+        return get_metadata_cache().url(name, self._signed_url)
+
+    def _signed_url(self, name):
         return cloudinary.CloudinaryImage(name).build_url(secure=True, sign_url=True)
 
+    def _fetch_size(self, name):
+        """Size from the Admin API (raises cloudinary.api.NotFound); cached for next time."""
+        size = cloudinary.api.resource(name).get('bytes', 0)
+        get_metadata_cache().record_size(name, size)
+        return size
+
     def exists(self, name):
         """Check if a file exists in Cloudinary."""
+        if get_metadata_cache().size(name) is not None:
+            return True
         try:
-            cloudinary.api.resource(name)
+            self._fetch_size(name)
             return True
         except cloudinary.api.NotFound:
             return False
@@ -87,15 +240,145 @@ class CloudinaryMediaStorage(Storage):
             cloudinary.uploader.destroy(name, resource_type='auto')
         except Exception:
             pass
+        get_metadata_cache().forget(name)
+        cache = get_media_cache()
+        if cache is not None:
+            cache.discard(name)
 
     def size(self, name):
-        """Return the file size in bytes from Cloudinary metadata."""
+        """Return the file size in bytes (recorded at upload, else from Cloudinary metadata)."""
+        size = get_metadata_cache().size(name)
+        if size is not None:
+            return size
         try:
-            resource = cloudinary.api.resource(name)
-            return resource.get('bytes', 0)
+            return self._fetch_size(name)
         except Exception:
             return 0
 
     def get_available_name(self, name, max_length=None):
         """Cloudinary handles unique naming — return name as-is."""
         return name
+
+
+# <folder>/<ab>/<cd>/<sha256><ext>, as returned by ContentAddressedStorage._save
+CONTENT_ADDRESSED_NAME = re.compile(r'^(?:[\w-][\w.-]*/)*[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.[a-z0-9]{1,4})?$')
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    """
+    Local/on-prem storage with the same API as CloudinaryMediaStorage.
+    Files are stored under their SHA-256 in a sharded layout (<folder>/<ab>/<cd>/<sha256><ext>),
+    so an identical upload to the same folder is stored once. A file is streamed into a temp file
+    (hashing as it goes) and moved into place, so readers never see a partial file, and it is
+    never modified afterwards. Each file keeps a reference count: delete() removes it only when
+    the last name saved for it is deleted. Served by Ai_wound.views.content_addressed_media
+    (FileResponse / sendfile, or X-Accel-Redirect behind nginx).
+    """
+
+    def __init__(self, location=None, base_url=None):
+        self._location = location
+        self._base_url = base_url
+
+    @property
+    def location(self):
+        return os.path.abspath(self._location or getattr(settings, 'CAS_MEDIA_ROOT', None)
+                               or os.path.join(settings.MEDIA_ROOT, 'cas'))
+
+    @property
+    def base_url(self):
+        return self._base_url or getattr(settings, 'CAS_MEDIA_URL', '/cas/')
+
+    def path(self, name):
+        return safe_join(self.location, name)
+
+    def _save(self, name, content):
+        """Store the content under its hash and return that name (what gets stored in the DB field)."""
+        folder = posixpath.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,4}', ext):
+            ext = ''  # keeps names within the 100-character FileField default
+
+        tmp_dir = os.path.join(self.location, '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as tmp:
+                content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+
+            hexdigest = digest.hexdigest()
+            stored_name = posixpath.join(folder, hexdigest[:2], hexdigest[2:4], hexdigest + ext)
+            path = self.path(stored_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._references(path) as refs:
+                if not os.path.exists(path):
+                    os.replace(tmp_path, path)
+                refs.count += 1
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)  # duplicate of a stored file, or failed write
+        return stored_name
+
+    @contextmanager
+    def _references(self, path):
+        """Exclusive lock on the file's reference count (<path>.refs), yielded as refs.count."""
+        import fcntl  # POSIX only, like the on-prem hosts this backend is meant for
+        refs_path = path + '.refs'
+        while True:
+            fd = os.open(refs_path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_nlink:
+                break
+            os.close(fd)  # removed by the delete() we waited for; lock the new one
+        try:
+            refs = SimpleNamespace(count=int(os.read(fd, 32) or 0))
+            yield refs
+            if refs.count > 0:
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, str(refs.count).encode())
+            else:
+                os.remove(refs_path)
+        finally:
+            os.close(fd)
+
+    def _open(self, name, mode='rb'):
+        """Open a stored file (read-only: stored files never change)."""
+        return File(open(self.path(name), 'rb'), name=name)
+
+    def url(self, name):
+        if not name:
+            return ''
+        if name.startswith('http://') or name.startswith('https://'):
+            return name
+        return self.base_url + filepath_to_uri(name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def delete(self, name):
+        """Drop one reference; the file itself goes with the last one."""
+        path = self.path(name)
+        if not os.path.isdir(os.path.dirname(path)):
+            return
+        with self._references(path) as refs:
+            refs.count -= 1
+            if refs.count <= 0:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def get_available_name(self, name, max_length=None):
+        """Names are content hashes — return name as-is."""
+        return name
@@ -0,0 +1,479 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cloudinary
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from io import StringIO
+from unittest import mock
+
+from Ai_wound.media_cache import MetadataCache
+from Ai_wound.storage_backends import (
+    CloudinaryMediaStorage, ContentAddressedStorage, get_media_cache, get_metadata_cache, reset_media_cache,
+)
+from addpatient.models import Patient, Assessment, AssessmentImage
+from admin_page.models import Admin
+
+
+class StubCloudinaryUpload:
+    """
+    Local stand-in for Cloudinary's upload API. Accepts single and chunked (Content-Range) uploads,
+    reassembles the chunks and records every request.
+    """
+
+    def __init__(self):
+        self.requests = []  # (path, content_range, chunk length)
+        self.stored = {}  # public_id -> bytes
+        self._partial = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                message = BytesParser(policy=policy.HTTP).parsebytes(
+                    b"Content-Type: " + self.headers['Content-Type'].encode() + b"\r\n\r\n" + body
+                )
+                fields = {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+                data = fields['file'].get_payload(decode=True)
+                folder = fields['folder'].get_content().strip() if 'folder' in fields else ''
+                public_id = f"{folder}/{os.path.splitext(fields['file'].get_filename())[0]}_x1"
+                content_range = self.headers.get('Content-Range')
+                stub.requests.append((self.path, content_range, len(data)))
+
+                if content_range:
+                    start, end, total = map(int, re.match(r'bytes (\d+)-(\d+)/(\d+)', content_range).groups())
+                    buffer = stub._partial.setdefault(self.headers['X-Unique-Upload-Id'], bytearray())
+                    assert start == len(buffer), "chunks out of order"
+                    buffer.extend(data)
+                    if end + 1 < total:
+                        return self.reply({"done": False, "public_id": public_id})
+                    data = bytes(stub._partial.pop(self.headers['X-Unique-Upload-Id']))
+                stub.stored[public_id] = data
+                self.reply({"public_id": public_id, "bytes": len(data), "resource_type": "raw"})
+
+            def reply(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def configure_cloudinary(testcase, **options):
+    """Applies cloudinary.config(**options) for the duration of the test."""
+    config = cloudinary.config()
+    saved = {key: getattr(config, key, None) for key in options}
+    cloudinary.config(**options)
+    testcase.addCleanup(lambda: cloudinary.config(**saved))
+
+
+class ReadSpy(File):
+    """File that records the size of every read() call."""
+
+    def __init__(self, data, name):
+        super().__init__(ContentFile(data), name=name)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+@override_settings(CLOUDINARY_LARGE_UPLOAD_THRESHOLD=1024 * 1024, CLOUDINARY_UPLOAD_CHUNK_SIZE=256 * 1024)
+class CloudinaryUploadTests(SimpleTestCase):
+    def setUp(self):
+        self.service = StubCloudinaryUpload()
+        self.addCleanup(self.service.close)
+        configure_cloudinary(self, upload_prefix=self.service.url, cloud_name='demo', api_key='key', api_secret='secret')
+        self.storage = CloudinaryMediaStorage()
+
+    def test_large_file_is_streamed_in_chunks(self):
+        payload = os.urandom(1024 * 1024 + 1000)
+        content = ReadSpy(payload, 'report.pdf')
+        name = self.storage.save('wound_images/full/report.pdf', content)
+
+        self.assertEqual(self.service.stored[name], payload)
+        chunks = [r for r in self.service.requests if r[1]]
+        self.assertEqual(len(chunks), 5)  # 4 full chunks + remainder
+        self.assertTrue(all(path == '/v1_1/demo/auto/upload' for path, _, _ in chunks))
+        # Bounded memory: never more than one chunk read at once, never the whole file
+        self.assertNotIn(-1, content.reads)
+        self.assertLessEqual(max(content.reads), 256 * 1024)
+        # The caller's file stays usable after the SDK is done with the stream
+        self.assertFalse(content.closed)
+        content.seek(0)
+        self.assertEqual(len(content.read()), len(payload))
+
+    def test_small_file_is_uploaded_in_one_request(self):
+        payload = os.urandom(50 * 1024)
+        name = self.storage.save('wound_images/full/wound.jpg', ContentFile(payload, name='wound.jpg'))
+        self.assertEqual(self.service.stored[name], payload)
+        self.assertEqual(len(self.service.requests), 1)
+        self.assertIsNone(self.service.requests[0][1])
+        self.assertTrue(name.startswith('wound_images/full/wound'))
+
+
+class StubMediaCDN:
+    """Local stand-in for Cloudinary delivery URLs: serves `files` by path, counts downloads and connections."""
+
+    def __init__(self):
+        self.files = {}
+        self.downloads = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_GET(self):
+                name = self.path.lstrip('/')
+                stub.connections.add(self.client_address)
+                if name not in stub.files:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                stub.downloads.append(name)
+                body = stub.files[name]
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CloudinaryCachedReadTests(SimpleTestCase):
+    def setUp(self):
+        self.cdn = StubMediaCDN()
+        self.addCleanup(self.cdn.close)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.settings_override = override_settings(MEDIA_CACHE_DIR=cache_dir.name, MEDIA_CACHE_MAX_BYTES=1000 * 1024)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        reset_media_cache()
+        self.addCleanup(reset_media_cache)
+        url = mock.patch.object(CloudinaryMediaStorage, 'url', lambda storage, name: f"{self.cdn.url}/{name}")
+        url.start()
+        self.addCleanup(url.stop)
+        self.storage = CloudinaryMediaStorage()
+
+    def read(self, name):
+        with self.storage.open(name) as f:
+            return f.read()
+
+    def test_second_open_is_served_from_disk(self):
+        self.cdn.files['wound_images/full/a'] = payload = os.urandom(300 * 1024)
+        self.assertEqual(self.read('wound_images/full/a'), payload)
+        self.assertEqual(self.read('wound_images/full/a'), payload)
+        self.assertEqual(self.cdn.downloads, ['wound_images/full/a'])
+
+        stats = get_media_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['bytes_fetched'], len(payload))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_returns_file_on_disk_not_memory_copy(self):
+        self.cdn.files['b'] = os.urandom(1024)
+        f = self.storage.open('b')
+        self.addCleanup(f.close)
+        self.assertTrue(f.file.name.startswith(get_media_cache().directory))
+
+    @override_settings(MEDIA_CACHE_MAX_BYTES=800 * 1024)
+    def test_least_recently_used_files_are_evicted(self):
+        reset_media_cache()
+        for name in ('a', 'b', 'c'):
+            self.cdn.files[name] = os.urandom(300 * 1024)
+        self.read('a')
+        self.read('b')
+        cache = get_media_cache()
+        os.utime(cache.path_for('a'), (1, 1))
+        os.utime(cache.path_for('b'), (2, 2))
+        self.read('a')  # hit: now most recent
+        self.read('c')  # 900 KB > 800 KB limit: evict LRU ('b') down to 720 KB
+        self.assertTrue(os.path.exists(cache.path_for('a')))
+        self.assertFalse(os.path.exists(cache.path_for('b')))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        self.read('b')
+        self.assertEqual(self.cdn.downloads.count('b'), 2)
+
+    def test_downloads_reuse_pooled_connection(self):
+        for name in ('a', 'b', 'c'):
+            self.cdn.files[name] = b'x' * 10
+            self.read(name)
+        self.assertEqual(len(self.cdn.connections), 1)
+
+    def test_missing_file_raises_and_caches_nothing(self):
+        with self.assertRaises(Exception):
+            self.storage.open('missing')
+        self.assertFalse(os.path.exists(get_media_cache().path_for('missing')))
+
+    @override_settings(MEDIA_CACHE_MAX_BYTES=0)
+    def test_cache_can_be_disabled(self):
+        reset_media_cache()
+        self.cdn.files['a'] = b'abc'
+        self.assertEqual(self.read('a'), b'abc')
+        self.assertEqual(self.read('a'), b'abc')
+        self.assertEqual(len(self.cdn.downloads), 2)
+        self.assertIsNone(get_media_cache())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CloudinaryMetadataTests(SimpleTestCase):
+    def setUp(self):
+        self.service = StubCloudinaryUpload()
+        self.addCleanup(self.service.close)
+        configure_cloudinary(self, upload_prefix=self.service.url, cloud_name='demo', api_key='key', api_secret='secret')
+        reset_media_cache()
+        self.addCleanup(reset_media_cache)
+        resource = mock.patch('cloudinary.api.resource', side_effect=cloudinary.api.NotFound("missing"))
+        self.resource = resource.start()
+        self.addCleanup(resource.stop)
+        self.storage = CloudinaryMediaStorage()
+
+    def test_size_and_exists_of_uploaded_file_need_no_api_call(self):
+        name = self.storage.save('wound_images/full/wound.jpg', ContentFile(b'x' * 1234, name='wound.jpg'))
+        self.assertEqual(self.storage.size(name), 1234)
+        self.assertTrue(self.storage.exists(name))
+        self.resource.assert_not_called()
+
+    def test_unknown_file_is_looked_up_once(self):
+        self.resource.side_effect = None
+        self.resource.return_value = {'public_id': 'old/file', 'bytes': 99}
+        self.assertEqual(self.storage.size('old/file'), 99)
+        self.assertTrue(self.storage.exists('old/file'))
+        self.assertEqual(self.resource.call_count, 1)
+
+    def test_missing_file_is_not_cached_as_missing(self):
+        self.assertFalse(self.storage.exists('late/file'))
+        self.resource.side_effect = None
+        self.resource.return_value = {'bytes': 5}
+        self.assertTrue(self.storage.exists('late/file'))
+
+    def test_delete_forgets_metadata(self):
+        name = self.storage.save('wound_images/full/wound.jpg', ContentFile(b'abc', name='wound.jpg'))
+        self.storage.url(name)
+        with mock.patch('cloudinary.uploader.destroy'):
+            self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(get_metadata_cache().stats()['urls'], 0)
+
+    def test_signed_url_is_memoized(self):
+        with mock.patch.object(CloudinaryMediaStorage, '_signed_url', wraps=self.storage._signed_url) as signed:
+            first = self.storage.url('wound_images/full/a')
+            self.assertEqual(self.storage.url('wound_images/full/a'), first)
+        self.assertEqual(signed.call_count, 1)
+        self.assertIn('/s--', first)
+
+
+class MetadataCacheTests(SimpleTestCase):
+    def test_urls_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = MetadataCache(url_ttl=60, clock=clock)
+        builds = []
+        build = lambda name: builds.append(name) or f"https://cdn/{name}/{len(builds)}"
+        self.assertEqual(cache.url('a', build), "https://cdn/a/1")
+        clock.now = 59
+        self.assertEqual(cache.url('a', build), "https://cdn/a/1")
+        clock.now = 60
+        self.assertEqual(cache.url('a', build), "https://cdn/a/2")
+
+    def test_is_bounded_least_recently_used_first(self):
+        cache = MetadataCache(max_entries=2)
+        cache.record_size('a', 1)
+        cache.record_size('b', 2)
+        cache.size('a')
+        cache.record_size('c', 3)
+        self.assertIsNone(cache.size('b'))
+        self.assertEqual((cache.size('a'), cache.size('c')), (1, 3))
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "Ai_wound.storage_backends.CloudinaryMediaStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class AssessmentListingStorageTests(APITestCase):
+    def setUp(self):
+        configure_cloudinary(self, cloud_name='demo', api_key='key', api_secret='secret')
+        reset_media_cache()
+        self.addCleanup(reset_media_cache)
+        self.doctor = Admin.objects.create_user(
+            email='listdoc@example.com', password='password123', role_type='doctor'
+        )
+        patient = Patient.objects.create(
+            first_name="List", last_name="Patient", date_of_birth="1980-01-01", gender="Male",
+            admission_date="2023-10-01", ward_department="Surgery",
+            room_bed_number="17", assigning_physician="Dr. Who",
+            primary_diagnosis="Burn"
+        )
+        assessments = Assessment.objects.bulk_create(
+            [Assessment(patient=patient, assessed_by=self.doctor, wound_type="Burns") for _ in range(100)]
+        )
+        AssessmentImage.objects.bulk_create([
+            AssessmentImage(assessment=assessment, full_image=f"wound_images/full/img_{assessment.id}")
+            for assessment in assessments
+        ])
+        self.client.force_authenticate(user=self.doctor)
+
+    def test_listing_makes_no_cloudinary_api_calls(self):
+        with mock.patch('cloudinary.api.resource') as resource, \
+                mock.patch('cloudinary.uploader.upload') as upload, \
+                mock.patch.object(CloudinaryMediaStorage, '_signed_url', autospec=True,
+                                  side_effect=lambda storage, name: f"https://res.cloudinary.com/demo/{name}") as signed:
+            for _ in range(2):
+                response = self.client.get(reverse('assessments-list'))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 100)
+        self.assertTrue(response.data[0]['images'][0]['full_image'].startswith("https://res.cloudinary.com/demo/"))
+        resource.assert_not_called()
+        upload.assert_not_called()
+        self.assertEqual(signed.call_count, 100)  # each URL signed once, then served from the cache
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def save(self, data, name='wound_images/full/Wound.JPG'):
+        return self.storage.save(name, ContentFile(data, name=os.path.basename(name)))
+
+    def test_stores_file_under_its_hash(self):
+        name = self.save(b'wound pixels')
+        digest = hashlib.sha256(b'wound pixels').hexdigest()
+        self.assertEqual(name, f"wound_images/full/{digest[:2]}/{digest[2:4]}/{digest}.jpg")
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'wound pixels')
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 12)
+        self.assertEqual(self.storage.url(name), f"/cas/{name}")
+        self.assertEqual(os.listdir(os.path.join(self.root, '.tmp')), [])
+
+    def test_identical_uploads_are_stored_once_and_reference_counted(self):
+        first, second = self.save(b'same'), self.save(b'same')
+        self.assertEqual(first, second)
+        self.assertNotEqual(self.save(b'other'), first)
+
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))  # still referenced by the second upload
+        self.storage.delete(second)
+        self.assertFalse(self.storage.exists(first))
+        self.assertFalse(os.path.exists(self.storage.path(first) + '.refs'))
+        self.storage.delete(first)  # already gone: no error
+
+    def test_concurrent_identical_uploads(self):
+        names = []
+        threads = [threading.Thread(target=lambda: names.append(self.save(b'x' * 100000))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(names)), 1)
+        with open(self.storage.path(names[0]) + '.refs') as refs:
+            self.assertEqual(refs.read(), '8')
+        self.assertEqual(self.storage.size(names[0]), 100000)
+
+    def test_unusual_extension_is_dropped(self):
+        name = self.save(b'abc', name='system_files/notes.markdown')
+        self.assertRegex(name, r'^system_files/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}$')
+
+    @override_settings(STORAGES={
+        "default": {"BACKEND": "Ai_wound.storage_backends.ContentAddressedStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_swappable_through_storages(self):
+        with override_settings(CAS_MEDIA_ROOT=self.root):
+            name = default_storage.save('assessment_reports/report.pdf', ContentFile(b'%PDF'))
+            self.assertIsInstance(default_storage._wrapped, ContentAddressedStorage)
+            self.assertTrue(self.storage.exists(name))
+
+
+class ContentAddressedMediaViewTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(CAS_MEDIA_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.name = ContentAddressedStorage().save('wound_images/full/w.png', ContentFile(b'png bytes'))
+        self.url = reverse('content-addressed-media', args=[self.name])
+
+    def test_serves_file_with_immutable_caching(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'png bytes')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    @override_settings(CAS_X_ACCEL_REDIRECT_PREFIX='/protected-cas/')
+    def test_hands_file_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-cas/{self.name}")
+        self.assertEqual(response.content, b'')
+
+    def test_only_stored_names_are_served(self):
+        self.assertEqual(self.client.get(self.url + '.refs').status_code, 404)
+        self.assertEqual(self.client.get(reverse('content-addressed-media', args=['.tmp/x'])).status_code, 404)
+        missing = self.name.replace(self.name[-68:-4], 'f' * 64)
+        self.assertEqual(self.client.get(reverse('content-addressed-media', args=[missing])).status_code, 404)
+
+
+class StorageBenchmarkCommandTests(SimpleTestCase):
+    def test_reports_both_backends(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            output = os.path.join(scratch, 'report.json')
+            call_command('benchmark_storage', files=6, size_kb=16, duplicates=0.5, concurrency=2,
+                         output=output, stdout=StringIO())
+            with open(output) as f:
+                report = json.load(f)
+        cas, cloud = report['backends']['content_addressed'], report['backends']['cloudinary_stand_in']
+        self.assertEqual(cas['upload']['ops'], 6)
+        self.assertLess(cas['distinct_files'], cloud['distinct_files'])  # deduplicated
+        self.assertEqual(cloud['read_cold']['ops'], 6)
@@ -19,9 +19,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import content_addressed_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('patient/', include('addpatient.urls')),
     path('admin_page/', include('admin_page.urls')),
     path('nurse_page/', include('nurse_page.urls')),
+    # Files from ContentAddressedStorage (on-prem media storage)
+    path(settings.CAS_MEDIA_URL.lstrip('/') + '<path:name>', content_addressed_media, name='content-addressed-media'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
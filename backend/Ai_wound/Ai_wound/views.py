@@ -0,0 +1,37 @@
+import mimetypes
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+
+from .storage_backends import CONTENT_ADDRESSED_NAME, ContentAddressedStorage
+
+
+@require_safe
+def content_addressed_media(request, name):
+    """
+    Serves a file stored by ContentAddressedStorage. The names are unguessable content hashes
+    (like Cloudinary's signed URLs) and the files never change, so responses are cached forever
+    and revalidated by hash. Behind nginx, set CAS_X_ACCEL_REDIRECT_PREFIX to an internal
+    location aliasing CAS_MEDIA_ROOT and nginx sends the file; otherwise FileResponse hands the
+    open file to the WSGI server's file_wrapper (sendfile under gunicorn).
+    """
+    match = CONTENT_ADDRESSED_NAME.match(name)
+    if not match:
+        raise Http404
+    storage = ContentAddressedStorage()
+    if not storage.exists(name):
+        raise Http404
+
+    etag = f'"{match.group("digest")}"'
+    accel_prefix = getattr(settings, 'CAS_X_ACCEL_REDIRECT_PREFIX', None)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    elif accel_prefix:
+        response = HttpResponse(content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + name
+    else:
+        response = FileResponse(open(storage.path(name), 'rb'))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,265 @@
+import time
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ml_client import MLServiceError, get_ml_client
+from .models import Assessment, AssessmentJob, WorkerHeartbeat
+from .processing import analyze_assessment, generate_report
+
+logger = logging.getLogger(__name__)
+
+# Database-backed queue for assessment processing (no external broker).
+# The create endpoint stores the assessment and enqueues an AssessmentJob. Workers
+# (`manage.py process_assessment_jobs`) claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED
+# where the database supports it. The claim itself is a conditional UPDATE, so two workers
+# can never run the same job, even on SQLite. Failed attempts are retried with exponential
+# backoff. While a job runs, its worker renews the lease in the background; a job whose worker
+# died mid-run is re-queued once its lease expires, or failed if that was its last attempt.
+
+MAX_ATTEMPTS = getattr(settings, 'ASSESSMENT_JOB_MAX_ATTEMPTS', 3)
+RETRY_BASE_DELAY = timedelta(seconds=getattr(settings, 'ASSESSMENT_JOB_RETRY_DELAY', 30))
+RETRY_MAX_DELAY = timedelta(minutes=15)
+LEASE_TIMEOUT = timedelta(seconds=getattr(settings, 'ASSESSMENT_JOB_LEASE_SECONDS', 600))
+LEASE_RENEW_INTERVAL = LEASE_TIMEOUT / 3
+# Kept small: the bytes stay in the job row (database size, backups) until the job finishes
+INLINE_IMAGE_MAX_BYTES = getattr(settings, 'ASSESSMENT_JOB_INLINE_IMAGE_MAX_BYTES', 2 * 1024 * 1024)
+
+
+class RetryJob(Exception):
+    """Raised inside a job to schedule another attempt."""
+
+
+def enqueue_assessment(assessment, max_attempts=None, image_file=None):
+    """
+    Marks the assessment as queued and creates its processing job. `image_file` is the uploaded
+    file of the first image; its bytes ride along with the job (up to INLINE_IMAGE_MAX_BYTES) so
+    the worker can skip downloading it back from media storage.
+    """
+    Assessment.objects.filter(pk=assessment.pk).update(processing_status=Assessment.PROCESSING_QUEUED)
+    assessment.processing_status = Assessment.PROCESSING_QUEUED
+    payload, name = None, ''
+    if image_file is not None and image_file.size <= INLINE_IMAGE_MAX_BYTES:
+        image_file.seek(0)
+        payload, name = image_file.read(), image_file.name
+    return AssessmentJob.objects.create(
+        assessment=assessment, max_attempts=max_attempts or MAX_ATTEMPTS, image_payload=payload, image_name=name
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: between half and all of base * 2^(attempts - 1), capped."""
+    ceiling = min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+    return timedelta(seconds=random.uniform(ceiling.total_seconds() / 2, ceiling.total_seconds()))
+
+
+def claim_next_job(worker_id):
+    """Claims the oldest due job for this worker, or returns None when nothing is due."""
+    now = timezone.now()
+    while True:
+        with transaction.atomic():
+            job = (AssessmentJob.objects.select_for_update(skip_locked=True)
+                   .defer('image_payload')  # loaded by run_job, not for every claim attempt
+                   .filter(status=AssessmentJob.STATUS_QUEUED, run_after__lte=now)
+                   .order_by('run_after', 'id')
+                   .first())
+            if job is None:
+                return None
+            claimed = AssessmentJob.objects.filter(pk=job.pk, status=AssessmentJob.STATUS_QUEUED).update(
+                status=AssessmentJob.STATUS_RUNNING,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=F('attempts') + 1,
+                updated_at=now,
+            )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker won the race for this row; try the next one
+
+
+def requeue_stale_jobs():
+    """
+    Puts back jobs whose worker stopped renewing its lease (crashed or killed mid-job). A job that
+    was on its last attempt is failed instead, and its report is generated from whatever analysis
+    was stored: re-running it could take down another worker, and attempts would never run out.
+    """
+    now = timezone.now()
+    stale = AssessmentJob.objects.filter(status=AssessmentJob.STATUS_RUNNING, locked_at__lt=now - LEASE_TIMEOUT)
+    count = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=AssessmentJob.STATUS_QUEUED, locked_by='', last_error='Worker lease expired', updated_at=now
+    )
+    if count:
+        logger.warning(f"Re-queued {count} assessment job(s) with an expired worker lease")
+    for job in stale.filter(attempts__gte=F('max_attempts')).defer('image_payload'):
+        # Taken over with a conditional UPDATE, like a claim, so only one worker finishes it
+        if AssessmentJob.objects.filter(pk=job.pk, status=AssessmentJob.STATUS_RUNNING,
+                                        locked_at=job.locked_at).update(locked_at=now, updated_at=now):
+            _finish_abandoned(job)
+    return count
+
+
+def renew_lease(job):
+    """Moves the lease of a job this worker is running forward. False if it is no longer ours."""
+    return bool(AssessmentJob.objects.filter(
+        pk=job.pk, status=AssessmentJob.STATUS_RUNNING, locked_by=job.locked_by
+    ).update(locked_at=timezone.now()))
+
+
+@contextmanager
+def _lease_renewal(job):
+    """Renews the job's lease every LEASE_RENEW_INTERVAL until the block exits, so slow runs aren't re-queued."""
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(LEASE_RENEW_INTERVAL.total_seconds()):
+                renew_lease(job)
+        finally:
+            connection.close()  # this thread's own connection
+
+    thread = threading.Thread(target=renew, name=f'lease-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """
+    Runs one claimed job, renewing its lease meanwhile: ML analysis (skipped if an earlier attempt
+    already stored it), then the PDF report. On the final attempt a failed ML step no longer blocks
+    the report, so the assessment always ends up with one.
+    """
+    with _lease_renewal(job):
+        return _run_job(job)
+
+
+def _run_job(job):
+    assessment = Assessment.objects.select_related('patient').get(pk=job.assessment_id)
+    Assessment.objects.filter(pk=assessment.pk).update(processing_status=Assessment.PROCESSING_RUNNING)
+    assessment.processing_status = Assessment.PROCESSING_RUNNING
+    final_attempt = job.attempts >= job.max_attempts
+    errors = []
+    timings = {}
+    start = time.perf_counter()
+    try:
+        if not assessment.ml_analysis_result:
+            payload = job.image_payload
+            try:
+                analyze_assessment(
+                    assessment,
+                    image_bytes=bytes(payload) if payload is not None else None,
+                    image_name=job.image_name,
+                    timings=timings,
+                )
+            except MLServiceError as e:
+                logger.error(f"ML analysis failed for assessment {assessment.id} (attempt {job.attempts}): {e}")
+                if e.retryable and not final_attempt:
+                    raise RetryJob(str(e))
+                errors.append(str(e))
+        report_start = time.perf_counter()
+        report_ok = generate_report(assessment)
+        timings['report_ms'] = round((time.perf_counter() - report_start) * 1000, 1)
+        if not report_ok:
+            if not final_attempt:
+                raise RetryJob("Report generation failed")
+            errors.append("Report generation failed")
+    except RetryJob as e:
+        return _retry_later(job, str(e), _total(timings, start), ml_done=bool(assessment.ml_analysis_result))
+    except Exception as e:
+        logger.exception(f"Assessment job {job.id} crashed")
+        if not final_attempt:
+            return _retry_later(job, f"{type(e).__name__}: {e}", _total(timings, start),
+                                ml_done=bool(assessment.ml_analysis_result))
+        errors.append(f"{type(e).__name__}: {e}")
+    return _finish(job, errors, _total(timings, start))
+
+
+def _finish_abandoned(job):
+    """Fails a job whose worker died on its final attempt, still generating the assessment's report."""
+    errors = ["Worker lease expired on the final attempt"]
+    timings = {}
+    start = time.perf_counter()
+    try:
+        if not generate_report(Assessment.objects.select_related('patient').get(pk=job.assessment_id)):
+            errors.append("Report generation failed")
+    except Exception as e:
+        logger.exception(f"Report for abandoned assessment job {job.id} crashed")
+        errors.append(f"{type(e).__name__}: {e}")
+    return _finish(job, errors, _total(timings, start))
+
+
+def _total(timings, start):
+    timings['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+def _retry_later(job, error, timings, ml_done=False):
+    delay = retry_delay(job.attempts)
+    job.status = AssessmentJob.STATUS_QUEUED
+    job.run_after = timezone.now() + delay
+    job.locked_by = ''
+    job.last_error = error
+    job.timings = timings
+    update_fields = ['status', 'run_after', 'locked_by', 'last_error', 'timings', 'updated_at']
+    if ml_done:
+        # Only the report is retried: the image is no longer needed
+        job.image_payload = None
+        update_fields.append('image_payload')
+    job.save(update_fields=update_fields)
+    Assessment.objects.filter(pk=job.assessment_id).update(processing_status=Assessment.PROCESSING_QUEUED)
+    logger.info(f"Assessment job {job.id} will retry in {delay.total_seconds():.0f}s (attempt {job.attempts}/{job.max_attempts})")
+    return job
+
+
+def _finish(job, errors, timings):
+    job.status = AssessmentJob.STATUS_FAILED if errors else AssessmentJob.STATUS_SUCCEEDED
+    job.last_error = "; ".join(errors)
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.timings = timings
+    job.image_payload = None
+    job.save(update_fields=['status', 'last_error', 'finished_at', 'locked_by', 'timings', 'image_payload', 'updated_at'])
+    Assessment.objects.filter(pk=job.assessment_id).update(
+        processing_status=Assessment.PROCESSING_FAILED if errors else Assessment.PROCESSING_COMPLETED
+    )
+    if errors:
+        logger.error(f"Assessment job {job.id} failed after {job.attempts} attempt(s): {job.last_error}")
+    else:
+        logger.info(f"Assessment job {job.id} completed for assessment {job.assessment_id} ({timings})")
+    return job
+
+
+def process_available_jobs(worker_id, max_jobs=None):
+    """Runs due jobs until the queue is empty (or max_jobs ran). Returns the number processed."""
+    processed = 0
+    requeue_stale_jobs()
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def record_heartbeat(worker_id, jobs_processed, started_at):
+    """Publishes this worker's liveness and ML client stats (breaker state, latency) for monitoring."""
+    WorkerHeartbeat.objects.update_or_create(
+        worker_id=worker_id,
+        defaults={
+            'jobs_processed': jobs_processed,
+            'ml_client': get_ml_client().stats(),
+            'started_at': started_at,
+        },
+    )
@@ -0,0 +1,60 @@
+"""
+Worker for queued assessment processing (ML analysis + PDF report).
+Run one or more alongside the web server:
+    python manage.py process_assessment_jobs
+    python manage.py process_assessment_jobs --once   # drain the queue and exit (cron / one-off)
+"""
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from addpatient.jobs import process_available_jobs, record_heartbeat
+
+
+class Command(BaseCommand):
+    help = 'Processes queued assessment jobs from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after processing this many jobs.')
+        parser.add_argument('--worker-id', type=str, default=None, help='Name recorded on claimed jobs (default: host:pid).')
+        parser.add_argument('--heartbeat-interval', type=float, default=15.0,
+                            help='Seconds between published heartbeats (liveness + ML client stats).')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or f"{socket.gethostname()}:{os.getpid()}"
+        max_jobs = options['max_jobs']
+        self.stopping = False
+
+        # Finish the current job on SIGTERM/SIGINT (deploys, Ctrl+C) instead of dying mid-job
+        def request_stop(signum, frame):
+            self.stdout.write(self.style.WARNING('Stop requested, finishing current job...'))
+            self.stopping = True
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f'Assessment worker {worker_id} started')
+        processed = 0
+        started_at = timezone.now()
+        last_heartbeat = None
+        while not self.stopping and (max_jobs is None or processed < max_jobs):
+            close_old_connections()  # long-running process: drop connections the DB has closed
+            if last_heartbeat is None or time.monotonic() - last_heartbeat >= options['heartbeat_interval']:
+                record_heartbeat(worker_id, processed, started_at)
+                last_heartbeat = time.monotonic()
+            # One job per round so a stop request is honored between jobs
+            if process_available_jobs(worker_id, max_jobs=1):
+                processed += 1
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        record_heartbeat(worker_id, processed, started_at)
+        self.stdout.write(self.style.SUCCESS(f'Assessment worker {worker_id} stopped after {processed} job(s)'))
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addpatient', '0024_assessment_processing_status_assessmentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerHeartbeat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker_id', models.CharField(max_length=100, unique=True)),
+                ('jobs_processed', models.PositiveIntegerField(default=0)),
+                ('ml_client', models.JSONField(blank=True, default=dict)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-last_seen'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addpatient', '0025_workerheartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='image_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='image_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
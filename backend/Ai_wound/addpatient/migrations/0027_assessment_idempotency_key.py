@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addpatient', '0026_assessmentjob_image_payload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='assessment',
+            constraint=models.UniqueConstraint(fields=('assessed_by', 'idempotency_key'), name='unique_assessment_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addpatient', '0027_assessment_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentimage',
+            name='full_image_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
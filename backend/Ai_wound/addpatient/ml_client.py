@@ -0,0 +1,409 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Client for the Flask ML service (/api/predict), possibly running as several replicas.
+# One client per process (get_ml_client()) keeps a pooled keep-alive session, so calls reuse
+# connections instead of paying a new TCP/TLS handshake each time. With several replicas, a
+# background thread polls each replica's /health for readiness and inference queue depth, and every
+# call goes to the least-loaded ready replica. Each replica has its own circuit breaker: after repeated failures it is ejected
+# from routing until a half-open probe succeeds again. Transient failures are retried a bounded
+# number of times with jittered backoff, on another replica when there is one.
+
+RETRYABLE_STATUSES = (429, 502, 503, 504)
+
+
+class MLServiceError(Exception):
+    """The ML service could not analyze the image. retryable=False for errors a retry won't fix (4xx)."""
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(MLServiceError):
+    """Raised without calling the service while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; `failure_threshold` consecutive failures open the circuit.
+    open: calls are rejected until `reset_timeout` seconds have passed.
+    half_open: a single probe call is let through; success closes the circuit, failure reopens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, name='ml-service', clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, probing")
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def available(self):
+        """Whether allow() would let a call through now, without claiming the half-open probe."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return self.clock() - self.opened_at >= self.reset_timeout
+            return not self._probe_in_flight
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.times_opened += 1
+                logger.warning(f"Circuit {self.name} opened after {self.consecutive_failures} consecutive failure(s)")
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (self.clock() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "retry_in_seconds": retry_in,
+            }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 1)
+
+
+class Replica:
+    """One ML service instance: its breaker, last /health report and call stats."""
+
+    def __init__(self, base_url, breaker):
+        # Accept either the service root or the full endpoint
+        base_url = base_url.rstrip('/')
+        if base_url.endswith('/api/predict'):
+            base_url = base_url[:-len('/api/predict')]
+        self.base_url = base_url
+        self.predict_url = f"{base_url}/api/predict"
+        self.health_url = f"{base_url}/health"
+        self.breaker = breaker
+        self.ready = None  # unknown until the first health check
+        self.remote_in_flight = 0
+        self.max_in_flight = None
+        self.health_error = None
+        self.health_checked_at = None
+        self.in_flight = 0  # calls from this process
+        self.latencies_ms = deque(maxlen=500)
+        self.counters = {"requests": 0, "successes": 0, "failures": 0}
+
+    def load(self):
+        """Expected queue depth: what the replica last reported plus the calls sent since."""
+        return self.remote_in_flight + self.in_flight
+
+    def saturated(self):
+        return self.max_in_flight is not None and self.load() >= self.max_in_flight
+
+    def stats(self):
+        latencies = sorted(self.latencies_ms)
+        return {
+            "url": self.base_url,
+            "ready": self.ready,
+            "ejected": self.ready is False or self.breaker.state != CircuitBreaker.CLOSED,
+            "in_flight": self.in_flight,
+            "remote_in_flight": self.remote_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "health_error": self.health_error,
+            "health_age_s": round(time.monotonic() - self.health_checked_at, 1) if self.health_checked_at else None,
+            "breaker": self.breaker.snapshot(),
+            **self.counters,
+            "latency_ms": {
+                "count": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+        }
+
+
+class MLServiceClient:
+    def __init__(self, endpoints, timeout=60.0, connect_timeout=3.05, retries=2, backoff=0.5, max_backoff=5.0,
+                 pool_size=10, failure_threshold=5, reset_timeout=30.0, health_interval=5.0, health_timeout=2.0,
+                 clock=time.monotonic):
+        if isinstance(endpoints, str):
+            endpoints = [e for e in endpoints.split(',') if e.strip()]
+        self.replicas = [
+            Replica(url.strip(), CircuitBreaker(failure_threshold, reset_timeout, name=url.strip(), clock=clock))
+            for url in endpoints
+        ]
+        if not self.replicas:
+            raise ValueError("At least one ML service endpoint is required")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+
+        self.session = requests.Session()
+        # Retries are handled here (with the breakers in the loop), not by urllib3
+        adapter = HTTPAdapter(pool_connections=len(self.replicas), pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "short_circuited": 0}
+        self._health_thread = None
+        self._stop_health = threading.Event()
+
+    @property
+    def breaker(self):
+        """The breaker of the first replica (the only one in a single-endpoint setup)."""
+        return self.replicas[0].breaker
+
+    @classmethod
+    def from_settings(cls):
+        from django.conf import settings
+        endpoints = getattr(settings, 'ML_SERVICE_URLS', None) or [
+            getattr(settings, 'ML_SERVICE_URL', None) or os.getenv("ML_SERVICE_URL", "http://localhost:8001/api/predict")
+        ]
+        return cls(
+            endpoints,
+            timeout=getattr(settings, 'ML_SERVICE_TIMEOUT', 60.0),
+            retries=getattr(settings, 'ML_SERVICE_RETRIES', 2),
+            pool_size=getattr(settings, 'ML_SERVICE_POOL_SIZE', 10),
+            failure_threshold=getattr(settings, 'ML_BREAKER_FAILURES', 5),
+            reset_timeout=getattr(settings, 'ML_BREAKER_RESET_SECONDS', 30.0),
+            health_interval=getattr(settings, 'ML_HEALTH_INTERVAL', 5.0),
+        )
+
+    # ── Health polling ───────────────────────────────────────────────
+    def refresh_health(self):
+        """
+        Polls every replica's /health once and updates readiness and queue depth. A replica that
+        refuses the connection or answers non-2xx is ejected; one that accepts but is too slow to
+        answer is busy, not down, so it keeps its last readiness and is only ranked behind idle ones.
+        """
+        for replica in self.replicas:
+            try:
+                response = self.session.get(replica.health_url, timeout=self.health_timeout)
+                response.raise_for_status()
+                body = response.json()
+            except requests.ReadTimeout as e:
+                if replica.health_error is None:
+                    logger.info(f"ML replica {replica.base_url} too busy to answer its health check: {e}")
+                replica.health_error = f"health check timed out after {self.health_timeout}s (busy)"
+                replica.remote_in_flight = max(replica.remote_in_flight, 1)
+            except (requests.RequestException, ValueError) as e:
+                if replica.ready is not False:
+                    logger.warning(f"ML replica {replica.base_url} failed its health check, ejecting: {e}")
+                replica.ready, replica.health_error = False, str(e)[:200]
+            else:
+                load = body.get('load') or {}
+                ready = bool(body.get('ready', body.get('analyzer_initialized', True)))
+                if ready and replica.ready is False:
+                    logger.info(f"ML replica {replica.base_url} is healthy again")
+                replica.ready, replica.health_error = ready, None if ready else "analyzer not initialized"
+                replica.remote_in_flight = load.get('in_flight') or 0
+                replica.max_in_flight = load.get('max_in_flight')
+            replica.health_checked_at = time.monotonic()
+
+    def _ensure_health_polling(self):
+        # With a single replica there is nothing to route between; its breaker handles failures
+        if self.health_interval <= 0 or len(self.replicas) < 2 or self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._poll_health, name='ml-health', daemon=True)
+                self._health_thread.start()
+
+    def _poll_health(self):
+        while not self._stop_health.is_set():
+            self.refresh_health()
+            self._stop_health.wait(self.health_interval)
+
+    # ── Routing ──────────────────────────────────────────────────────
+    def _pick_replica(self, exclude=()):
+        """
+        Least-loaded replica that isn't ejected (failed health check or open breaker), preferring
+        ones below their max_in_flight and not yet tried for this call. Returns None if all are ejected.
+        """
+        with self._lock:
+            candidates = [r for r in self.replicas if r.ready is not False and r.breaker.available()]
+            fresh = [r for r in candidates if r not in exclude]
+            candidates = fresh or candidates
+            random.shuffle(candidates)  # spread ties
+            for replica in sorted(candidates, key=lambda r: (r.saturated(), r.load())):
+                if replica.breaker.allow():
+                    replica.in_flight += 1
+                    return replica
+            return None
+
+    def predict(self, image, filename='image.jpg', editor_metadata=None, content_type='image/jpeg'):
+        """
+        Posts an image (bytes or a binary file object, rewound on every attempt) with optional
+        editor_metadata (JSON string) to the least-loaded replica and returns the parsed JSON result.
+        Raises CircuitOpenError while every replica is ejected, MLServiceError otherwise.
+        """
+        self._ensure_health_polling()
+        data = {'editor_metadata': editor_metadata} if editor_metadata else {}
+        error = None
+        tried = []
+        for attempt in range(self.retries + 1):
+            replica = self._pick_replica(exclude=tried)
+            if replica is None:
+                self._count("short_circuited")
+                raise CircuitOpenError("No healthy ML service replica; failing fast")
+            tried.append(replica)
+            self._count("requests", replica)
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                if hasattr(image, 'seek'):
+                    image.seek(0)
+                response = self.session.post(
+                    replica.predict_url,
+                    files={'image': (filename, image, content_type)},
+                    data=data,
+                    timeout=(self.connect_timeout, self.timeout),
+                )
+                with self._lock:
+                    replica.latencies_ms.append((time.perf_counter() - start) * 1000)
+                if response.status_code == 200:
+                    try:
+                        result = response.json()
+                    except ValueError as e:
+                        # A 200 whose body isn't JSON (truncated, a proxy's error page): a replica fault like a 5xx
+                        error = MLServiceError(f"ML service returned an invalid response ({replica.base_url}): {e}")
+                    else:
+                        replica.breaker.record_success()
+                        self._count("successes", replica)
+                        return result
+                else:
+                    message = f"ML Service error: {response.status_code} - {response.text[:500]}"
+                    if response.status_code not in RETRYABLE_STATUSES and response.status_code < 500:
+                        # The service is up and rejected this input; retrying or tripping the breaker won't help
+                        replica.breaker.record_success()
+                        self._count("failures", replica)
+                        raise MLServiceError(message, retryable=False)
+                    error = MLServiceError(message)
+                    retry_after = response.headers.get('Retry-After')
+            except requests.RequestException as e:
+                error = MLServiceError(f"ML service unreachable ({replica.base_url}): {e}")
+            finally:
+                self._release(replica)
+
+            replica.breaker.record_failure()
+            self._count("failures", replica)
+            if attempt < self.retries:
+                self._count("retries")
+                # Another replica can be tried right away; the same one gets a backoff first
+                if not self._has_untried(tried):
+                    time.sleep(self._backoff_delay(attempt, retry_after))
+        raise error
+
+    def _has_untried(self, tried):
+        return any(r not in tried and r.ready is not False and r.breaker.available() for r in self.replicas)
+
+    def _release(self, replica):
+        with self._lock:
+            replica.in_flight -= 1
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Jittered exponential backoff, at least the server's Retry-After (both capped)."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+        return min(delay, self.max_backoff)
+
+    def _count(self, key, replica=None):
+        with self._lock:
+            self._counters[key] += 1
+            if replica is not None:
+                replica.counters[key] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            replicas = [r.stats() for r in self.replicas]
+        latencies = sorted(v for r in self.replicas for v in list(r.latencies_ms))
+        return {
+            **counters,
+            "healthy_replicas": sum(1 for r in replicas if not r["ejected"]),
+            "latency_ms": {
+                "count": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+            "replicas": replicas,
+        }
+
+    def close(self):
+        self._stop_health.set()
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ml_client():
+    """The process-wide ML client, created from settings on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MLServiceClient.from_settings()
+        return _client
+
+
+def reset_ml_client():
+    """Drops the process-wide client (tests, settings changes)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
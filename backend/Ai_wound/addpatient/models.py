@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from datetime import datetime
 from .utils import generate_mrn
 
@@ -155,12 +156,33 @@ class Assessment(models.Model):
     
     algorithm_analysis = models.JSONField(null=True, blank=True)
     report_file = models.FileField(upload_to='assessment_reports/', null=True, blank=True)
+
+    # Background processing (ML analysis + report) state, see AssessmentJob
+    PROCESSING_QUEUED = 'queued'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_COMPLETED = 'completed'
+    PROCESSING_FAILED = 'failed'
+    processing_status = models.CharField(
+        max_length=20,
+        choices=[
+            (PROCESSING_QUEUED, 'Queued'),
+            (PROCESSING_RUNNING, 'Processing'),
+            (PROCESSING_COMPLETED, 'Completed'),
+            (PROCESSING_FAILED, 'Failed'),
+        ],
+        default=PROCESSING_COMPLETED
+    )
+    # Idempotency-Key header of the create request: retries with the same key get this assessment back
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['assessed_by', 'idempotency_key'], name='unique_assessment_idempotency_key'),
+        ]
 
     def __str__(self):
         return f"Assessment for {self.patient} on {self.created_at.date()}"
@@ -170,11 +192,74 @@ class AssessmentImage(models.Model):
     full_image = models.ImageField(upload_to='wound_images/full/')
     selected_area_image = models.ImageField(upload_to='wound_images/selected/', null=True, blank=True)
     annotations = models.JSONField(null=True, blank=True) # To store polygon points
+    full_image_size = models.PositiveIntegerField(null=True, blank=True)  # bytes, recorded at upload (no storage API call)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.assessment}"
 
+class AssessmentJob(models.Model):
+    """
+    Queued background processing of an assessment (ML analysis, reduction rate, PDF report).
+    Rows are claimed by `manage.py process_assessment_jobs` workers, see addpatient/jobs.py.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_QUEUED, 'Queued'),
+            (STATUS_RUNNING, 'Running'),
+            (STATUS_SUCCEEDED, 'Succeeded'),
+            (STATUS_FAILED, 'Failed'),
+        ],
+        default=STATUS_QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # not picked up before this (retry backoff)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Uploaded bytes of the image to analyze, kept from the create request so the worker doesn't
+    # download them back from media storage. Cleared once the ML step is done.
+    image_payload = models.BinaryField(null=True, blank=True, editable=False)
+    image_name = models.CharField(max_length=255, blank=True)
+    timings = models.JSONField(default=dict, blank=True)  # ms per step of the last attempt
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) for assessment {self.assessment_id}"
+
+
+class WorkerHeartbeat(models.Model):
+    """
+    Last report of a `process_assessment_jobs` worker: liveness plus its ML client stats
+    (circuit breaker state, call latency). ML calls happen in the workers, so their
+    in-process stats are published here for the admin monitoring endpoint.
+    """
+    worker_id = models.CharField(max_length=100, unique=True)
+    jobs_processed = models.PositiveIntegerField(default=0)
+    ml_client = models.JSONField(default=dict, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-last_seen']
+
+    def __str__(self):
+        return f"Worker {self.worker_id} (seen {self.last_seen})"
+
 class ChatMessage(models.Model):
     patient = models.ForeignKey(
         Patient,
@@ -290,40 +375,50 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 import os
 
+def format_file_size(size_bytes):
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def system_file_for_assessment_image(image, size_bytes=None):
+    """Unsaved SystemFile entry for an assessment image (size "Unknown" if not known)."""
+    from admin_page.models import SystemFile
+
+    # Get extension from file name
+    try:
+        ext = os.path.splitext(image.full_image.name)[1].upper().replace('.', '') or 'IMG'
+    except Exception:
+        ext = 'IMG'
+    return SystemFile(
+        name=f"Wound Image - {image.assessment.patient.first_name} {image.assessment.patient.last_name} (#{image.assessment.id})",
+        file=image.full_image.name,
+        uploaded_by=image.assessment.assessed_by,
+        size=format_file_size(size_bytes) if size_bytes is not None else "Unknown",
+        file_type=ext
+    )
+
+
 @receiver(post_save, sender=AssessmentImage)
 def sync_assessment_image_to_system_files(sender, instance, created, **kwargs):
-    """Sync newly uploaded assessment images to SystemFile storage."""
+    """
+    Sync newly uploaded assessment images to SystemFile storage.
+    (Images saved in bulk by addpatient/uploads.py get their SystemFile rows there.)
+    """
     if created and instance.full_image:
-        from admin_page.models import SystemFile
-        
-        # Calculate size string — use try/except for Cloudinary remote files
-        # where .size may raise NotImplementedError or require a network call
-        size_str = "Unknown"
-        try:
-            size_bytes = instance.full_image.size
-            if size_bytes < 1024:
-                size_str = f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                size_str = f"{size_bytes / 1024:.1f} KB"
-            else:
-                size_str = f"{size_bytes / (1024 * 1024):.1f} MB"
-        except (NotImplementedError, AttributeError, Exception):
-            size_str = "Unknown"
-            
-        # Get extension from file name
-        try:
-            ext = os.path.splitext(instance.full_image.name)[1].upper().replace('.', '') or 'IMG'
-        except Exception:
-            ext = 'IMG'
+        # Prefer the size recorded at upload; .size on Cloudinary remote files is a network call
+        # and may raise NotImplementedError
+        size_bytes = instance.full_image_size
+        if size_bytes is None:
+            try:
+                size_bytes = instance.full_image.size
+            except (NotImplementedError, AttributeError, Exception):
+                size_bytes = None
 
         try:
-            SystemFile.objects.create(
-                name=f"Wound Image - {instance.assessment.patient.first_name} {instance.assessment.patient.last_name} (#{instance.assessment.id})",
-                file=instance.full_image,
-                uploaded_by=instance.assessment.assessed_by,
-                size=size_str,
-                file_type=ext
-            )
+            system_file_for_assessment_image(instance, size_bytes).save()
         except Exception as e:
             import logging
             logging.getLogger(__name__).error(f"Failed to sync AssessmentImage to SystemFile: {e}")
@@ -0,0 +1,134 @@
+import json
+import time
+import logging
+
+from .ml_client import get_ml_client
+from .models import Assessment
+from .reports import generate_assessment_report_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def get_editor_metadata(image):
+    """ROI polygon from the image annotations in the format the ML service expects, or None."""
+    if not image.annotations:
+        return None
+    # Extract points from polygons (assuming first image's first annotation set)
+    try:
+        # Format expected by ML service: {"boundary_coordinates": [{"x": 10, "y": 20}, ...]}
+        # Adjusting based on how frontend sends annotations (usually a list of points/shapes)
+        coords = image.annotations.get('points') if isinstance(image.annotations, dict) else image.annotations
+        if isinstance(coords, list):
+            return json.dumps({"boundary_coordinates": coords})
+    except Exception as ann_err:
+        logger.warning(f"Failed to parse annotations for ROI: {ann_err}")
+    return None
+
+
+def analyze_assessment(assessment, image_bytes=None, image_name=None, timings=None):
+    """
+    Sends the assessment's first image to the ML service and stores the results on the assessment.
+    `image_bytes` are the uploaded bytes kept by the create request; without them the image is
+    read back from media storage (a Cloudinary download in production). Step durations (ms) are
+    added to `timings` if given.
+    Returns False when there is no image to analyze. Raises MLServiceError on failure.
+    """
+    timings = {} if timings is None else timings
+    # Use the first image for ML analysis
+    first_image = assessment.images.first()
+    if not first_image or not first_image.full_image:
+        return False
+
+    editor_metadata = get_editor_metadata(first_image)
+    if editor_metadata:
+        logger.info("Sending ROI coordinates to ML service")
+
+    start = time.perf_counter()
+    if image_bytes is not None:
+        timings['image_source'] = 'upload'
+    else:
+        with first_image.full_image.open('rb') as img_file:
+            image_bytes = img_file.read()
+        timings['image_source'] = 'storage'
+    timings['image_fetch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    # Pooled, retried, circuit-broken call (ml_client); raises MLServiceError on failure
+    start = time.perf_counter()
+    try:
+        result = get_ml_client().predict(
+            image_bytes, filename=image_name or first_image.full_image.name, editor_metadata=editor_metadata
+        )
+    finally:
+        timings['ml_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    apply_ml_result(assessment, result)
+    update_reduction_rate(assessment)
+    assessment.save()
+    return True
+
+
+def apply_ml_result(assessment, result):
+    """Maps the Flask response fields onto the Assessment model fields (not saved)."""
+    assessment.ml_analysis_result = result
+
+    assessment.wound_type = result.get('wound_type', assessment.wound_type)
+    assessment.wound_stage = result.get('stage', assessment.wound_stage)
+    assessment.severity = result.get('severity', assessment.severity)
+    assessment.wound_area_cm2 = result.get('wound_area_cm2', assessment.wound_area_cm2)
+
+    # Tissue Composition Mapping
+    tissue = result.get('tissue_composition', {})
+    if tissue:
+        assessment.granulation_pct = tissue.get('granulation', assessment.granulation_pct)
+        assessment.slough_pct = tissue.get('slough', assessment.slough_pct)
+        assessment.necrotic_pct = tissue.get('necrotic', assessment.necrotic_pct)
+        assessment.epithelial_pct = tissue.get('epithelial', assessment.epithelial_pct)
+
+    dims = result.get('dimensions', {})
+    if dims:
+        assessment.length = dims.get('length', assessment.length)
+        assessment.width = dims.get('width', assessment.width)
+        assessment.depth = dims.get('depth', assessment.depth)
+
+    assessment.cure_recommendation = result.get('cure_recommendation', assessment.cure_recommendation)
+
+    # Use confidence_score and healing_index directly from ML response
+    assessment.confidence_score = result.get('confidence_score', assessment.confidence_score)
+    assessment.healing_index = result.get('healing_index', assessment.healing_index)
+
+    # Store processing steps
+    assessment.algorithm_analysis = result.get('algorithm_analysis')
+
+    logger.info(f"Populated AI fields for assessment {assessment.id}: Type={assessment.wound_type}, Severity={assessment.severity}, Area={assessment.wound_area_cm2}cm²")
+
+
+def update_reduction_rate(assessment):
+    """Wound area reduction (%) against the patient's previous assessment (not saved)."""
+    try:
+        prev_assessment = Assessment.objects.filter(
+            patient=assessment.patient,
+            created_at__lt=assessment.created_at
+        ).exclude(id=assessment.id).order_by('-created_at').first()
+
+        if prev_assessment and prev_assessment.length and prev_assessment.width:
+            prev_area = float(prev_assessment.length) * float(prev_assessment.width)
+            curr_area = float(assessment.length) * float(assessment.width)
+
+            if prev_area > 0:
+                reduction = ((prev_area - curr_area) / prev_area) * 100
+                assessment.reduction_rate = round(reduction, 2)
+                logger.info(f"Reduction rate calculated: {assessment.reduction_rate}%")
+    except Exception as e:
+        logger.error(f"Failed to calculate reduction rate: {e}")
+
+
+def generate_report(assessment):
+    """Generates/regenerates the PDF report. Returns True on success."""
+    try:
+        if generate_assessment_report_pdf(assessment.id):
+            logger.info(f"Automated report generated for assessment {assessment.id}")
+            return True
+        logger.error(f"Failed to generate automated report for assessment {assessment.id}")
+    except Exception as e:
+        logger.error(f"Error during report generation: {e}")
+    return False
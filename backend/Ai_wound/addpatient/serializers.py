@@ -226,13 +226,15 @@ class AssessmentSerializer(serializers.ModelSerializer):
             'ml_analysis_result', 'tissue_composition', 'reduction_rate', 
             'confidence_score', 'healing_index', 'algorithm_analysis', 
             'cure_recommendation', 'report_file',
-            'severity', 'wound_area_cm2', 'granulation_pct', 'slough_pct', 'necrotic_pct', 'epithelial_pct'
+            'severity', 'wound_area_cm2', 'granulation_pct', 'slough_pct', 'necrotic_pct', 'epithelial_pct',
+            'processing_status'
         ]
         read_only_fields = [
             'assessed_by', 'assessed_by_name', 'created_at', 'ml_analysis_result', 
             'tissue_composition', 'reduction_rate', 'confidence_score', 
             'healing_index', 'algorithm_analysis', 'cure_recommendation', 'report_file',
-            'severity', 'wound_area_cm2', 'granulation_pct', 'slough_pct', 'necrotic_pct', 'epithelial_pct'
+            'severity', 'wound_area_cm2', 'granulation_pct', 'slough_pct', 'necrotic_pct', 'epithelial_pct',
+            'processing_status'
         ]
 
 class ChatMessageSerializer(serializers.ModelSerializer):
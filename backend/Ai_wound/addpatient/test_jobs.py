@@ -0,0 +1,328 @@
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.fields.files import FieldFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from addpatient import jobs
+from addpatient.jobs import claim_next_job, renew_lease, requeue_stale_jobs, run_job, process_available_jobs
+from addpatient.ml_client import reset_ml_client
+from addpatient.models import Patient, Assessment, AssessmentJob, WorkerHeartbeat
+from admin_page.models import Admin
+
+ML_RESULT = {
+    "wound_type": "Burns",
+    "severity": "Medium",
+    "wound_area_cm2": 6.5,
+    "tissue_composition": {"granulation": 70, "slough": 20, "necrotic": 5, "epithelial": 5},
+    "dimensions": {"length": 3.0, "width": 2.0, "depth": 0.5},
+    "confidence_score": 88,
+    "healing_index": 88,
+    "cure_recommendation": "Use hydrogel dressings.",
+    "algorithm_analysis": ["Image normalized to 224x224 RGB"],
+}
+
+
+def ml_response(status_code, payload=None):
+    response = mock.Mock(status_code=status_code, text="error", headers={})
+    response.json.return_value = payload
+    return response
+
+
+def tiny_png():
+    # 1x1 PNG, enough for an ImageField upload
+    return (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde'
+            b'\x00\x00\x00\x0cIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82')
+
+
+def use_temp_media_root(testcase):
+    """Points MEDIA_ROOT at a throwaway directory for one test, so uploads don't land in the repo's media/."""
+    media_root = tempfile.TemporaryDirectory()
+    testcase.addCleanup(media_root.cleanup)
+    settings_override = override_settings(MEDIA_ROOT=media_root.name)
+    settings_override.enable()
+    testcase.addCleanup(settings_override.disable)
+
+
+# Job-level retries only: the client's own retries are covered in test_ml_client.py
+@override_settings(ML_SERVICE_RETRIES=0, ML_HEALTH_INTERVAL=0)
+@mock.patch('addpatient.jobs.generate_report', return_value=True)
+@mock.patch('addpatient.ml_client.requests.Session.post')
+class AssessmentJobTests(APITestCase):
+    def setUp(self):
+        reset_ml_client()
+        self.addCleanup(reset_ml_client)
+        use_temp_media_root(self)
+        self.doctor = Admin.objects.create_user(
+            email='jobdoc@example.com', password='password123', role_type='doctor'
+        )
+        self.patient = Patient.objects.create(
+            first_name="Queue", last_name="Patient", date_of_birth="1980-01-01", gender="Male",
+            admission_date="2023-10-01", ward_department="Surgery",
+            room_bed_number="12", assigning_physician="Dr. Who",
+            primary_diagnosis="Burn"
+        )
+        self.client.force_authenticate(user=self.doctor)
+
+    def submit(self):
+        data = {
+            "patient": self.patient.id,
+            "wound_type": "Burns",
+            "images[0][full]": SimpleUploadedFile("wound.png", tiny_png(), content_type="image/png"),
+            "images[0][annotations]": '[{"x": 0, "y": 0}, {"x": 1, "y": 0}, {"x": 1, "y": 1}]',
+        }
+        response = self.client.post(reverse('assessments-list'), data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    def test_create_queues_job_without_calling_ml(self, post, report):
+        response = self.submit()
+        post.assert_not_called()
+        report.assert_not_called()
+        job = AssessmentJob.objects.get(assessment_id=response.data['id'])
+        self.assertEqual(job.status, AssessmentJob.STATUS_QUEUED)
+        self.assertEqual(response.data['processing_status'], Assessment.PROCESSING_QUEUED)
+
+        status_response = self.client.get(response['Location'])
+        self.assertEqual(status_response.data['job']['status'], AssessmentJob.STATUS_QUEUED)
+        self.assertNotIn('assessment', status_response.data)
+
+    def test_worker_applies_ml_result_and_builds_report(self, post, report):
+        post.return_value = ml_response(200, ML_RESULT)
+        response = self.submit()
+
+        self.assertEqual(process_available_jobs("test-worker"), 1)
+        assessment = Assessment.objects.get(id=response.data['id'])
+        self.assertEqual(assessment.processing_status, Assessment.PROCESSING_COMPLETED)
+        self.assertEqual(assessment.severity, "Medium")
+        self.assertEqual(assessment.slough_pct, 20)
+        self.assertEqual(float(assessment.length), 3.0)
+        report.assert_called_once()
+        # ROI from the image annotations is forwarded to the ML service
+        self.assertIn('boundary_coordinates', post.call_args.kwargs['data']['editor_metadata'])
+
+        status_response = self.client.get(response['Location'])
+        self.assertEqual(status_response.data['job']['status'], AssessmentJob.STATUS_SUCCEEDED)
+        self.assertEqual(status_response.data['assessment']['wound_type'], "Burns")
+
+    def test_worker_sends_uploaded_bytes_without_reading_storage(self, post, report):
+        post.return_value = ml_response(200, ML_RESULT)
+        response = self.submit()
+        job = AssessmentJob.objects.get(assessment_id=response.data['id'])
+        self.assertEqual(bytes(job.image_payload), tiny_png())
+
+        with mock.patch.object(FieldFile, 'open', side_effect=AssertionError("storage read")):
+            self.assertEqual(process_available_jobs("test-worker"), 1)
+        name, sent, _ = post.call_args.kwargs['files']['image']
+        self.assertEqual((name, sent), ("wound.png", tiny_png()))
+
+        job.refresh_from_db()
+        self.assertIsNone(job.image_payload)
+        self.assertEqual(job.timings['image_source'], 'upload')
+        status_response = self.client.get(response['Location'])
+        self.assertIn('ml_ms', status_response.data['job']['timings'])
+
+    def test_large_upload_is_not_stored_with_the_job(self, post, report):
+        with mock.patch.object(jobs, 'INLINE_IMAGE_MAX_BYTES', len(tiny_png()) - 1):
+            response = self.submit()
+        self.assertIsNone(AssessmentJob.objects.get(assessment_id=response.data['id']).image_payload)
+
+    def test_worker_falls_back_to_storage_without_payload(self, post, report):
+        post.return_value = ml_response(200, ML_RESULT)
+        response = self.submit()
+        AssessmentJob.objects.update(image_payload=None)
+        self.assertEqual(process_available_jobs("test-worker"), 1)
+        self.assertEqual(post.call_args.kwargs['files']['image'][1], tiny_png())
+        job = AssessmentJob.objects.get(assessment_id=response.data['id'])
+        self.assertEqual(job.timings['image_source'], 'storage')
+
+    def test_transient_ml_failure_is_retried_with_backoff(self, post, report):
+        post.return_value = ml_response(503)
+        self.submit()
+        job = claim_next_job("test-worker")
+        run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AssessmentJob.STATUS_QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("503", job.last_error)
+        report.assert_not_called()
+        self.assertIsNone(claim_next_job("test-worker"))  # not due yet
+        self.assertEqual(bytes(AssessmentJob.objects.get(pk=job.pk).image_payload), tiny_png())
+
+        AssessmentJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        post.return_value = ml_response(200, ML_RESULT)
+        self.assertEqual(process_available_jobs("test-worker"), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AssessmentJob.STATUS_SUCCEEDED, 2))
+
+    def test_gives_up_after_max_attempts_but_still_reports(self, post, report):
+        post.side_effect = requests.ConnectionError("refused")
+        response = self.submit()
+        for _ in range(3):
+            AssessmentJob.objects.update(run_after=timezone.now())
+            process_available_jobs("test-worker")
+
+        job = AssessmentJob.objects.get(assessment_id=response.data['id'])
+        self.assertEqual((job.status, job.attempts), (AssessmentJob.STATUS_FAILED, 3))
+        self.assertEqual(post.call_count, 3)
+        report.assert_called_once()
+        self.assertEqual(Assessment.objects.get(id=response.data['id']).processing_status, Assessment.PROCESSING_FAILED)
+
+    def test_rejected_image_is_not_retried(self, post, report):
+        post.return_value = ml_response(400)
+        response = self.submit()
+        process_available_jobs("test-worker")
+        job = AssessmentJob.objects.get(assessment_id=response.data['id'])
+        self.assertEqual((job.status, job.attempts), (AssessmentJob.STATUS_FAILED, 1))
+
+    def test_job_is_claimed_once(self, post, report):
+        self.submit()
+        first = claim_next_job("worker-a")
+        self.assertEqual(first.locked_by, "worker-a")
+        self.assertIsNone(claim_next_job("worker-b"))
+
+    def test_expired_lease_is_requeued(self, post, report):
+        self.submit()
+        job = claim_next_job("crashed-worker")
+        AssessmentJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(claim_next_job("worker-b").pk, job.pk)
+
+    def test_expired_lease_on_last_attempt_fails_and_reports(self, post, report):
+        response = self.submit()
+        AssessmentJob.objects.update(attempts=2)
+        job = claim_next_job("crashed-worker")  # third and last attempt
+        AssessmentJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AssessmentJob.STATUS_FAILED, 3))
+        self.assertIn("lease expired", job.last_error)
+        self.assertIsNone(job.image_payload)
+        report.assert_called_once()
+        self.assertEqual(Assessment.objects.get(id=response.data['id']).processing_status, Assessment.PROCESSING_FAILED)
+        self.assertIsNone(claim_next_job("worker-b"))
+        post.assert_not_called()
+
+    def test_running_job_renews_its_lease(self, post, report):
+        self.submit()
+        job = claim_next_job("worker-a")
+        AssessmentJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(renew_lease(job))
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(AssessmentJob.objects.get(pk=job.pk).status, AssessmentJob.STATUS_RUNNING)
+        job.locked_by = "worker-b"  # lost the job: not renewed under the new owner
+        self.assertFalse(renew_lease(job))
+
+        # run_job keeps renewing while the ML call is slow
+        renewed = []
+        post.side_effect = lambda *args, **kwargs: time.sleep(0.2) or ml_response(200, ML_RESULT)
+        with mock.patch.object(jobs, 'LEASE_RENEW_INTERVAL', timedelta(milliseconds=50)), \
+                mock.patch.object(jobs, 'renew_lease', side_effect=renewed.append):
+            run_job(AssessmentJob.objects.get(pk=job.pk))
+        self.assertGreaterEqual(len(renewed), 2)
+
+    def test_management_command_drains_queue(self, post, report):
+        post.return_value = ml_response(200, ML_RESULT)
+        self.submit()
+        self.submit()
+        out = BytesIO()
+        call_command('process_assessment_jobs', '--once', stdout=mock.Mock(write=lambda s: out.write(s.encode())))
+        self.assertEqual(AssessmentJob.objects.filter(status=AssessmentJob.STATUS_SUCCEEDED).count(), 2)
+        self.assertIn(b'after 2 job(s)', out.getvalue())
+
+        heartbeat = WorkerHeartbeat.objects.get()
+        self.assertEqual(heartbeat.jobs_processed, 2)
+        self.assertEqual(heartbeat.ml_client['successes'], 2)
+        self.assertEqual(heartbeat.ml_client['healthy_replicas'], 1)
+
+
+class IdempotentSubmissionTests(APITestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        self.doctor = Admin.objects.create_user(
+            email='retrydoc@example.com', password='password123', role_type='doctor'
+        )
+        self.patient = Patient.objects.create(
+            first_name="Retry", last_name="Patient", date_of_birth="1980-01-01", gender="Male",
+            admission_date="2023-10-01", ward_department="Surgery",
+            room_bed_number="14", assigning_physician="Dr. Who",
+            primary_diagnosis="Burn"
+        )
+        self.client.force_authenticate(user=self.doctor)
+
+    def submit(self, key=None, patient=None):
+        data = {
+            "patient": (patient or self.patient).id,
+            "wound_type": "Burns",
+            "images[0][full]": SimpleUploadedFile("wound.png", tiny_png(), content_type="image/png"),
+        }
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(reverse('assessments-list'), data, format='multipart', **headers)
+
+    def test_duplicate_key_replays_original_response(self):
+        first = self.submit(key='abc-123')
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        with mock.patch('addpatient.views.save_assessment_images') as create_image, \
+                mock.patch('addpatient.views.enqueue_assessment') as enqueue:
+            second = self.submit(key='abc-123')
+        create_image.assert_not_called()
+        enqueue.assert_not_called()
+
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(second.data['job']['id'], first.data['job']['id'])
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Assessment.objects.count(), 1)
+        self.assertEqual(AssessmentJob.objects.count(), 1)
+
+    def test_without_key_every_request_creates(self):
+        self.submit()
+        self.submit()
+        self.assertEqual(Assessment.objects.count(), 2)
+
+    def test_keys_are_scoped_per_user(self):
+        self.submit(key='shared')
+        other = Admin.objects.create_user(email='otherdoc@example.com', password='password123', role_type='doctor')
+        self.client.force_authenticate(user=other)
+        self.assertNotIn('Idempotent-Replayed', self.submit(key='shared'))
+        self.assertEqual(Assessment.objects.count(), 2)
+
+    def test_key_reused_for_another_patient_is_rejected(self):
+        self.submit(key='abc-123')
+        other_patient = Patient.objects.create(
+            first_name="Other", last_name="Patient", date_of_birth="1990-01-01", gender="Female",
+            admission_date="2023-10-01", ward_department="Surgery",
+            room_bed_number="15", assigning_physician="Dr. Who", primary_diagnosis="Cut"
+        )
+        response = self.submit(key='abc-123', patient=other_patient)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Assessment.objects.count(), 1)
+
+    def test_duplicate_while_original_is_in_progress(self):
+        Assessment.objects.create(patient=self.patient, assessed_by=self.doctor, idempotency_key='busy')
+        response = self.submit(key='busy')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_failed_submission_can_be_retried_with_same_key(self):
+        with mock.patch('addpatient.views.enqueue_assessment', side_effect=RuntimeError("storage down")):
+            with self.assertRaises(RuntimeError):
+                self.submit(key='flaky')
+        self.assertEqual(Assessment.objects.count(), 0)
+
+        response = self.submit(key='flaky')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotIn('Idempotent-Replayed', response)
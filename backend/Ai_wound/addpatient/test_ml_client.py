@@ -0,0 +1,303 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from addpatient.ml_client import CircuitBreaker, CircuitOpenError, MLServiceClient, MLServiceError, reset_ml_client
+from addpatient.models import WorkerHeartbeat
+from admin_page.models import Admin
+
+
+class StubMLService:
+    """Local ML service stand-in: /api/predict answers with the queued status codes (then 200), /health with its load."""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = 0
+        self.connections = set()
+        self.ready = True
+        self.in_flight = 0
+        self.health_status = 200
+        self.health_delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests += 1
+                stub.connections.add(self.client_address)
+                code = stub.statuses.pop(0) if stub.statuses else 200
+                if code == 'garbled':  # a 200 with a body that isn't JSON
+                    code, body = 200, b'<html>upstream reset</html>'
+                else:
+                    body = json.dumps({"wound_type": "Burns"} if code == 200 else {"error": "nope"}).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.health_delay)
+                body = json.dumps({"ready": stub.ready, "load": {"in_flight": stub.in_flight, "max_in_flight": None}})
+                self.send_response(stub.health_status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body.encode())
+                except BrokenPipeError:
+                    pass  # the client gave up waiting (health_delay)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MLServiceClientTests(SimpleTestCase):
+    def setUp(self):
+        self.service = StubMLService()
+        self.addCleanup(self.service.close)
+        self.clock = FakeClock()
+        self.client = MLServiceClient(
+            self.service.url, retries=2, backoff=0.01, failure_threshold=3, reset_timeout=30,
+            health_interval=0, clock=self.clock,
+        )
+        self.addCleanup(self.client.close)
+
+    def test_reuses_pooled_connection(self):
+        for _ in range(3):
+            self.assertEqual(self.client.predict(b'img')['wound_type'], "Burns")
+        self.assertEqual(self.service.requests, 3)
+        self.assertEqual(len(self.service.connections), 1)
+        stats = self.client.stats()
+        self.assertEqual((stats['requests'], stats['successes']), (3, 3))
+        self.assertEqual(stats['latency_ms']['count'], 3)
+        self.assertIsNotNone(stats['latency_ms']['p95'])
+
+    def test_retries_transient_errors_and_rewinds_file(self):
+        self.service.statuses = [503, 502]
+        image = BytesIO(b'img')
+        self.assertEqual(self.client.predict(image)['wound_type'], "Burns")
+        self.assertEqual(self.service.requests, 3)
+        self.assertEqual(self.client.stats()['retries'], 2)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_rejected_input_is_not_retried_and_keeps_circuit_closed(self):
+        self.service.statuses = [400] * 5
+        for _ in range(4):
+            with self.assertRaises(MLServiceError) as ctx:
+                self.client.predict(b'img')
+            self.assertFalse(ctx.exception.retryable)
+        self.assertEqual(self.service.requests, 4)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_fails_fast_then_recovers_through_half_open_probe(self):
+        self.service.statuses = [503] * 3
+        with self.assertRaises(MLServiceError):
+            self.client.predict(b'img')
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        # Open: no request reaches the service
+        with self.assertRaises(CircuitOpenError) as ctx:
+            self.client.predict(b'img')
+        self.assertTrue(ctx.exception.retryable)
+        self.assertEqual(self.service.requests, 3)
+
+        # Failed probe reopens the circuit without retrying
+        self.clock.now = 31
+        self.service.statuses = [503]
+        with self.assertRaises(MLServiceError):
+            self.client.predict(b'img')
+        self.assertEqual(self.service.requests, 4)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        # Successful probe closes it
+        self.clock.now = 62
+        self.assertEqual(self.client.predict(b'img')['wound_type'], "Burns")
+        stats = self.client.stats()
+        self.assertEqual(stats['replicas'][0]['breaker']['state'], CircuitBreaker.CLOSED)
+        self.assertEqual(stats['replicas'][0]['breaker']['times_opened'], 2)
+        self.assertGreaterEqual(stats['short_circuited'], 2)
+
+    def test_unreachable_service_counts_as_failure(self):
+        self.service.close()
+        client = MLServiceClient(self.service.url, retries=0, failure_threshold=1, health_interval=0)
+        self.addCleanup(client.close)
+        with self.assertRaises(MLServiceError) as ctx:
+            client.predict(b'img')
+        self.assertIn("unreachable", str(ctx.exception))
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_malformed_success_body_is_a_retryable_failure(self):
+        self.service.statuses = ['garbled', 'garbled']
+        self.assertEqual(self.client.predict(b'img')['wound_type'], "Burns")
+        self.assertEqual(self.service.requests, 3)
+
+        client = MLServiceClient(self.service.url, retries=0, failure_threshold=1, health_interval=0)
+        self.addCleanup(client.close)
+        self.service.statuses = ['garbled']
+        with self.assertRaisesMessage(MLServiceError, "invalid response"):
+            client.predict(b'img')
+        stats = client.stats()
+        self.assertEqual(stats['replicas'][0]['in_flight'], 0)
+        self.assertEqual(stats['replicas'][0]['breaker']['state'], CircuitBreaker.OPEN)
+
+    def test_in_flight_released_when_the_call_raises_unexpectedly(self):
+        with mock.patch.object(self.client.session, 'post', side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.client.predict(b'img')
+        self.assertEqual(self.client.replicas[0].in_flight, 0)
+
+    def test_single_replica_is_not_polled(self):
+        client = MLServiceClient(self.service.url, health_interval=0.01)
+        self.addCleanup(client.close)
+        client.predict(b'img')
+        self.assertIsNone(client._health_thread)
+
+    def test_half_open_admits_a_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=self.clock)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.clock.now = 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+
+class MultiReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.services = [StubMLService(), StubMLService()]
+        for service in self.services:
+            self.addCleanup(service.close)
+        self.client = MLServiceClient(
+            [service.url for service in self.services], retries=1, backoff=0.01,
+            failure_threshold=2, reset_timeout=30, health_interval=0,
+        )
+        self.addCleanup(self.client.close)
+
+    def test_routes_to_least_loaded_replica(self):
+        busy, idle = self.services
+        busy.in_flight = 3
+        self.client.refresh_health()
+        for _ in range(3):
+            self.client.predict(b'img')
+        self.assertEqual((busy.requests, idle.requests), (0, 3))
+
+        busy.in_flight = idle.in_flight = 0
+        self.client.refresh_health()
+        for _ in range(30):  # ties are broken at random
+            self.client.predict(b'img')
+        self.assertGreater(busy.requests, 0)
+
+    def test_failed_health_check_ejects_replica_until_it_recovers(self):
+        down, up = self.services
+        down.health_status = 500
+        self.client.refresh_health()
+        for _ in range(4):
+            self.client.predict(b'img')
+        self.assertEqual((down.requests, up.requests), (0, 4))
+        self.assertTrue(self.client.stats()['replicas'][0]['ejected'])
+
+        down.health_status = 200
+        self.client.refresh_health()
+        self.assertEqual(self.client.stats()['healthy_replicas'], 2)
+
+    def test_slow_health_check_keeps_replica_routable_but_behind_idle_ones(self):
+        self.client.health_timeout = 0.2
+        self.client.refresh_health()
+        busy, idle = self.services
+        busy.health_delay = 0.5  # e.g. every request thread is running an analysis
+        self.client.refresh_health()
+        replica = self.client.stats()['replicas'][0]
+        self.assertTrue(replica['ready'])
+        self.assertFalse(replica['ejected'])
+        self.assertIn("timed out", replica['health_error'])
+        self.client.predict(b'img')
+        self.assertEqual((busy.requests, idle.requests), (0, 1))
+
+    def test_refused_health_check_ejects_replica(self):
+        up = self.services[0]
+        client = MLServiceClient([up.url, 'http://127.0.0.1:1'], retries=0, health_interval=0)
+        self.addCleanup(client.close)
+        client.refresh_health()
+        self.assertEqual([r['ejected'] for r in client.stats()['replicas']], [False, True])
+        for _ in range(3):
+            client.predict(b'img')
+        self.assertEqual(up.requests, 3)
+
+    def test_not_ready_replica_gets_no_traffic(self):
+        self.services[0].ready = False
+        self.client.refresh_health()
+        self.client.predict(b'img')
+        self.assertEqual(self.services[0].requests, 0)
+
+    def test_failing_replica_is_retried_elsewhere_and_ejected(self):
+        failing, healthy = self.services
+        failing.statuses = [503] * 10
+        for _ in range(6):
+            self.assertEqual(self.client.predict(b'img')['wound_type'], "Burns")
+        stats = self.client.stats()
+        self.assertEqual(failing.requests, 2)  # ejected after failure_threshold
+        self.assertEqual(stats['replicas'][0]['breaker']['state'], CircuitBreaker.OPEN)
+        self.assertEqual(stats['replicas'][1]['successes'], 6)
+        self.assertEqual(stats['healthy_replicas'], 1)
+
+    def test_all_replicas_ejected_fails_fast(self):
+        for service in self.services:
+            service.health_status = 503
+        self.client.refresh_health()
+        with self.assertRaises(CircuitOpenError):
+            self.client.predict(b'img')
+        self.assertEqual(sum(service.requests for service in self.services), 0)
+
+
+@override_settings(ML_HEALTH_INTERVAL=0)
+class MLServiceStatsEndpointTests(APITestCase):
+    def setUp(self):
+        reset_ml_client()
+        self.addCleanup(reset_ml_client)
+        self.admin = Admin.objects.create_superuser(
+            email='mlstats@mediwound.com', password='adminpassword', role_type='admin', full_name='Stats Admin'
+        )
+
+    def test_reports_web_and_worker_stats(self):
+        WorkerHeartbeat.objects.create(
+            worker_id='w1', jobs_processed=4,
+            ml_client={"requests": 9, "replicas": [{"url": "http://ml-2:8001", "ejected": True}]},
+        )
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('ml-service-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['web']['replicas'][0]['breaker']['state'], 'closed')
+        self.assertEqual(response.data['workers'][0]['worker_id'], 'w1')
+        self.assertTrue(response.data['workers'][0]['alive'])
+        self.assertEqual(response.data['ejected_replicas'], ["http://ml-2:8001"])
+
+    def test_requires_admin_role(self):
+        doctor = Admin.objects.create_user(email='doc@mediwound.com', password='password123', role_type='doctor')
+        self.client.force_authenticate(user=doctor)
+        self.assertEqual(self.client.get(reverse('ml-service-stats')).status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,95 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.fields.files import FieldFile
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from addpatient.models import Patient, Assessment, AssessmentImage
+from addpatient.test_jobs import tiny_png, use_temp_media_root
+from addpatient.uploads import save_assessment_images
+from admin_page.models import Admin, SystemFile
+
+
+class AssessmentImageUploadTests(APITestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        self.doctor = Admin.objects.create_user(
+            email='uploaddoc@example.com', password='password123', role_type='doctor'
+        )
+        self.patient = Patient.objects.create(
+            first_name="Upload", last_name="Patient", date_of_birth="1980-01-01", gender="Male",
+            admission_date="2023-10-01", ward_department="Surgery",
+            room_bed_number="16", assigning_physician="Dr. Who",
+            primary_diagnosis="Burn"
+        )
+        self.client.force_authenticate(user=self.doctor)
+
+    def submit(self, count):
+        data = {"patient": self.patient.id, "wound_type": "Burns"}
+        for i in range(count):
+            data[f"images[{i}][full]"] = SimpleUploadedFile(f"wound_{i}_full.png", tiny_png(), content_type="image/png")
+            data[f"images[{i}][selected]"] = SimpleUploadedFile(f"wound_{i}_sel.png", tiny_png(), content_type="image/png")
+            data[f"images[{i}][annotations]"] = f'[{{"x": {i}, "y": 0}}]'
+        return self.client.post(reverse('assessments-list'), data, format='multipart')
+
+    def test_images_are_saved_in_bulk_with_sizes_and_system_files(self):
+        with mock.patch.object(FieldFile, 'size', new_callable=mock.PropertyMock, side_effect=AssertionError("size lookup")):
+            response = self.submit(3)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        images = list(AssessmentImage.objects.filter(assessment_id=response.data['id']).order_by('id'))
+        self.assertEqual([image.annotations[0]['x'] for image in images], [0, 1, 2])
+        for image in images:
+            self.assertTrue(image.full_image.name.startswith('wound_images/full/'))
+            self.assertTrue(image.selected_area_image.name.startswith('wound_images/selected/'))
+            self.assertEqual(image.full_image_size, len(tiny_png()))
+            self.assertTrue(default_storage.exists(image.full_image.name))
+        self.assertEqual(
+            sorted(SystemFile.objects.values_list('file', 'size')),
+            sorted((image.full_image.name, f"{len(tiny_png())} B") for image in images),
+        )
+
+    def test_uploads_run_concurrently(self):
+        active, peak, lock = [0], [0], threading.Lock()
+        real_save = default_storage.save
+
+        def slow_save(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return real_save(*args, **kwargs)
+
+        with mock.patch.object(default_storage, 'save', side_effect=slow_save):
+            response = self.submit(4)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 4)
+
+    def test_failed_upload_cleans_up_stored_files(self):
+        assessment = Assessment.objects.create(patient=self.patient, assessed_by=self.doctor)
+        real_save, stored = default_storage.save, []
+
+        def flaky_save(name, content, max_length=None):
+            if 'broken' in name:
+                raise ConnectionError("upload failed")
+            stored.append(real_save(name, content, max_length=max_length))
+            return stored[-1]
+
+        entries = [
+            (SimpleUploadedFile("ok.png", tiny_png()), SimpleUploadedFile("ok_sel.png", tiny_png()), None),
+            (SimpleUploadedFile("broken.png", tiny_png()), None, None),
+        ]
+        with mock.patch.object(default_storage, 'save', side_effect=flaky_save):
+            with self.assertRaises(ConnectionError):
+                save_assessment_images(assessment, entries)
+        self.assertEqual(len(stored), 2)
+        self.assertFalse(any(default_storage.exists(name) for name in stored))
+        self.assertFalse(AssessmentImage.objects.exists())
@@ -150,10 +150,13 @@ class AssessmentTests(APITestCase):
             "notes": "Healing well."
         }
         response = self.client.post(url, data, format='multipart')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Saved right away; ML analysis and the report are queued for the background workers
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         
         assessment = Assessment.objects.get(id=response.data['id'])
         self.assertEqual(assessment.wound_type, data["wound_type"])
+        self.assertEqual(assessment.processing_status, Assessment.PROCESSING_QUEUED)
+        self.assertEqual(response['Location'], response.data['job']['status_url'])
 
     def test_report_generation(self):
         """Verify that a report can be generated and downloaded."""
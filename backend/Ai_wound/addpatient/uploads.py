@@ -0,0 +1,82 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .models import AssessmentImage, system_file_for_assessment_image
+
+logger = logging.getLogger(__name__)
+
+# Persisting an assessment's photos. Each file upload to media storage (Cloudinary in production)
+# is a network round trip, so all full and selected images are uploaded concurrently through a
+# bounded thread pool. The rows are then inserted with one bulk_create. bulk_create skips post_save,
+# so the SystemFile entries the signal would add are bulk-created here from the sizes known at upload.
+
+UPLOAD_WORKERS = getattr(settings, 'ASSESSMENT_UPLOAD_WORKERS', 4)
+
+
+def _store(field, instance, uploaded_file):
+    """Saves one uploaded file to the field's storage (upload_to applied); returns the stored name."""
+    uploaded_file.seek(0)
+    name = field.generate_filename(instance, uploaded_file.name)
+    return field.storage.save(name, uploaded_file, max_length=field.max_length)
+
+
+def save_assessment_images(assessment, entries, max_workers=None):
+    """
+    entries: [(full_file, selected_file or None, annotations), ...] in display order.
+    Uploads every file concurrently and creates the AssessmentImage rows (and their SystemFile
+    entries) in bulk. If any upload fails, the files already stored are deleted and the error is raised.
+    """
+    if not entries:
+        return []
+    full_field = AssessmentImage._meta.get_field('full_image')
+    selected_field = AssessmentImage._meta.get_field('selected_area_image')
+
+    images = [
+        AssessmentImage(assessment=assessment, annotations=annotations, full_image_size=full_file.size)
+        for full_file, _, annotations in entries
+    ]
+    uploads = []  # (image, field, uploaded file)
+    for image, (full_file, selected_file, _) in zip(images, entries):
+        uploads.append((image, full_field, full_file))
+        if selected_file:
+            uploads.append((image, selected_field, selected_file))
+
+    workers = max(1, min(max_workers or UPLOAD_WORKERS, len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload') as pool:
+        futures = [pool.submit(_store, field, image, uploaded) for image, field, uploaded in uploads]
+        # Wait for all of them (no early exit) so cleanup sees every file that was stored
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append((future.result(), None))
+            except Exception as e:
+                outcomes.append((None, e))
+
+    errors = [error for _, error in outcomes if error is not None]
+    if errors:
+        for (image, field, _), (stored_name, _) in zip(uploads, outcomes):
+            if stored_name:
+                try:
+                    field.storage.delete(stored_name)
+                except Exception:
+                    logger.warning(f"Could not delete orphaned upload {stored_name}")
+        logger.error(f"{len(errors)} of {len(uploads)} image upload(s) failed for assessment {assessment.id}")
+        raise errors[0]
+
+    for (image, field, _), (stored_name, _) in zip(uploads, outcomes):
+        setattr(image, field.attname, stored_name)
+
+    images = AssessmentImage.objects.bulk_create(images)
+
+    # System file listing (the post_save signal doesn't run for bulk_create)
+    from admin_page.models import SystemFile
+    try:
+        SystemFile.objects.bulk_create(
+            [system_file_for_assessment_image(image, image.full_image_size) for image in images]
+        )
+    except Exception as e:
+        logger.error(f"Failed to sync AssessmentImages to SystemFile: {e}")
+    logger.info(f"Saved {len(images)} image(s) ({len(uploads)} upload(s), {workers} in parallel) for assessment {assessment.id}")
+    return images
@@ -7,18 +7,21 @@ from rest_framework.authtoken.models import Token
 # Removed AnonRateThrottle to disable rate limiting on login
 from django.contrib.auth import authenticate, get_user_model
 from django.conf import settings
+from django.db import transaction, IntegrityError
 import logging
 import random
-import requests
 import json
 
-from .models import Patient, Notification, PatientTask, Assessment, AssessmentImage, ChatMessage
+from rest_framework.reverse import reverse
+from .models import Patient, Notification, PatientTask, Assessment, AssessmentJob, ChatMessage
 from .serializers import (
     PatientSerializer, SignupSerializer, NotificationSerializer, 
     AssessmentSerializer, AssessmentImageSerializer, PatientTaskSerializer,
     ChatMessageSerializer, PatientVisitSerializer
 )
 from .reports import generate_assessment_report_pdf
+from .jobs import enqueue_assessment
+from .uploads import save_assessment_images
 
 # Create logger instance
 logger = logging.getLogger(__name__)
@@ -516,148 +519,41 @@ class AssessmentViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         logger.info("Assessment submission received: %s", request.data)
+
+        # Retried submissions (slow ward Wi-Fi) carry the same Idempotency-Key and get the
+        # original assessment back instead of re-uploading images and re-running the analysis
+        idempotency_key = request.headers.get('Idempotency-Key', '').strip() or None
+        if idempotency_key and len(idempotency_key) > 255:
+            return Response({"error": "Idempotency-Key must be at most 255 characters"}, status=status.HTTP_400_BAD_REQUEST)
         
         # 1. Create Assessment
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            assessment = serializer.save(assessed_by=request.user)
-            
-            # 2. Process Images
-            # Expecting fields like images[0][full], images[0][selected], images[0][annotations]
-            # DRF doesn't always handle nested multipart perfectly, so we parse manually if needed
-            
-            image_indices = set()
-            for key in request.data.keys():
-                if key.startswith('images['):
-                    try:
-                        idx = key.split('[')[1].split(']')[0]
-                        image_indices.add(idx)
-                    except:
-                        continue
-            
-            for idx in sorted(image_indices):
-                full_img = request.FILES.get(f'images[{idx}][full]')
-                selected_img = request.FILES.get(f'images[{idx}][selected]')
-                annotations_raw = request.data.get(f'images[{idx}][annotations]')
-                
-                annotations = None
-                if annotations_raw:
-                    try:
-                        annotations = json.loads(annotations_raw)
-                    except:
-                        pass
-                
-                if full_img:
-                    AssessmentImage.objects.create(
-                        assessment=assessment,
-                        full_image=full_img,
-                        selected_area_image=selected_img,
-                        annotations=annotations
-                    )
-            
-            # 3. Call Flask ML Service
-            try:
-                # Use the first image for ML analysis
-                first_image = assessment.images.first()
-                if first_image and first_image.full_image:
-                    import os
-                    # Default to localhost if not specified in .env
-                    ml_url = os.getenv("ML_SERVICE_URL", "http://localhost:8001/api/predict")
-                    
-                    # Ensure URL ends with the correct endpoint
-                    if not ml_url.endswith("/api/predict"):
-                        ml_url = f"{ml_url.rstrip('/')}/api/predict"
-                    
-                    # Check for ROI/Coordinates in annotations
-                    editor_metadata = None
-                    if first_image.annotations:
-                        # Extract points from polygons (assuming first image's first annotation set)
-                        try:
-                            # Format expected by ML service: {"boundary_coordinates": [{"x": 10, "y": 20}, ...]}
-                            # Adjusting based on how frontend sends annotations (usually a list of points/shapes)
-                            coords = first_image.annotations.get('points') or first_image.annotations
-                            if isinstance(coords, list):
-                                editor_metadata = json.dumps({"boundary_coordinates": coords})
-                        except Exception as ann_err:
-                            logger.warning(f"Failed to parse annotations for ROI: {ann_err}")
-                        
-                    with first_image.full_image.open('rb') as img_file:
-                        # Use 'image' as the key to match Flask's request.files['image']
-                        files = {'image': (first_image.full_image.name, img_file, 'image/jpeg')}
-                        data = {}
-                        if editor_metadata:
-                            data['editor_metadata'] = editor_metadata
-                            logger.info("Sending ROI coordinates to ML service")
-
-                        response = requests.post(ml_url, files=files, data=data, timeout=15)
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            assessment.ml_analysis_result = result
-                            
-                            # Map Flask response fields to Django model fields
-                            assessment.wound_type = result.get('wound_type', assessment.wound_type)
-                            assessment.wound_stage = result.get('stage', assessment.wound_stage)
-                            assessment.severity = result.get('severity', assessment.severity)
-                            assessment.wound_area_cm2 = result.get('wound_area_cm2', assessment.wound_area_cm2)
-                            
-                            # Tissue Composition Mapping
-                            tissue = result.get('tissue_composition', {})
-                            if tissue:
-                                assessment.granulation_pct = tissue.get('granulation', assessment.granulation_pct)
-                                assessment.slough_pct = tissue.get('slough', assessment.slough_pct)
-                                assessment.necrotic_pct = tissue.get('necrotic', assessment.necrotic_pct)
-                                assessment.epithelial_pct = tissue.get('epithelial', assessment.epithelial_pct)
-
-                            dims = result.get('dimensions', {})
-                            if dims:
-                                assessment.length = dims.get('length', assessment.length)
-                                assessment.width = dims.get('width', assessment.width)
-                                assessment.depth = dims.get('depth', assessment.depth)
-                            
-                            assessment.cure_recommendation = result.get('cure_recommendation', assessment.cure_recommendation)
-                            
-                            # Use confidence_score and healing_index directly from ML response
-                            assessment.confidence_score = result.get('confidence_score', assessment.confidence_score)
-                            assessment.healing_index = result.get('healing_index', assessment.healing_index)
-                            
-                            # Store processing steps
-                            assessment.algorithm_analysis = result.get('algorithm_analysis')
-                            
-                            logger.info(f"Populated AI fields for assessment {assessment.id}: Type={assessment.wound_type}, Severity={assessment.severity}, Area={assessment.wound_area_cm2}cm²")
-                            
-                            # --- Reduction Rate Calculation ---
-                            try:
-                                prev_assessment = Assessment.objects.filter(
-                                    patient=assessment.patient
-                                ).exclude(id=assessment.id).order_by('-created_at').first()
-                                
-                                if prev_assessment and prev_assessment.length and prev_assessment.width:
-                                    prev_area = float(prev_assessment.length) * float(prev_assessment.width)
-                                    curr_area = float(assessment.length) * float(assessment.width)
-                                    
-                                    if prev_area > 0:
-                                        reduction = ((prev_area - curr_area) / prev_area) * 100
-                                        assessment.reduction_rate = round(reduction, 2)
-                                        logger.info(f"Reduction rate calculated: {assessment.reduction_rate}%")
-                            except Exception as e:
-                                logger.error(f"Failed to calculate reduction rate: {e}")
-                            
-                            assessment.save()
-                        else:
-                            logger.error(f"ML Service error: {response.status_code} - {response.text}")
-            except Exception as e:
-                logger.error(f"Failed to call ML Service: {e}")
- 
-            # 4. Generate/Regenerate Report (Always do this to ensure it exists with best data)
+            if idempotency_key:
+                existing = None
+                try:
+                    with transaction.atomic():
+                        # Lock the submitting user's row so concurrent duplicates check the key one at a time
+                        User.objects.select_for_update().filter(pk=request.user.pk).exists()
+                        existing = Assessment.objects.filter(
+                            assessed_by=request.user, idempotency_key=idempotency_key
+                        ).first()
+                        if existing is None:
+                            assessment = serializer.save(assessed_by=request.user, idempotency_key=idempotency_key)
+                except IntegrityError:
+                    # Lost a race the lock didn't cover (e.g. no row lock support); the winner's row exists now
+                    existing = Assessment.objects.get(assessed_by=request.user, idempotency_key=idempotency_key)
+                if existing is not None:
+                    return self._replay_submission(request, existing, serializer.validated_data['patient'])
+            else:
+                assessment = serializer.save(assessed_by=request.user)
+
             try:
-                report_success = generate_assessment_report_pdf(assessment.id)
-                if report_success:
-                    logger.info(f"Automated report generated for assessment {assessment.id}")
-                else:
-                    logger.error(f"Failed to generate automated report for assessment {assessment.id}")
-            except Exception as e:
-                logger.error(f"Error during report generation: {e}")
+                job = self._save_images_and_enqueue(request, assessment)
+            except Exception:
+                # Don't leave a half-saved assessment behind: a retry with the same key starts over
+                assessment.delete()
+                raise
  
             # Log Activity
             try:
@@ -672,10 +568,99 @@ class AssessmentViewSet(viewsets.ModelViewSet):
             except Exception as e:
                 logger.error(f"Failed to log assessment activity: {e}")
 
-            return Response(AssessmentSerializer(assessment).data, status=status.HTTP_201_CREATED)
+            return self._accepted_response(request, assessment, job)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _save_images_and_enqueue(self, request, assessment):
+        # 2. Process Images
+        # Expecting fields like images[0][full], images[0][selected], images[0][annotations]
+        # DRF doesn't always handle nested multipart perfectly, so we parse manually if needed
+        
+        image_indices = set()
+        for key in request.data.keys():
+            if key.startswith('images['):
+                try:
+                    idx = key.split('[')[1].split(']')[0]
+                    image_indices.add(idx)
+                except:
+                    continue
+        
+        entries = []
+        for idx in sorted(image_indices):
+            full_img = request.FILES.get(f'images[{idx}][full]')
+            selected_img = request.FILES.get(f'images[{idx}][selected]')
+            annotations_raw = request.data.get(f'images[{idx}][annotations]')
+            
+            annotations = None
+            if annotations_raw:
+                try:
+                    annotations = json.loads(annotations_raw)
+                except:
+                    pass
+            
+            if full_img:
+                entries.append((full_img, selected_img, annotations))
+
+        # All files are uploaded concurrently, then the rows are inserted in one query
+        save_assessment_images(assessment, entries)
+        analysis_image = entries[0][0] if entries else None
+        
+        # 3. Queue ML analysis + report generation for the background workers
+        # (manage.py process_assessment_jobs) instead of holding this request open for them.
+        # The first image's bytes go with the job, so the worker doesn't download them back.
+        return enqueue_assessment(assessment, image_file=analysis_image)
+
+    def _accepted_response(self, request, assessment, job):
+        status_url = reverse('assessments-status', kwargs={'pk': assessment.id}, request=request)
+        data = AssessmentSerializer(assessment, context=self.get_serializer_context()).data
+        data['job'] = {'id': job.id, 'status': job.status, 'status_url': status_url}
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
+
+    def _replay_submission(self, request, assessment, patient):
+        """Answer to a repeated Idempotency-Key: the original 202 response, nothing is redone."""
+        if assessment.patient_id != patient.pk:
+            return Response(
+                {"error": "This Idempotency-Key was already used for an assessment of another patient"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        job = assessment.jobs.order_by('-id').first()
+        if job is None:
+            # The original request is still saving its images
+            return Response(
+                {"error": "A request with this Idempotency-Key is still in progress"},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '2'}
+            )
+        logger.info(f"Replaying assessment {assessment.id} for repeated Idempotency-Key")
+        response = self._accepted_response(request, assessment, job)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='status', url_name='status')
+    def processing_status(self, request, pk=None):
+        """Progress of the background processing started by create(); includes the assessment once done."""
+        assessment = self.get_object()
+        job = assessment.jobs.order_by('-id').first()
+        data = {
+            'assessment_id': assessment.id,
+            'processing_status': assessment.processing_status,
+            'job': None,
+        }
+        if job:
+            data['job'] = {
+                'id': job.id,
+                'status': job.status,
+                'attempts': job.attempts,
+                'max_attempts': job.max_attempts,
+                'last_error': job.last_error or None,
+                'next_attempt_at': job.run_after if job.status == AssessmentJob.STATUS_QUEUED else None,
+                'finished_at': job.finished_at,
+                'timings': job.timings,
+            }
+        if assessment.processing_status in (Assessment.PROCESSING_COMPLETED, Assessment.PROCESSING_FAILED):
+            data['assessment'] = AssessmentSerializer(assessment, context=self.get_serializer_context()).data
+        return Response(data)
+
     @action(detail=True, methods=['get'])
     def download_report(self, request, pk=None):
         from django.http import FileResponse
@@ -0,0 +1,208 @@
+"""
+Throughput benchmark: ContentAddressedStorage (on-prem) vs CloudinaryMediaStorage.
+The Cloudinary path runs against a local stand-in for the upload API and delivery URLs, so it
+measures the backend's own cost (SDK multipart encoding, HTTP round trips, download and disk
+cache) without the internet; --latency-ms adds a per-request delay to model the round trip.
+For each backend: uploads (with --duplicates of them repeating earlier content), cold reads
+and warm reads, at --concurrency parallel threads.
+    python manage.py benchmark_storage
+    python manage.py benchmark_storage --files 200 --size-kb 2048 --concurrency 8 --latency-ms 40 --output storage.json
+"""
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cloudinary
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from Ai_wound.storage_backends import CloudinaryMediaStorage, ContentAddressedStorage, reset_media_cache
+from addpatient.ml_client import percentile
+
+
+class CloudinaryStandIn:
+    """Local stand-in for Cloudinary: the upload API (single and chunked uploads) and delivery GETs."""
+
+    def __init__(self, latency=0.0):
+        self.stored = {}
+        self._partial = {}
+        self._lock = threading.Lock()
+        self._sequence = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+            disable_nagle_algorithm = True  # else small responses wait on delayed ACKs (~40 ms)
+
+            def do_POST(self):
+                time.sleep(latency)
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                boundary = self.headers['Content-Type'].split('boundary=')[1].encode()
+                fields = {}
+                for part in body.split(b'--' + boundary)[1:-1]:
+                    headers, _, value = part.partition(b'\r\n\r\n')
+                    field = headers.split(b'name="')[1].split(b'"')[0].decode()
+                    fields[field] = value[:-2]  # trailing CRLF
+                data = fields['file']
+                content_range = self.headers.get('Content-Range')
+                if content_range:
+                    _, end, total = map(int, content_range.split(' ')[1].replace('/', '-').split('-'))
+                    upload_id = self.headers['X-Unique-Upload-Id']
+                    with stand_in._lock:
+                        buffer = stand_in._partial.setdefault(upload_id, bytearray())
+                        buffer.extend(data)
+                        if end + 1 < total:
+                            return self.reply({"done": False})
+                        data = bytes(stand_in._partial.pop(upload_id))
+                with stand_in._lock:
+                    stand_in._sequence += 1
+                    public_id = f"{fields.get('folder', b'').decode()}/bench_{stand_in._sequence}"
+                    stand_in.stored[public_id] = data
+                self.reply({"public_id": public_id, "bytes": len(data), "resource_type": "raw"})
+
+            def do_GET(self):
+                time.sleep(latency)
+                data = stand_in.stored.get(self.path.lstrip('/'))
+                if data is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def reply(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_phase(operation, items, concurrency):
+    """Runs operation(item) -> bytes handled over items in parallel; returns throughput and latency."""
+    latencies = []
+
+    def timed(item):
+        started = time.perf_counter()
+        handled = operation(item)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return handled
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        total_bytes = sum(pool.map(timed, items))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops": len(items),
+        "seconds": round(elapsed, 3),
+        "ops_per_s": round(len(items) / elapsed, 1),
+        "mb_per_s": round(total_bytes / (1024 * 1024) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+def benchmark_backend(storage, payloads, concurrency):
+    names = []
+
+    def upload(payload):
+        names.append(storage.save('wound_images/full/bench.jpg', ContentFile(payload, name='bench.jpg')))
+        return len(payload)
+
+    def read(name):
+        with storage.open(name) as f:
+            return len(f.read())
+
+    results = {"upload": run_phase(upload, payloads, concurrency)}
+    results["read_cold"] = run_phase(read, names, concurrency)
+    results["read_warm"] = run_phase(read, names, concurrency)
+    results["distinct_files"] = len(set(names))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks media storage throughput: content-addressed local storage vs Cloudinary (local stand-in)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=50, help='Files uploaded per backend.')
+        parser.add_argument('--size-kb', type=int, default=1024, help='Size of each file.')
+        parser.add_argument('--duplicates', type=float, default=0.2,
+                            help='Fraction of uploads that repeat earlier content (exercises deduplication).')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel uploads/reads.')
+        parser.add_argument('--latency-ms', type=float, default=0.0,
+                            help='Delay the Cloudinary stand-in adds to every request (network round trip).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default=None, help='Write the report JSON here.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size = options['size_kb'] * 1024
+        payloads = []
+        for _ in range(options['files']):
+            if payloads and rng.random() < options['duplicates']:
+                payloads.append(rng.choice(payloads))
+            else:
+                payloads.append(rng.randbytes(size))  # random bytes: incompressible, like JPEGs
+        self.stdout.write(f"{len(payloads)} files of {options['size_kb']} KB "
+                          f"({len(set(payloads))} distinct), concurrency {options['concurrency']}")
+
+        report = {"files": len(payloads), "size_kb": options['size_kb'], "concurrency": options['concurrency'],
+                  "latency_ms": options['latency_ms'], "backends": {}}
+        with tempfile.TemporaryDirectory(prefix='storage_bench_') as scratch:
+            report["backends"]["content_addressed"] = benchmark_backend(
+                ContentAddressedStorage(location=f"{scratch}/cas"), payloads, options['concurrency']
+            )
+            report["backends"]["cloudinary_stand_in"] = self.benchmark_cloudinary(
+                payloads, options, f"{scratch}/media_cache"
+            )
+
+        for backend, results in report["backends"].items():
+            self.stdout.write(self.style.SUCCESS(f"{backend} ({results['distinct_files']} files stored)"))
+            for phase in ('upload', 'read_cold', 'read_warm'):
+                r = results[phase]
+                self.stdout.write(f"  {phase:<10} {r['mb_per_s']:>8} MB/s {r['ops_per_s']:>8} ops/s "
+                                  f"p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms")
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def benchmark_cloudinary(self, payloads, options, cache_dir):
+        stand_in = CloudinaryStandIn(latency=options['latency_ms'] / 1000.0)
+        config = cloudinary.config()
+        saved = {key: getattr(config, key, None) for key in ('upload_prefix', 'cloud_name', 'api_key', 'api_secret')}
+        cloudinary.config(upload_prefix=stand_in.url, cloud_name='bench', api_key='bench', api_secret='bench')
+
+        class StandInStorage(CloudinaryMediaStorage):
+            def _signed_url(self, name):
+                return f"{stand_in.url}/{name}"
+
+        try:
+            with override_settings(MEDIA_CACHE_DIR=cache_dir, MEDIA_CACHE_MAX_BYTES=1024 ** 3):
+                reset_media_cache()
+                return benchmark_backend(StandInStorage(), payloads, options['concurrency'])
+        finally:
+            reset_media_cache()
+            cloudinary.config(**saved)
+            stand_in.close()
@@ -8,6 +8,7 @@ from .views import (
     SystemStatsAPIView,
     SystemFileViewSet,
     SystemStorageStatsAPIView,
+    MLServiceStatsAPIView,
     CheckPhoneUniqueAPIView
 )
 
@@ -22,5 +23,6 @@ urlpatterns = [
     path('users/<int:pk>/', UserDetailAPIView.as_view(), name='user-detail'),
     path('stats/', SystemStatsAPIView.as_view(), name='system-stats'),
     path('storage-stats/', SystemStorageStatsAPIView.as_view(), name='storage-stats'),
+    path('ml-service-stats/', MLServiceStatsAPIView.as_view(), name='ml-service-stats'),
     path('', include(router.urls)),
 ]
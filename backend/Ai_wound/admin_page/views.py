@@ -380,6 +380,15 @@ class SystemStorageStatsAPIView(APIView):
             ]
         }
         
+        # Local read-through cache of downloaded media (this process's hit/miss counters)
+        try:
+            from Ai_wound.storage_backends import get_media_cache, get_metadata_cache
+            media_cache = get_media_cache()
+            stats["media_cache"] = media_cache.stats() if media_cache else None
+            stats["media_metadata_cache"] = get_metadata_cache().stats()
+        except Exception as e:
+            logger.error(f"Error reading media cache stats: {e}")
+
         # Store in cache for 1 minute (60 seconds)
         cache.set(cache_key, stats, 60)
         return Response(stats)
@@ -420,3 +429,40 @@ class SystemStatsAPIView(APIView):
         # Store in cache for 10 minutes (600 seconds)
         cache.set(cache_key, stats, 600)
         return Response(stats)
+
+
+class MLServiceStatsAPIView(APIView):
+    """
+    ML service routing health: per-replica readiness, queue depth, circuit breaker state and call
+    latency as seen by this web process and by every assessment worker that reported recently
+    (workers make the ML calls).
+    """
+    permission_classes = [permissions.IsAuthenticated, isAdminRole]
+
+    def get(self, request):
+        from django.utils import timezone
+        from addpatient.ml_client import get_ml_client
+        from addpatient.models import WorkerHeartbeat
+
+        stale_after = timedelta(minutes=5)
+        now = timezone.now()
+        workers = [
+            {
+                "worker_id": hb.worker_id,
+                "alive": now - hb.last_seen < stale_after,
+                "last_seen": hb.last_seen,
+                "started_at": hb.started_at,
+                "jobs_processed": hb.jobs_processed,
+                "ml_client": hb.ml_client,
+            }
+            for hb in WorkerHeartbeat.objects.filter(last_seen__gte=now - timedelta(days=1))
+        ]
+        web = get_ml_client().stats()
+        # A replica counts as ejected if any live process currently routes around it
+        views = [web] + [w["ml_client"] for w in workers if w["alive"]]
+        ejected = sorted({r["url"] for v in views for r in v.get("replicas", []) if r.get("ejected")})
+        return Response({
+            "web": web,
+            "workers": workers,
+            "ejected_replicas": ejected,
+        })
@@ -7,10 +7,11 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # Suppress TF logging
 os.environ['MPLBACKEND'] = 'Agg'        # Headless matplotlib
 
 import tensorflow as tf
-# --- RESOURCE OPTIMIZATION: Limit TF to 1 thread for Render Free Tier ---
-# This prevents CPU thrashing and memory spikes on shared instances.
-tf.config.threading.set_intra_op_parallelism_threads(1)
-tf.config.threading.set_inter_op_parallelism_threads(1)
+# --- RESOURCE OPTIMIZATION: Size TF/OpenCV thread pools to the container ---
+# Reads the cgroup CPU quota and worker count (1 thread on Render Free Tier),
+# preventing CPU thrashing on shared instances without wasting bigger machines.
+from thread_tuning import tune_thread_pools
+THREAD_CONFIG = tune_thread_pools()
 
 # Enable memory growth to prevent TF from pre-allocating all RAM
 gpus = tf.config.list_physical_devices('GPU')
@@ -25,7 +26,9 @@ import cv2
 import numpy as np
 import json
 import tempfile
+import threading
 import traceback
+from training_profiler import current_rss_bytes, peak_rss_bytes
 
 app = Flask(__name__)
 # Explicitly whitelist all origins and methods so CORS headers are sent even
@@ -45,6 +48,15 @@ classes = None
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 analyzer = None
 
+# --- LOAD SHEDDING: with ML_MAX_IN_FLIGHT set, extra concurrent requests get an immediate 503 ---
+# (with Retry-After) instead of queueing behind the worker until the caller times out. 0 = unlimited.
+MAX_IN_FLIGHT = int(os.environ.get("ML_MAX_IN_FLIGHT", "0"))
+admission = threading.BoundedSemaphore(MAX_IN_FLIGHT) if MAX_IN_FLIGHT > 0 else None
+shed_requests = 0
+# Analyses currently running, reported on /health so clients can route to the least-loaded replica
+in_flight = 0
+in_flight_lock = threading.Lock()
+
 def get_analyzer():
     global analyzer, classes
     if analyzer is None:
@@ -74,16 +86,29 @@ def get_analyzer():
                 print(f"ℹ️ GPU Memory config skipped: {e}")
 
             # Determine weights paths
-            classifier_path = os.path.join(BASE_DIR, "models", "wound_classifier.keras")
+            # ML_CLASSIFIER_MODEL switches to another classifier file, e.g. the distilled student
+            classifier_name = os.environ.get("ML_CLASSIFIER_MODEL", "wound_classifier.keras")
+            classifier_path = os.path.join(BASE_DIR, "models", classifier_name)
             if not os.path.exists(classifier_path):
+                print(f"⚠️ {classifier_name} not found, falling back to wound_classifier.h5")
                 classifier_path = os.path.join(BASE_DIR, "models", "wound_classifier.h5")
             
             segmentation_path = os.path.join(BASE_DIR, "models", "wound_segmentation_model.h5")
+
+            # --- LATENCY TIERS: optional cheaper model variants, chosen per request by load ---
+            # models/variants.json (or ML_VARIANTS) lists them best-first; ML_LATENCY_SLO_MS overrides its SLO
+            from analysis.model_variants import read_manifest, DEFAULT_MANIFEST, DEFAULT_SLO_MS
+            manifest_path = os.environ.get("ML_VARIANTS", os.path.join(BASE_DIR, "models", DEFAULT_MANIFEST))
+            variant_specs, manifest_slo = read_manifest(manifest_path)
+            latency_slo_ms = float(os.environ.get("ML_LATENCY_SLO_MS", manifest_slo or DEFAULT_SLO_MS))
             
             from analysis.wound_analyzer import WoundAnalyzer
             analyzer = WoundAnalyzer(
                 classifier_path=classifier_path,
-                segmentation_path=segmentation_path
+                segmentation_path=segmentation_path,
+                variants=variant_specs,
+                latency_slo_ms=latency_slo_ms,
+                warm_up=True
             )
             print("✅ AI Analyzer Loaded Successfully.")
         except Exception as e:
@@ -124,6 +149,25 @@ def predict():
     if not analyzer_instance:
         return jsonify({"error": "AI Analyzer not initialized"}), 500
 
+    # Optional: pin a model variant (benchmarks, A/B checks); otherwise chosen by current load
+    requested_variant = request.form.get('model_variant') or None
+    if requested_variant:
+        try:
+            analyzer_instance.selector.get(requested_variant)
+        except KeyError as e:
+            return jsonify({"error": str(e.args[0])}), 400
+
+    global shed_requests
+    if admission is not None and not admission.acquire(blocking=False):
+        shed_requests += 1
+        print(f"🚦 Shedding request: {MAX_IN_FLIGHT} analyses already in flight")
+        response = jsonify({"error": "AI service overloaded, retry shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    global in_flight
+    with in_flight_lock:
+        in_flight += 1
     try:
         # Save to temp file
         tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
@@ -133,7 +177,8 @@ def predict():
 
         # Run Core AI Algorithm (Handles Type, Severity, Dimensions, Composition)
         print("🧠 Running AI Analysis via WoundAnalyzer...")
-        results, _, _ = analyzer_instance.analyze_wound(tmp_path, editor_metadata=editor_data)
+        results, _, _ = analyzer_instance.analyze_wound(tmp_path, editor_metadata=editor_data,
+                                                        variant=requested_variant)
         
         # Cleanup
         os.remove(tmp_path)
@@ -168,17 +213,21 @@ def predict():
         results["cure_recommendation"] = recommendations.get(results["wound_type"], "Continue standard wound care protocols.")
 
         # Algorithm analysis steps
+        input_w, input_h = analyzer_instance.selector.get(results["model_variant"]).classifier_size
         results["algorithm_analysis"] = [
-            "Image normalized to 224x224 RGB",
+            f"Image normalized to {input_w}x{input_h} RGB",
             f"Wound classification: {results['wound_type']} ({results['confidence_score']}% confidence)",
             f"Tissue analysis: {results['tissue_composition']['granulation']}% Granulation",
             f"Severity assessment: {results['severity']}",
             "Morphological analysis complete"
         ]
 
-        print(f"✅ Prediction complete: {results['wound_type']} | Severity: {results['severity']}")
+        print(f"✅ Prediction complete: {results['wound_type']} | Severity: {results['severity']} "
+              f"| Variant: {results['model_variant']}")
         
-        return jsonify(results), 200
+        response = jsonify(results)
+        response.headers["X-Model-Variant"] = results["model_variant"]
+        return response, 200
         
     except Exception as e:
         error_msg = traceback.format_exc()
@@ -187,12 +236,26 @@ def predict():
             f.write(error_msg + "\n")
         print(f"❌ Prediction error: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        with in_flight_lock:
+            in_flight -= 1
+        if admission is not None:
+            admission.release()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
-        "analyzer_initialized": analyzer is not None
+        "analyzer_initialized": analyzer is not None,
+        "ready": analyzer is not None,
+        "load": {"in_flight": in_flight, "max_in_flight": MAX_IN_FLIGHT or None},
+        "thread_config": THREAD_CONFIG,
+        "model_variants": analyzer.selector.stats() if analyzer is not None else None,
+        "load_shedding": {"shed_requests": shed_requests},
+        "memory": {
+            "rss_mb": round(current_rss_bytes() / (1024 * 1024), 1),
+            "peak_rss_mb": round(peak_rss_bytes() / (1024 * 1024), 1),
+        }
     }), 200
 
 # EAGER LOADING: Pre-initialize analyzer on startup (Module Level)
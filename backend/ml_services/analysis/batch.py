@@ -0,0 +1,161 @@
+import os
+import glob
+import json
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from analysis.tissue_analysis import finish_analysis
+
+# Offline re-analysis of many images with one WoundAnalyzer (models loaded once).
+# The stages overlap:
+#   decode threads -> bounded prefetch queue -> batched inference (this process)
+#   -> tissue analysis (worker processes) -> JSONL output
+# Every finished image is appended to the output right away. Re-running with the same output
+# file skips images that already have a result, so an interrupted job picks up where it stopped.
+# TensorFlow never loads in the workers: tissue analysis is plain OpenCV/NumPy (analysis/tissue_analysis.py).
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+def resolve_images(source):
+    """A directory (searched recursively) or a glob pattern -> sorted list of image paths."""
+    if os.path.isdir(source):
+        paths = [os.path.join(root, name) for root, _, files in os.walk(source) for name in files]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+
+def completed_images(output_path):
+    """Images that already have a successful result in the JSONL output (failed ones are retried)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # last line cut short by an interrupted run
+            if "error" not in record:
+                done.add(record["image"])
+    return done
+
+def _open_output(output_path, resume):
+    if not resume:
+        return open(output_path, "w")
+    out = open(output_path, "a+")
+    # Start on a fresh line if the previous run was killed mid-record
+    if out.tell() > 0:
+        out.seek(out.tell() - 1)
+        if out.read(1) != "\n":
+            out.write("\n")
+    return out
+
+def prefetch(analyzer, image_paths, variant=None, workers=4, depth=32):
+    """
+    Yields (path, prepared, error) in input order while up to `depth` images are decoded ahead
+    by `workers` threads (OpenCV releases the GIL).
+    """
+    pending = queue.Queue(maxsize=depth)
+
+    def feed():
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path in image_paths:
+                pending.put((path, pool.submit(analyzer.prepare, path, None, variant)))
+        pending.put(None)
+
+    threading.Thread(target=feed, daemon=True).start()
+    while (item := pending.get()) is not None:
+        path, future = item
+        try:
+            yield path, future.result(), None
+        except Exception as e:
+            yield path, None, e
+
+def run_batch(analyzer, image_paths, output_path, batch_size=16, prefetch_depth=32, decode_workers=4,
+              tissue_workers=0, pixel_to_cm_ratio=0.0264, variant=None, resume=True):
+    """
+    Analyzes image_paths and appends one JSON line per image to output_path:
+    {"image": <absolute path>, "model_variant": ..., <analyze_wound results>} or {"image": ..., "error": ...}.
+    tissue_workers=0 runs tissue analysis in this process. Returns a summary dict.
+    """
+    image_paths = [os.path.abspath(p) for p in image_paths]
+    done = completed_images(output_path) if resume else set()
+    todo = [p for p in image_paths if p not in done]
+    variant_name = (analyzer.selector.get(variant) if variant else analyzer.selector.variants[0]).name
+    summary = {"total": len(image_paths), "skipped": len(image_paths) - len(todo), "analyzed": 0, "failed": 0}
+    if summary["skipped"]:
+        print(f"⏭️ Skipping {summary['skipped']} image(s) already in {output_path}")
+
+    pool = None
+    if tissue_workers > 0:
+        # spawn: workers must not inherit TensorFlow's threads from this process
+        pool = ProcessPoolExecutor(max_workers=tissue_workers, mp_context=multiprocessing.get_context("spawn"))
+    pending = set()
+    max_pending = max(2 * batch_size, 4 * tissue_workers)
+    start = time.perf_counter()
+
+    with _open_output(output_path, resume) as out:
+        def write(path, results=None, error=None):
+            record = {"image": path, "error": str(error)} if error is not None else \
+                {"image": path, "model_variant": variant_name, **results}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            summary["failed" if error is not None else "analyzed"] += 1
+            finished = summary["analyzed"] + summary["failed"]
+            if finished % 50 == 0 or finished == len(todo):
+                print(f"  {finished}/{len(todo)} images ({finished / (time.perf_counter() - start):.1f}/s)")
+
+        def collect(block):
+            nonlocal pending
+            if not pending:
+                return
+            finished, pending = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    results, _ = future.result()
+                    write(future.image_path, results)
+                except Exception as e:
+                    write(future.image_path, error=e)
+
+        def analyze(batch):
+            paths, prepared = zip(*batch)
+            class_preds, seg_preds = analyzer.infer(list(prepared), variant)
+            for path, item, preds, seg in zip(paths, prepared, class_preds, seg_preds):
+                args = (item["original_img"], item["user_mask_lr"], preds, seg, analyzer.classes, pixel_to_cm_ratio)
+                if pool is None:
+                    try:
+                        write(path, finish_analysis(*args)[0])
+                    except Exception as e:
+                        write(path, error=e)
+                    continue
+                future = pool.submit(finish_analysis, *args)
+                future.image_path = path
+                pending.add(future)
+                while len(pending) >= max_pending:
+                    collect(block=True)
+            collect(block=False)
+
+        try:
+            batch = []
+            for path, prepared, error in prefetch(analyzer, todo, variant, decode_workers, prefetch_depth):
+                if error is not None:
+                    write(path, error=error)
+                    continue
+                batch.append((path, prepared))
+                if len(batch) == batch_size:
+                    analyze(batch)
+                    batch = []
+            if batch:
+                analyze(batch)
+            while pending:
+                collect(block=True)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    summary["elapsed_s"] = round(time.perf_counter() - start, 1)
+    processed = summary["analyzed"] + summary["failed"]
+    summary["images_per_sec"] = round(processed / summary["elapsed_s"], 2) if summary["elapsed_s"] else 0.0
+    return summary
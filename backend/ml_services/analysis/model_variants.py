@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from compression.quantization import load_model
+
+# Latency-tiered model variants.
+# WoundAnalyzer can hold several classifier + U-Net pairs (e.g. 224 at full width, 160 at a
+# narrower width), listed best-first in models/variants.json. VariantSelector picks one per
+# request: it predicts the latency of each variant from the number of requests in flight and
+# that variant's recent service time, and serves the best one predicted to meet the latency
+# SLO, degrading to cheaper variants as the queue grows.
+
+DEFAULT_MANIFEST = "variants.json"
+DEFAULT_SLO_MS = 2000.0
+
+class ModelVariant:
+    """One servable classifier + segmenter pair. Input sizes are read from the models themselves."""
+    def __init__(self, name, classifier, segmenter):
+        self.name = name
+        self.classifier = classifier
+        self.segmenter = segmenter
+        self.classifier_size = tuple(int(d) for d in classifier.input_shape[1:3][::-1])
+        self.segmenter_size = tuple(int(d) for d in segmenter.input_shape[1:3][::-1])
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "classifier_input": list(self.classifier_size),
+            "segmenter_input": list(self.segmenter_size),
+            # TFLite variants don't expose a parameter count
+            "params": int(self.classifier.count_params() + self.segmenter.count_params())
+                      if hasattr(self.classifier, "count_params") and hasattr(self.segmenter, "count_params") else None,
+        }
+
+def load_variants(specs, models_dir="models"):
+    """
+    specs: [{"name", "classifier", "segmenter"}, ...] best-first, paths relative to models_dir.
+    Keras files and exported .tflite files (see export_models.py) can be mixed.
+    Variants whose files are missing are skipped with a warning.
+    """
+    variants = []
+    for spec in specs:
+        classifier_path = os.path.join(models_dir, spec["classifier"])
+        segmenter_path = os.path.join(models_dir, spec["segmenter"])
+        missing = [p for p in (classifier_path, segmenter_path) if not os.path.exists(p)]
+        if missing:
+            print(f"⚠️ Skipping model variant '{spec['name']}': missing {', '.join(missing)}")
+            continue
+        print(f"📦 Loading model variant '{spec['name']}'...")
+        variants.append(ModelVariant(
+            spec["name"],
+            load_model(classifier_path),
+            load_model(segmenter_path),
+        ))
+    return variants
+
+def read_manifest(path):
+    """Returns (variant specs, latency_slo_ms or None) from a variants.json manifest, or (None, None) if absent."""
+    if not path or not os.path.exists(path):
+        return None, None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    return manifest.get("variants", []), manifest.get("latency_slo_ms")
+
+class VariantSelector:
+    """
+    Picks a variant per request from queue depth and a latency SLO.
+
+    Each variant keeps an exponentially weighted moving average of its service time (seeded by
+    warm-up calls). With `depth` requests already in flight a new request is expected to take
+    about (depth + 1) * service_time on a CPU-bound worker, so the selector serves the first
+    (best) variant whose prediction fits within headroom * slo_ms, and the cheapest one when
+    none does. Thread-safe; the Flask worker's request threads share one selector.
+    """
+    def __init__(self, variants, slo_ms=DEFAULT_SLO_MS, headroom=0.8, smoothing=0.2):
+        if not variants:
+            raise ValueError("VariantSelector needs at least one model variant")
+        self.variants = list(variants)
+        self.slo_ms = float(slo_ms)
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.service_ms = {v.name: None for v in self.variants}
+        self.served = {v.name: 0 for v in self.variants}
+        self.slo_misses = {v.name: 0 for v in self.variants}
+        self.degraded = 0
+
+    def get(self, name):
+        for variant in self.variants:
+            if variant.name == name:
+                return variant
+        raise KeyError(f"Unknown model variant '{name}' (available: {', '.join(v.name for v in self.variants)})")
+
+    def observe(self, name, elapsed_ms):
+        """Folds one measured service time (ms) into the variant's moving average."""
+        with self._lock:
+            previous = self.service_ms[name]
+            self.service_ms[name] = elapsed_ms if previous is None else (
+                (1 - self.smoothing) * previous + self.smoothing * elapsed_ms
+            )
+
+    def _predicted_ms(self, variant, depth):
+        service = self.service_ms[variant.name]
+        return None if service is None else (depth + 1) * service
+
+    def acquire(self, requested=None):
+        """
+        Admits one request and returns (variant, decision). decision records the queue depth seen,
+        the predicted latency and whether a cheaper variant was chosen because of load.
+        Every acquire() must be paired with release(decision, elapsed_ms).
+        """
+        with self._lock:
+            depth = self.in_flight
+            self.in_flight += 1
+            budget = self.headroom * self.slo_ms
+
+            if requested is not None:
+                chosen = self.get(requested)
+            else:
+                # Unmeasured variants count as fitting, so each gets measured at least once
+                fits = [v for v in self.variants
+                        if self._predicted_ms(v, depth) is None or self._predicted_ms(v, depth) <= budget]
+                if fits:
+                    chosen = fits[0]
+                else:
+                    chosen = min(self.variants, key=lambda v: self.service_ms[v.name])
+            if chosen is not self.variants[0] and requested is None:
+                self.degraded += 1
+
+            predicted = self._predicted_ms(chosen, depth)
+            decision = {
+                "variant": chosen.name,
+                "queue_depth": depth,
+                "predicted_ms": round(predicted, 1) if predicted is not None else None,
+                "slo_ms": self.slo_ms,
+                "degraded": chosen is not self.variants[0],
+            }
+        return chosen, decision
+
+    def release(self, decision, elapsed_ms):
+        """
+        Finishes a request admitted by acquire(); elapsed_ms is its end-to-end time.
+        Requests that overlapped others share the CPU, so the time is divided by the concurrency
+        it started under before it updates the service-time estimate.
+        """
+        name = decision["variant"]
+        with self._lock:
+            self.in_flight -= 1
+            self.served[name] += 1
+            if elapsed_ms > self.slo_ms:
+                self.slo_misses[name] += 1
+        self.observe(name, elapsed_ms / (decision["queue_depth"] + 1))
+
+    def warm_up(self, runs=2):
+        """Runs each variant on blank input so first requests neither pay tracing nor lack a latency estimate."""
+        for variant in self.variants:
+            for model, size in ((variant.classifier, variant.classifier_size), (variant.segmenter, variant.segmenter_size)):
+                model.predict(np.zeros((1, size[1], size[0], 3), dtype=np.float32), verbose=0)
+            start = time.perf_counter()
+            for _ in range(runs):
+                variant.classifier.predict(
+                    np.zeros((1, variant.classifier_size[1], variant.classifier_size[0], 3), dtype=np.float32), verbose=0)
+                variant.segmenter.predict(
+                    np.zeros((1, variant.segmenter_size[1], variant.segmenter_size[0], 3), dtype=np.float32), verbose=0)
+            self.observe(variant.name, (time.perf_counter() - start) * 1000 / runs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slo_ms": self.slo_ms,
+                "in_flight": self.in_flight,
+                "degraded_requests": self.degraded,
+                "variants": [
+                    dict(v.describe(),
+                         service_ms=round(self.service_ms[v.name], 1) if self.service_ms[v.name] is not None else None,
+                         served=self.served[v.name],
+                         slo_misses=self.slo_misses[v.name])
+                    for v in self.variants
+                ],
+            }
@@ -0,0 +1,168 @@
+import cv2
+import numpy as np
+
+# Measurement, tissue composition and severity for one image, given the model outputs.
+# Needs no models or TensorFlow, so batch jobs can run it in worker processes
+# (see analysis/batch.py) while the parent process keeps doing inference.
+
+def finish_analysis(original_img, user_mask_lr, preds, segmentation_mask, classes, pixel_to_cm_ratio=0.0264, lap=None):
+    """
+    Turns classifier probabilities and the segmentation output into the results dict.
+    original_img is the (capped) full-resolution RGB image; user_mask_lr the ROI mask at the
+    segmenter's size or None. Returns (results, final_mask_lr).
+    lap(stage) is called after "measure" and "tissue" for per-stage timing.
+    """
+    lap = lap or (lambda stage: None)
+    h, w = original_img.shape[:2]
+
+    class_idx = np.argmax(preds)
+    confidence = float(preds[class_idx])
+    wound_type = classes[class_idx]
+    ai_mask_lr = (segmentation_mask > 0.5).astype(np.uint8) * 255
+    
+    # 4. Final Mask Construction (ROI Constraint)
+    if user_mask_lr is not None:
+        # INTERSECTION: AI discovery MUST be within User Boundary
+        final_mask_lr = cv2.bitwise_and(ai_mask_lr, ai_mask_lr, mask=user_mask_lr)
+        # FALLBACK: If AI finds nothing inside the ROI, use the full ROI boundary
+        if np.sum(final_mask_lr) < 10: 
+            final_mask_lr = user_mask_lr
+    else:
+        final_mask_lr = ai_mask_lr
+
+    # Resize for high-res analysis
+    final_mask = cv2.resize(final_mask_lr, (w, h))
+    final_mask = (final_mask > 127).astype(np.uint8) * 255
+
+    # 5. Measurements from Final Constrained Mask
+    contours, _ = cv2.findContours(final_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if contours:
+        largest_contour = max(contours, key=cv2.contourArea)
+        wound_area_pixels = cv2.contourArea(largest_contour)
+        bx, by, bw, bh = cv2.boundingRect(largest_contour)
+        wound_width_px = bw
+        wound_height_px = bh
+    else:
+        wound_area_pixels = 0
+        wound_width_px = 0
+        wound_height_px = 0
+
+    # Pixel to CM² and Dimension Conversion
+    area_cm2 = round(float(wound_area_pixels) * (pixel_to_cm_ratio ** 2), 2)
+    wound_length_cm = round(float(wound_height_px) * pixel_to_cm_ratio, 1)
+    wound_width_cm = round(float(wound_width_px) * pixel_to_cm_ratio, 1)
+    lap("measure")
+
+    # 6. Premium Tissue Analysis (Pixel Analysis Flow within Final ROI)
+    # Step: Extract Only Wound Pixels
+    wound_pixels_img = cv2.bitwise_and(original_img, original_img, mask=final_mask)
+    
+    # --- NEW: ADVANCED PREPROCESSING ---
+    # A. Noise removal
+    blur = cv2.GaussianBlur(wound_pixels_img, (5, 5), 0)
+    
+    # B. Contrast improvement (LAB space with CLAHE)
+    lab = cv2.cvtColor(blur, cv2.COLOR_RGB2LAB)
+    l_chan, a_chan, b_chan = cv2.split(lab)
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    l_chan = clahe.apply(l_chan)
+    enhanced_lab = cv2.merge((l_chan, a_chan, b_chan))
+    enhanced_rgb = cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2RGB)
+    
+    # C. Feature Extraction (Texture/Edges)
+    gray = cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    edge_mask = cv2.bitwise_and(edges, edges, mask=final_mask)
+    
+    # D. Convert Color Space (RGB to HSV for analysis)
+    hsv = cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2HSV)
+    
+    # --- NEW: ADAPTIVE THRESHOLDS based on ROI stats ---
+    # Calculate mean brightness (Value) in ROI to shift black/dark thresholds
+    roi_v_mean = np.mean(hsv[:,:,2][final_mask > 0]) if np.any(final_mask > 0) else 128
+    dynamic_black_upper = min(80, int(roi_v_mean * 0.5))
+    
+    # Tissue Color Ranges
+    red_lower = np.array([0, 50, 40])
+    red_upper = np.array([15, 255, 255])
+    yellow_lower = np.array([18, 30, 40])
+    yellow_upper = np.array([40, 255, 255])
+    black_lower = np.array([0, 0, 0])
+    black_upper = np.array([180, 255, dynamic_black_upper])
+    
+    # Create Tissue Masks
+    red_mask = cv2.inRange(hsv, red_lower, red_upper)
+    yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper)
+    black_mask = cv2.inRange(hsv, black_lower, black_upper)
+    
+    # Count Pixels inside final ROI
+    total_wound_px = np.sum(final_mask > 0)
+    
+    if total_wound_px > 0:
+        # Masking with ROI to ensure we stay inside boundary
+        gran_mask_final = cv2.bitwise_and(red_mask, red_mask, mask=final_mask)
+        slough_mask_final = cv2.bitwise_and(yellow_mask, yellow_mask, mask=final_mask)
+        necro_mask_final = cv2.bitwise_and(black_mask, black_mask, mask=final_mask)
+        
+        # --- HYBRID LOGIC: Refine based on Texture ---
+        # Necrotic tissue usually has lower texture than dark granulation/crust
+        # Slough has lower edge density than dry epithelial
+        necro_px_raw = np.sum(necro_mask_final > 0)
+        necro_edge_px = np.sum(cv2.bitwise_and(edge_mask, edge_mask, mask=necro_mask_final) > 0)
+        # If high edge density in a "black" area, it might just be shadow/crust, not deep necrosis
+        necro_factor = 1.0 if (necro_px_raw == 0 or (necro_edge_px / necro_px_raw < 0.1)) else 0.7
+        
+        gran_px = np.sum(gran_mask_final > 0)
+        slough_px = np.sum(slough_mask_final > 0)
+        necro_px = int(necro_px_raw * necro_factor)
+        
+        gran_pct = int((gran_px / total_wound_px) * 100)
+        slough_pct = int((slough_px / total_wound_px) * 100)
+        necro_pct = int((necro_px / total_wound_px) * 100)
+        epi_pct = max(0, 100 - (gran_pct + slough_pct + necro_pct))
+        
+        # --- CONFIDENCE SCORING ---
+        # Ratio of color-matched pixels to total ROI area gives a "detection quality" metric
+        base_confidence = min(0.98, (gran_px + slough_px + necro_px + (total_wound_px * 0.1)) / total_wound_px)
+        
+        tissue_data = {
+            "granulation": gran_pct, 
+            "slough": slough_pct,
+            "necrotic": necro_pct, 
+            "epithelial": epi_pct,
+            "composition_confidence": round(base_confidence, 2)
+        }
+    else:
+        tissue_data = {"granulation": 0, "slough": 0, "necrotic": 0, "epithelial": 0, "composition_confidence": 0}
+
+    # 7. Depth Estimation Heuristic
+    wound_depth_cm = estimate_depth(wound_type, tissue_data)
+    bad_tissue_pct = tissue_data["slough"] + tissue_data["necrotic"]
+
+    # 8. Severity
+    severity = "Low"
+    if area_cm2 >= 15 or wound_depth_cm >= 2.0 or bad_tissue_pct >= 40: severity = "High"
+    elif area_cm2 >= 5 or wound_depth_cm >= 0.8 or bad_tissue_pct >= 15: severity = "Medium"
+    
+    results = {
+        "wound_type": wound_type,
+        "severity": severity,
+        "confidence": round(confidence, 4),
+        "wound_area_cm2": area_cm2,
+        "wound_length_cm": wound_length_cm,
+        "wound_width_cm": wound_width_cm,
+        "wound_depth_cm": wound_depth_cm,
+        "tissue_composition": tissue_data
+    }
+    lap("tissue")
+    
+    return results, final_mask_lr
+
+def estimate_depth(wound_type, tissue_data):
+    """Depth heuristic (cm): a per-type base depth plus up to 1.5 cm for the slough + necrotic share."""
+    base_depth = 0.2
+    if wound_type in ["Laceration", "Surgical Wounds"]: base_depth = 0.5
+    elif wound_type == "Burns": base_depth = 0.3
+    
+    bad_tissue_pct = tissue_data["slough"] + tissue_data["necrotic"]
+    return round(base_depth + (bad_tissue_pct / 100.0 * 1.5), 1)
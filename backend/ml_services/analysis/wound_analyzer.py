@@ -1,19 +1,55 @@
+import time
 import cv2
 import numpy as np
-import tensorflow as tf
+from analysis.model_variants import ModelVariant, VariantSelector, load_variants, DEFAULT_SLO_MS
+from compression.quantization import load_model
+from analysis.tissue_analysis import finish_analysis, estimate_depth
 # matplotlib is only needed for visualize_result(), imported lazily to avoid
 # crashing on headless servers (Render, Docker) that have no display backend.
 
+PIPELINE_STAGES = ("preprocess", "classify", "segment", "measure", "tissue")
+
+class _StageClock:
+    """Adds the wall time (ms) since the previous call to timings[stage]; a no-op when timings is None."""
+    def __init__(self, timings):
+        self.timings = timings
+        self._last = time.perf_counter()
+
+    def __call__(self, stage):
+        now = time.perf_counter()
+        if self.timings is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
 class WoundAnalyzer:
-    def __init__(self, classifier_path="models/wound_classifier.keras", segmentation_path="models/wound_segmentation_model.h5"):
+    def __init__(self, classifier_path="models/wound_classifier.keras", segmentation_path="models/wound_segmentation_model.h5",
+                 variants=None, latency_slo_ms=DEFAULT_SLO_MS, warm_up=False):
+        """
+        variants: optional [{"name", "classifier", "segmenter"}, ...] best-first (file names relative
+        to the classifier's directory). Each request is then served by the variant VariantSelector
+        picks for the current load; without it the single classifier/segmenter pair is used.
+        """
         # Load models
         print("Loading models...")
         import os, json
-        self.classifier = tf.keras.models.load_model(classifier_path)
-        self.segmenter = tf.keras.models.load_model(segmentation_path)
-        
+
         # Determine base directory for models
         model_dir = os.path.dirname(classifier_path)
+
+        loaded = load_variants(variants, model_dir) if variants else []
+        if not loaded:
+            loaded = [ModelVariant(
+                "default",
+                load_model(classifier_path),
+                load_model(segmentation_path),
+            )]
+        self.selector = VariantSelector(loaded, slo_ms=latency_slo_ms)
+        # Primary (most accurate) variant, kept under the old attribute names
+        self.classifier = loaded[0].classifier
+        self.segmenter = loaded[0].segmenter
+        if warm_up:
+            self.selector.warm_up()
+        
         classes_path = os.path.join(model_dir, "classes.json")
         
         self.classes = ["Abrasions", "Bruises", "Burns", "Cut", "Laceration"]
@@ -21,7 +57,13 @@ class WoundAnalyzer:
             with open(classes_path, "r") as f:
                 self.classes = json.load(f)
                 
-        print("Models loaded successfully.")
+        print(f"Models loaded successfully ({', '.join(v.name for v in loaded)}).")
+
+    @staticmethod
+    def _roi_mask(user_mask_hr, size):
+        """Binary (0/255) copy of the full-resolution user mask at a model's input size."""
+        mask = cv2.resize(user_mask_hr, size)
+        return (mask > 127).astype(np.uint8) * 255
         
     def preprocess_image(self, image_path, target_size=(224, 224), max_dimension=1024):
         """Reads image, caps resolution for memory safety, and prepares it for models."""
@@ -52,15 +94,85 @@ class WoundAnalyzer:
         
         return original_img, img_normalized, img_batch
         
-    def analyze_wound(self, image_path, pixel_to_cm_ratio=0.0264, editor_metadata=None):
+    def analyze_wound(self, image_path, pixel_to_cm_ratio=0.0264, editor_metadata=None, variant=None, timings=None):
         """
         Runs the full AI pipeline on the wound image with ROI constraints.
+        variant forces a model variant by name; by default one is chosen from the current load.
+        results["model_variant"] names the variant that served the request.
+        timings, if given, is filled with wall time per stage in ms (see PIPELINE_STAGES).
+        """
+        chosen, decision = self.selector.acquire(variant)
+        start = time.perf_counter()
+        try:
+            (results, img_normalized, final_mask), = self._run_pipeline(
+                chosen, [image_path], pixel_to_cm_ratio, [editor_metadata], timings
+            )
+        finally:
+            self.selector.release(decision, (time.perf_counter() - start) * 1000)
+        results["model_variant"] = chosen.name
+        results["variant_selection"] = decision
+        return results, img_normalized, final_mask
+
+    def analyze_batch(self, image_paths, pixel_to_cm_ratio=0.0264, editor_metadata=None, variant=None, timings=None):
+        """
+        Bulk version of analyze_wound(): the classifier and segmenter each run once for the whole batch.
+        editor_metadata is None or a list aligned with image_paths. Meant for offline jobs, so it
+        skips load-adaptive selection and uses the named variant (default: the primary one).
+        Returns a list of (results, img_normalized, final_mask), one per image.
         """
+        image_paths = list(image_paths)
+        chosen = self._offline_variant(variant)
+        outputs = self._run_pipeline(chosen, image_paths, pixel_to_cm_ratio,
+                                     editor_metadata or [None] * len(image_paths), timings)
+        for results, _, _ in outputs:
+            results["model_variant"] = chosen.name
+        return outputs
+
+    def prepare(self, image_path, editor_metadata=None, variant=None):
+        """
+        Decode/preprocess step of analyze_batch() for one image, for callers that pipeline the
+        stages themselves (see analysis/batch.py). Safe to call from several threads.
+        """
+        return self._prepare(self._offline_variant(variant), image_path, editor_metadata)
+
+    def infer(self, prepared, variant=None):
+        """Runs the classifier and segmenter once over a list of prepare() outputs. Returns (class_preds, seg_preds)."""
+        return self._infer(self._offline_variant(variant), prepared)
+
+    def _offline_variant(self, variant):
+        return self.selector.get(variant) if variant else self.selector.variants[0]
+
+    def _run_pipeline(self, variant, image_paths, pixel_to_cm_ratio, editor_metadata, timings=None):
+        lap = _StageClock(timings)
+        prepared = [self._prepare(variant, path, meta) for path, meta in zip(image_paths, editor_metadata)]
+        lap("preprocess")
+        class_preds, seg_preds = self._infer(variant, prepared, lap)
+        return [self._finish(p, preds, seg, pixel_to_cm_ratio, lap)
+                for p, preds, seg in zip(prepared, class_preds, seg_preds)]
+
+    def _infer(self, variant, prepared, lap=None):
+        lap = lap or _StageClock(None)
+        # 3. AI Inference (Now ROI-Aware), batched across images
+        # Classification
+        img_batch = np.stack([p["img_input"] for p in prepared])
+        class_preds = variant.classifier.predict(img_batch, verbose=0)
+        lap("classify")
+
+        # Segmentation (shares the classifier's input unless the variant pairs different sizes)
+        seg_batch = img_batch if prepared[0]["seg_input"] is None else np.stack([p["seg_input"] for p in prepared])
+        seg_preds = variant.segmenter.predict(seg_batch, verbose=0)
+        lap("segment")
+        return class_preds, seg_preds
+
+    def _prepare(self, variant, image_path, editor_metadata):
         # 1. Preprocess
-        original_img, img_normalized, img_batch = self.preprocess_image(image_path)
+        original_img, img_normalized, img_batch = self.preprocess_image(image_path, target_size=variant.classifier_size)
         h, w = original_img.shape[:2]
+        seg_batch = None
+        if variant.segmenter_size != variant.classifier_size:
+            seg_batch = np.expand_dims(cv2.resize(original_img, variant.segmenter_size).astype('float32') / 255.0, axis=0)
         
-        user_mask_224 = None
+        user_mask_lr = None
         user_mask_hr = None
         
         # 2. Extract ROI if User Boundary is provided
@@ -72,174 +184,43 @@ class WoundAnalyzer:
                      user_mask_hr = np.zeros((h, w), dtype=np.uint8)
                      cv2.fillPoly(user_mask_hr, [pts], 255)
                      
-                     # Create Low-Res (224) User Mask for AI model input
-                     user_mask_224 = cv2.resize(user_mask_hr, (224, 224))
-                     user_mask_224 = (user_mask_224 > 127).astype(np.uint8) * 255
+                     # Create Low-Res User Mask at the segmenter's input size
+                     user_mask_lr = self._roi_mask(user_mask_hr, variant.segmenter_size)
                      
                      # STEP: Isolate ROI in the AI input
                      # We black out everything outside the user-defined boundary
-                     mask_3ch = np.stack([user_mask_224]*3, axis=-1) / 255.0
+                     mask_3ch = np.stack([self._roi_mask(user_mask_hr, variant.classifier_size)]*3, axis=-1) / 255.0
                      img_batch[0] = img_batch[0] * mask_3ch
+                     if seg_batch is not None:
+                         seg_batch[0] = seg_batch[0] * (np.stack([user_mask_lr]*3, axis=-1) / 255.0)
             except Exception as e:
                 print(f"⚠️ Error handling manual ROI: {e}")
 
-        # 3. AI Inference (Now ROI-Aware)
-        # Classification
-        preds = self.classifier.predict(img_batch, verbose=0)[0]
-        class_idx = np.argmax(preds)
-        confidence = float(preds[class_idx])
-        wound_type = self.classes[class_idx]
-        
-        # Segmentation
-        segmentation_mask = self.segmenter.predict(img_batch, verbose=0)[0]
-        ai_mask_224 = (segmentation_mask > 0.5).astype(np.uint8) * 255
-        
-        # 4. Final Mask Construction (ROI Constraint)
-        if user_mask_224 is not None:
-            # INTERSECTION: AI discovery MUST be within User Boundary
-            final_mask_224 = cv2.bitwise_and(ai_mask_224, ai_mask_224, mask=user_mask_224)
-            # FALLBACK: If AI finds nothing inside the ROI, use the full ROI boundary
-            if np.sum(final_mask_224) < 10: 
-                final_mask_224 = user_mask_224
-        else:
-            final_mask_224 = ai_mask_224
-
-        # Resize for high-res analysis
-        final_mask = cv2.resize(final_mask_224, (w, h))
-        final_mask = (final_mask > 127).astype(np.uint8) * 255
+        return {
+            "original_img": original_img,
+            "img_normalized": img_normalized,
+            "img_input": img_batch[0],
+            "seg_input": seg_batch[0] if seg_batch is not None else None,
+            "user_mask_lr": user_mask_lr,
+        }
 
-        # 5. Measurements from Final Constrained Mask
-        contours, _ = cv2.findContours(final_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if contours:
-            largest_contour = max(contours, key=cv2.contourArea)
-            wound_area_pixels = cv2.contourArea(largest_contour)
-            bx, by, bw, bh = cv2.boundingRect(largest_contour)
-            wound_width_px = bw
-            wound_height_px = bh
-        else:
-            wound_area_pixels = 0
-            wound_width_px = 0
-            wound_height_px = 0
+    def _finish(self, prepared, preds, segmentation_mask, pixel_to_cm_ratio, lap):
+        results, final_mask_lr = finish_analysis(prepared["original_img"], prepared["user_mask_lr"], preds,
+                                                 segmentation_mask, self.classes, pixel_to_cm_ratio, lap)
+        return results, prepared["img_normalized"], final_mask_lr
 
-        # Pixel to CM² and Dimension Conversion
-        area_cm2 = round(float(wound_area_pixels) * (pixel_to_cm_ratio ** 2), 2)
-        wound_length_cm = round(float(wound_height_px) * pixel_to_cm_ratio, 1)
-        wound_width_cm = round(float(wound_width_px) * pixel_to_cm_ratio, 1)
+    estimate_depth = staticmethod(estimate_depth)
 
-        # 6. Premium Tissue Analysis (Pixel Analysis Flow within Final ROI)
-        # Step: Extract Only Wound Pixels
-        wound_pixels_img = cv2.bitwise_and(original_img, original_img, mask=final_mask)
-        
-        # --- NEW: ADVANCED PREPROCESSING ---
-        # A. Noise removal
-        blur = cv2.GaussianBlur(wound_pixels_img, (5, 5), 0)
-        
-        # B. Contrast improvement (LAB space with CLAHE)
-        lab = cv2.cvtColor(blur, cv2.COLOR_RGB2LAB)
-        l_chan, a_chan, b_chan = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        l_chan = clahe.apply(l_chan)
-        enhanced_lab = cv2.merge((l_chan, a_chan, b_chan))
-        enhanced_rgb = cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2RGB)
-        
-        # C. Feature Extraction (Texture/Edges)
-        gray = cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        edge_mask = cv2.bitwise_and(edges, edges, mask=final_mask)
-        
-        # D. Convert Color Space (RGB to HSV for analysis)
-        hsv = cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2HSV)
-        
-        # --- NEW: ADAPTIVE THRESHOLDS based on ROI stats ---
-        # Calculate mean brightness (Value) in ROI to shift black/dark thresholds
-        roi_v_mean = np.mean(hsv[:,:,2][final_mask > 0]) if np.any(final_mask > 0) else 128
-        dynamic_black_upper = min(80, int(roi_v_mean * 0.5))
-        
-        # Tissue Color Ranges
-        red_lower = np.array([0, 50, 40])
-        red_upper = np.array([15, 255, 255])
-        yellow_lower = np.array([18, 30, 40])
-        yellow_upper = np.array([40, 255, 255])
-        black_lower = np.array([0, 0, 0])
-        black_upper = np.array([180, 255, dynamic_black_upper])
-        
-        # Create Tissue Masks
-        red_mask = cv2.inRange(hsv, red_lower, red_upper)
-        yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper)
-        black_mask = cv2.inRange(hsv, black_lower, black_upper)
-        
-        # Count Pixels inside final ROI
-        total_wound_px = np.sum(final_mask > 0)
-        
-        if total_wound_px > 0:
-            # Masking with ROI to ensure we stay inside boundary
-            gran_mask_final = cv2.bitwise_and(red_mask, red_mask, mask=final_mask)
-            slough_mask_final = cv2.bitwise_and(yellow_mask, yellow_mask, mask=final_mask)
-            necro_mask_final = cv2.bitwise_and(black_mask, black_mask, mask=final_mask)
-            
-            # --- HYBRID LOGIC: Refine based on Texture ---
-            # Necrotic tissue usually has lower texture than dark granulation/crust
-            # Slough has lower edge density than dry epithelial
-            necro_px_raw = np.sum(necro_mask_final > 0)
-            necro_edge_px = np.sum(cv2.bitwise_and(edge_mask, edge_mask, mask=necro_mask_final) > 0)
-            # If high edge density in a "black" area, it might just be shadow/crust, not deep necrosis
-            necro_factor = 1.0 if (necro_px_raw == 0 or (necro_edge_px / necro_px_raw < 0.1)) else 0.7
-            
-            gran_px = np.sum(gran_mask_final > 0)
-            slough_px = np.sum(slough_mask_final > 0)
-            necro_px = int(necro_px_raw * necro_factor)
-            
-            gran_pct = int((gran_px / total_wound_px) * 100)
-            slough_pct = int((slough_px / total_wound_px) * 100)
-            necro_pct = int((necro_px / total_wound_px) * 100)
-            epi_pct = max(0, 100 - (gran_pct + slough_pct + necro_pct))
-            
-            # --- CONFIDENCE SCORING ---
-            # Ratio of color-matched pixels to total ROI area gives a "detection quality" metric
-            base_confidence = min(0.98, (gran_px + slough_px + necro_px + (total_wound_px * 0.1)) / total_wound_px)
-            
-            tissue_data = {
-                "granulation": gran_pct, 
-                "slough": slough_pct,
-                "necrotic": necro_pct, 
-                "epithelial": epi_pct,
-                "composition_confidence": round(base_confidence, 2)
-            }
-        else:
-            tissue_data = {"granulation": 0, "slough": 0, "necrotic": 0, "epithelial": 0, "composition_confidence": 0}
-
-        # 7. Depth Estimation Heuristic
-        base_depth = 0.2
-        if wound_type in ["Laceration", "Surgical Wounds"]: base_depth = 0.5
-        elif wound_type == "Burns": base_depth = 0.3
-        
-        bad_tissue_pct = tissue_data["slough"] + tissue_data["necrotic"]
-        wound_depth_cm = round(base_depth + (bad_tissue_pct / 100.0 * 1.5), 1)
-
-        # 8. Severity
-        severity = "Low"
-        if area_cm2 >= 15 or wound_depth_cm >= 2.0 or bad_tissue_pct >= 40: severity = "High"
-        elif area_cm2 >= 5 or wound_depth_cm >= 0.8 or bad_tissue_pct >= 15: severity = "Medium"
-        
-        results = {
-            "wound_type": wound_type,
-            "severity": severity,
-            "confidence": round(confidence, 4),
-            "wound_area_cm2": area_cm2,
-            "wound_length_cm": wound_length_cm,
-            "wound_width_cm": wound_width_cm,
-            "wound_depth_cm": wound_depth_cm,
-            "tissue_composition": tissue_data
-        }
-        
-        return results, img_normalized, final_mask_224
-        
     def visualize_result(self, image_normalized, mask_binary, results, output_path='result_overlay.png'):
         """Displays original image, segmentation overlay, and prediction results."""
         import matplotlib
         matplotlib.use('Agg')  # Non-interactive backend — safe on headless servers
         import matplotlib.pyplot as plt
 
+        # Variants may segment at a different size than the classifier input
+        if mask_binary.shape[:2] != image_normalized.shape[:2]:
+            mask_binary = cv2.resize(mask_binary.squeeze(), image_normalized.shape[1::-1])
+
         plt.figure(figsize=(15, 5))
         
         # Orig Image
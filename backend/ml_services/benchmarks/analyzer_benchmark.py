@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+import cv2
+import tensorflow as tf
+from analysis.wound_analyzer import WoundAnalyzer, PIPELINE_STAGES
+from classification.model import create_wound_classifier
+from segmentation.model import unet_segmentation_model
+from training_profiler import current_rss_bytes, peak_rss_bytes
+from benchmarks.synthetic_images import make_synthetic_images, list_images
+
+# Offline benchmark for WoundAnalyzer.analyze_wound.
+# Runs the real pipeline over a directory of images, or over synthetic wound-like images with
+# randomly initialized models of the production architectures (no trained weights or dataset
+# needed, so it runs anywhere, e.g. in CI). Reports p50/p95/p99 latency per pipeline stage,
+# throughput of analyze_batch() at several batch sizes and peak memory, and can compare the
+# JSON results against a stored baseline to flag regressions.
+# Run from the ml_services root:
+#   python -m benchmarks.analyzer_benchmark --output bench.json
+#   python -m benchmarks.analyzer_benchmark --baseline benchmarks/baseline.json
+
+# For each metric: which direction is worse
+LOWER_IS_BETTER = "lower"
+HIGHER_IS_BETTER = "higher"
+
+def build_random_models(out_dir, image_size=224, alpha=1.0, num_classes=5, seed=0):
+    """Saves randomly initialized classifier / U-Net files with the production architectures."""
+    tf.keras.utils.set_random_seed(seed)
+    classifier_path = os.path.join(out_dir, "wound_classifier.keras")
+    segmenter_path = os.path.join(out_dir, "wound_segmentation_model.h5")
+    create_wound_classifier((image_size, image_size, 3), num_classes=num_classes, alpha=alpha,
+                            weights=None).save(classifier_path)
+    unet_segmentation_model((image_size, image_size, 3)).save(segmenter_path)
+    return classifier_path, segmenter_path
+
+def percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "mean_ms": round(float(np.mean(values)), 2),
+    }
+
+def run_latency(analyzer, paths, rois, repeats=1, warmup=2):
+    """Per-image analyze_wound() latency, total and per stage."""
+    for i in range(min(warmup, len(paths))):
+        analyzer.analyze_wound(paths[i], editor_metadata=_roi(rois, i))
+
+    stages = {stage: [] for stage in PIPELINE_STAGES}
+    totals = []
+    for _ in range(repeats):
+        for i, path in enumerate(paths):
+            timings = {}
+            start = time.perf_counter()
+            analyzer.analyze_wound(path, editor_metadata=_roi(rois, i), timings=timings)
+            totals.append((time.perf_counter() - start) * 1000)
+            for stage in PIPELINE_STAGES:
+                stages[stage].append(timings.get(stage, 0.0))
+    report = {"total": percentiles(totals)}
+    report.update({stage: percentiles(values) for stage, values in stages.items()})
+    return report
+
+def run_throughput(analyzer, paths, rois, batch_sizes, repeats=1):
+    """Images/sec of analyze_batch() over all paths at each batch size (after one warm-up batch)."""
+    results = {}
+    for batch_size in batch_sizes:
+        chunks = [list(range(i, min(i + batch_size, len(paths)))) for i in range(0, len(paths), batch_size)]
+        analyzer.analyze_batch([paths[i] for i in chunks[0]], editor_metadata=[_roi(rois, i) for i in chunks[0]])
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for chunk in chunks:
+                analyzer.analyze_batch([paths[i] for i in chunk], editor_metadata=[_roi(rois, i) for i in chunk])
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = round(len(paths) * repeats / elapsed, 2)
+        print(f"  batch {batch_size:>3}: {results[str(batch_size)]:.2f} images/sec")
+    return results
+
+def _roi(rois, i):
+    if rois is None or rois[i] is None:
+        return None
+    return {"boundary_coordinates": rois[i]}
+
+def flatten_metrics(results):
+    """{metric name: (value, direction)} for everything compared against a baseline."""
+    metrics = {}
+    for stage, stats in results["latency"].items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"latency.{stage}.{key}"] = (stats[key], LOWER_IS_BETTER)
+    for batch_size, value in results["throughput_images_per_sec"].items():
+        metrics[f"throughput.batch_{batch_size}"] = (value, HIGHER_IS_BETTER)
+    for key, value in results["memory"].items():
+        metrics[f"memory.{key}"] = (value, LOWER_IS_BETTER)
+    return metrics
+
+def compare_to_baseline(results, baseline, tolerance=0.2, min_latency_ms=5.0):
+    """
+    Returns a list of regressions: metrics that got worse than baseline by more than tolerance
+    (a fraction). Stages faster than min_latency_ms are too noisy to judge and are skipped.
+    """
+    current, previous = flatten_metrics(results), flatten_metrics(baseline)
+    regressions = []
+    for name, (value, direction) in current.items():
+        if name not in previous or value is None or previous[name][0] in (None, 0):
+            continue
+        base = previous[name][0]
+        if name.startswith("latency.") and base < min_latency_ms:
+            continue
+        change = (value - base) / base
+        worse = change > tolerance if direction == LOWER_IS_BETTER else change < -tolerance
+        if worse:
+            regressions.append({"metric": name, "baseline": base, "current": value, "change": round(change, 3)})
+    return regressions
+
+def print_results(results):
+    print(f"\n{'Stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage, stats in results["latency"].items():
+        print(f"{stage:<12}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['mean_ms']:>10.1f}")
+    print(f"\n{'Batch':<12}{'images/sec':>12}")
+    for batch_size, value in results["throughput_images_per_sec"].items():
+        print(f"{batch_size:<12}{value:>12.2f}")
+    memory = results["memory"]
+    print(f"\nRSS after model load: {memory['rss_after_load_mb']:.0f} MB, peak RSS: {memory['peak_rss_mb']:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WoundAnalyzer latency, throughput and memory.")
+    parser.add_argument("--images", type=str, default=None,
+                        help="Directory of images to analyze (default: synthetic images).")
+    parser.add_argument("--synthetic", type=int, default=24, help="Number of synthetic images when --images is not set.")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many images from --images.")
+    parser.add_argument("--roi", action="store_true", help="Send an ROI polygon with synthetic images.")
+    parser.add_argument("--classifier", type=str, default=None, help="Trained classifier (default: random weights).")
+    parser.add_argument("--segmenter", type=str, default=None, help="Trained U-Net (default: random weights).")
+    parser.add_argument("--image-size", type=int, default=224, help="Input size of the random models.")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Width of the random classifier.")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the images per measurement.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here.")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="analyzer_bench_") as scratch:
+        if args.images:
+            paths, rois = list_images(args.images, args.limit), None
+            if not paths:
+                print(f"❌ No images found in {args.images}")
+                sys.exit(2)
+        else:
+            paths, rois = make_synthetic_images(scratch, args.synthetic)
+            if not args.roi:
+                rois = None
+
+        if args.classifier and args.segmenter:
+            classifier_path, segmenter_path, model_source = args.classifier, args.segmenter, "trained"
+        else:
+            print("🎲 Building randomly initialized models...")
+            classifier_path, segmenter_path = build_random_models(scratch, args.image_size, args.alpha)
+            model_source = "random"
+
+        analyzer = WoundAnalyzer(classifier_path=classifier_path, segmentation_path=segmenter_path)
+        rss_after_load = current_rss_bytes()
+
+        print(f"⏱️ Per-image latency over {len(paths)} images...")
+        latency = run_latency(analyzer, paths, rois, repeats=args.repeats)
+        print("🚚 Batched throughput...")
+        throughput = run_throughput(analyzer, paths, rois, args.batch_sizes, repeats=args.repeats)
+
+    results = {
+        "config": {
+            "images": args.images or "synthetic",
+            "num_images": len(paths),
+            "roi": rois is not None,
+            "models": model_source,
+            "image_size": args.image_size,
+            "repeats": args.repeats,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "tensorflow": tf.__version__,
+            "opencv": cv2.__version__,
+            "cpus": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        "latency": latency,
+        "throughput_images_per_sec": throughput,
+        "memory": {
+            "rss_after_load_mb": round(rss_after_load / (1024 * 1024), 1),
+            "peak_rss_mb": round(peak_rss_bytes() / (1024 * 1024), 1),
+        },
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("⚠️ Baseline was recorded with a different configuration; comparison may not be meaningful.")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}:")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.0%})")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import time
+import json
+import argparse
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from preprocessing.data_loader import legacy_augment_fn
+from preprocessing.augmentation import batch_augment_fn
+
+# Compares augmentation throughput (images/sec) of:
+#   1. the legacy ImageDataGenerator.flow generator (the old training input path)
+#   2. the same ImageDataGenerator transforms inside tf.data (legacy_augment_fn)
+#   3. the in-graph batched transform (preprocessing.augmentation.batch_augment_fn)
+# Run from the ml_services root:  python -m benchmarks.augmentation_throughput
+
+def _time_batches(iterator, num_batches, batch_size):
+    next(iterator)  # Warm-up (graph tracing / thread pool start)
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        next(iterator)
+    elapsed = time.perf_counter() - start
+    return num_batches * batch_size / elapsed
+
+def bench_image_data_generator(X, y, batch_size, num_batches):
+    datagen = ImageDataGenerator(rotation_range=20, zoom_range=0.15, horizontal_flip=True, fill_mode="nearest")
+    return _time_batches(iter(datagen.flow(X, y, batch_size=batch_size)), num_batches, batch_size)
+
+def bench_tf_data(X, y, batch_size, num_batches, augment_fn):
+    ds = tf.data.Dataset.from_tensor_slices((X, y)).repeat().batch(batch_size)
+    ds = ds.map(augment_fn, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+    return _time_batches(iter(ds), num_batches, batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark augmentation throughput against ImageDataGenerator.")
+    parser.add_argument("--samples", type=int, default=256, help="Synthetic images held in memory.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=20, help="Timed batches per method.")
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path.")
+    args = parser.parse_args()
+
+    size = args.image_size
+    rng = np.random.default_rng(0)
+    X = rng.random((args.samples, size, size, 3), dtype=np.float32)
+    y = rng.integers(0, 10, args.samples)
+    masks = (rng.random((args.samples, size, size, 1)) > 0.5).astype(np.float32)
+
+    results = {
+        "ImageDataGenerator.flow": bench_image_data_generator(X, y, args.batch_size, args.batches),
+        "tf.data + ImageDataGenerator": bench_tf_data(X, y, args.batch_size, args.batches, legacy_augment_fn((size, size))),
+        "tf.data + in-graph batch": bench_tf_data(X, y, args.batch_size, args.batches, batch_augment_fn()),
+        "tf.data + in-graph batch (with masks)": bench_tf_data(X, masks, args.batch_size, args.batches,
+                                                               batch_augment_fn(with_masks=True)),
+    }
+
+    baseline = results["ImageDataGenerator.flow"]
+    print(f"\n{'Method':<40}{'images/sec':>12}{'speedup':>10}")
+    for name, ips in results.items():
+        print(f"{name:<40}{ips:>12.1f}{ips / baseline:>9.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"batch_size": args.batch_size, "image_size": size, "images_per_sec": results}, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
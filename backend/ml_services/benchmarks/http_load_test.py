@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import numpy as np
+import requests
+
+from benchmarks.synthetic_images import make_synthetic_images, list_images
+
+# End-to-end HTTP load test for the running AI API (/api/predict).
+# Uploads a mix of image sizes, some with an ROI polygon in editor_metadata like the editor sends,
+# at increasing concurrency (one stage per level). For each stage it reports throughput, latency
+# percentiles, error rate and shed rate (503/429 from load shedding). It also polls /health for
+# the server's RSS over time. Exits 1 when a stage breaks the SLO, so it can gate a deploy.
+# Start the API locally first (python ai_api.py, or gunicorn as in production), then from the
+# ml_services root:
+#   python -m benchmarks.http_load_test --url http://localhost:8001 --concurrency 1 2 4 8 --stage-seconds 30
+#   python -m benchmarks.http_load_test --slo-p95-ms 3000 --max-error-rate 0.01 --output load.json
+# The Django locustfile (backend/Ai_wound/locustfile.py) covers the web endpoints. This one covers inference.
+
+SHED_STATUSES = (429, 503)
+
+class Payload:
+    """One pre-encoded upload: image bytes plus optional editor_metadata."""
+    def __init__(self, name, content, size, editor_metadata=None):
+        self.name = name
+        self.content = content
+        self.size = size
+        self.editor_metadata = editor_metadata
+
+    def form(self):
+        return {"editor_metadata": json.dumps(self.editor_metadata)} if self.editor_metadata else {}
+
+def build_payloads(count=12, roi_fraction=0.5, image_dir=None, seed=0):
+    """
+    Loads the upload mix into memory so disk reads don't skew client timing. Synthetic images cycle
+    through the small / phone / oversized sizes; roi_fraction of them carry an ROI polygon.
+    """
+    rng = random.Random(seed)
+    payloads = []
+    with tempfile.TemporaryDirectory(prefix="load_test_") as scratch:
+        if image_dir:
+            paths, rois = list_images(image_dir, count), [None] * count
+        else:
+            paths, rois = make_synthetic_images(scratch, count, seed=seed)
+        for path, roi in zip(paths, rois):
+            with open(path, "rb") as f:
+                content = f.read()
+            metadata = {"boundary_coordinates": roi} if roi and rng.random() < roi_fraction else None
+            payloads.append(Payload(os.path.basename(path), content, len(content), metadata))
+    return payloads
+
+def percentiles(values):
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "p99_ms": round(float(np.percentile(values, 99)), 1),
+        "mean_ms": round(float(np.mean(values)), 1),
+    }
+
+def send(session, url, payload, timeout):
+    """Posts one payload. Returns (outcome, latency_ms, status, variant), outcome in ok/shed/error."""
+    start = time.perf_counter()
+    try:
+        response = session.post(url, files={"image": (payload.name, payload.content, "image/jpeg")},
+                                data=payload.form(), timeout=timeout)
+        status = response.status_code
+        variant = response.headers.get("X-Model-Variant")
+    except requests.RequestException:
+        status, variant = None, None
+    latency_ms = (time.perf_counter() - start) * 1000
+    if status == 200:
+        outcome = "ok"
+    elif status in SHED_STATUSES:
+        outcome = "shed"
+    else:
+        outcome = "error"
+    return outcome, latency_ms, status, variant
+
+def run_stage(base_url, payloads, concurrency, duration, timeout=120, shed_backoff=1.0, seed=0):
+    """
+    Keeps `concurrency` users posting back-to-back (each with its own keep-alive session) for
+    `duration` seconds and summarizes what they saw. A shed user waits shed_backoff seconds before
+    retrying, like a client honoring Retry-After, instead of hammering the server.
+    """
+    url = f"{base_url.rstrip('/')}/api/predict"
+    deadline = time.perf_counter() + duration
+    records = []
+    lock = threading.Lock()
+
+    def user(index):
+        rng = random.Random(seed * 1000 + index)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                record = send(session, url, rng.choice(payloads), timeout)
+                with lock:
+                    records.append(record)
+                if record[0] == "shed":
+                    time.sleep(max(0.0, min(shed_backoff, deadline - time.perf_counter())))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize_stage(concurrency, records, time.perf_counter() - start)
+
+def summarize_stage(concurrency, records, elapsed):
+    total = len(records)
+    ok = [latency for outcome, latency, _, _ in records if outcome == "ok"]
+    shed = sum(1 for outcome, _, _, _ in records if outcome == "shed")
+    errors = total - len(ok) - shed
+    statuses, variants = {}, {}
+    for _, _, status, variant in records:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if variant:
+            variants[variant] = variants.get(variant, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 1),
+        "requests": total,
+        "ok": len(ok),
+        "shed": shed,
+        "errors": errors,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "shed_rate": round(shed / total, 4) if total else 0.0,
+        "latency": percentiles(ok),
+        "status_codes": statuses,
+        "model_variants": variants,
+    }
+
+class MemorySampler(threading.Thread):
+    """Polls /health every `interval` seconds and keeps (elapsed_s, rss_mb) while running."""
+    def __init__(self, base_url, interval=1.0):
+        super().__init__(daemon=True)
+        self.url = f"{base_url.rstrip('/')}/health"
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.started_at = time.perf_counter()
+
+    def run(self):
+        with requests.Session() as session:
+            while not self.stop_event.is_set():
+                try:
+                    memory = session.get(self.url, timeout=5).json().get("memory") or {}
+                    if memory.get("rss_mb") is not None:
+                        self.samples.append((round(time.perf_counter() - self.started_at, 1), memory["rss_mb"]))
+                except (requests.RequestException, ValueError):
+                    pass
+                self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=10)
+
+    def peak_between(self, start_s, end_s):
+        values = [rss for t, rss in self.samples if start_s <= t <= end_s]
+        return max(values) if values else None
+
+def wait_until_ready(base_url, timeout=120):
+    """Waits for /health to report a loaded analyzer (models load at startup)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            health = requests.get(f"{base_url.rstrip('/')}/health", timeout=5).json()
+            if health.get("analyzer_initialized"):
+                return health
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(1)
+    return None
+
+def check_slo(stage, p95_ms=None, max_error_rate=None, max_shed_rate=None):
+    """Returns the list of SLO violations for one stage (empty when it passes)."""
+    violations = []
+    p95 = stage["latency"]["p95_ms"]
+    if p95_ms is not None:
+        if p95 is None:
+            violations.append("no successful requests")
+        elif p95 > p95_ms:
+            violations.append(f"p95 {p95:.0f} ms > {p95_ms:.0f} ms")
+    if max_error_rate is not None and stage["error_rate"] > max_error_rate:
+        violations.append(f"error rate {stage['error_rate']:.1%} > {max_error_rate:.1%}")
+    if max_shed_rate is not None and stage["shed_rate"] > max_shed_rate:
+        violations.append(f"shed rate {stage['shed_rate']:.1%} > {max_shed_rate:.1%}")
+    return violations
+
+def print_curve(stages):
+    print(f"\n{'users':>6}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'err %':>8}{'shed %':>8}{'RSS MB':>8}  SLO")
+    for stage in stages:
+        latency = stage["latency"]
+        cells = [f"{latency[key]:>9.0f}" if latency[key] is not None else f"{'-':>9}"
+                 for key in ("p50_ms", "p95_ms", "p99_ms")]
+        rss = f"{stage['peak_rss_mb']:>8.0f}" if stage.get("peak_rss_mb") is not None else f"{'-':>8}"
+        verdict = "✅" if not stage["slo_violations"] else "❌ " + "; ".join(stage["slo_violations"])
+        print(f"{stage['concurrency']:>6}{stage['requests']:>7}{stage['throughput_rps']:>8.2f}{''.join(cells)}"
+              f"{stage['error_rate'] * 100:>8.1f}{stage['shed_rate'] * 100:>8.1f}{rss}  {verdict}")
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for the AI API /api/predict endpoint.")
+    parser.add_argument("--url", type=str, default=os.environ.get("ML_API_URL", "http://localhost:8001"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Concurrent users per stage, ramped in order.")
+    parser.add_argument("--stage-seconds", type=float, default=30.0, help="Duration of each stage.")
+    parser.add_argument("--images", type=str, default=None, help="Directory of real images to upload.")
+    parser.add_argument("--synthetic", type=int, default=12, help="Synthetic images in the mix when --images is unset.")
+    parser.add_argument("--roi-fraction", type=float, default=0.5,
+                        help="Fraction of synthetic uploads sent with an ROI polygon.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (counted as an error).")
+    parser.add_argument("--shed-backoff", type=float, default=1.0, help="Seconds a user waits after a 503/429.")
+    parser.add_argument("--memory-interval", type=float, default=1.0, help="Seconds between /health samples.")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="How long to wait for the API.")
+    parser.add_argument("--slo-p95-ms", type=float, default=None, help="Max p95 latency of successful requests.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Max fraction of failed requests.")
+    parser.add_argument("--max-shed-rate", type=float, default=None, help="Max fraction of shed (503/429) requests.")
+    parser.add_argument("--slo-concurrency", type=int, default=None,
+                        help="Only stages up to this many users must meet the SLO (default: all stages).")
+    parser.add_argument("--output", type=str, default=None, help="Write the report JSON here.")
+    args = parser.parse_args()
+
+    health = wait_until_ready(args.url, args.startup_timeout)
+    if health is None:
+        print(f"❌ AI API at {args.url} did not become ready within {args.startup_timeout:.0f}s")
+        sys.exit(2)
+    print(f"✅ AI API ready at {args.url} (threads: {health.get('thread_config')})")
+
+    payloads = build_payloads(args.synthetic, args.roi_fraction, args.images)
+    if not payloads:
+        print(f"❌ No images found in {args.images}")
+        sys.exit(2)
+    with_roi = sum(1 for p in payloads if p.editor_metadata)
+    print(f"📦 {len(payloads)} payloads ({with_roi} with ROI), "
+          f"{min(p.size for p in payloads) // 1024}-{max(p.size for p in payloads) // 1024} KB")
+
+    sampler = MemorySampler(args.url, args.memory_interval)
+    sampler.start()
+    stages = []
+    slo_limit = args.slo_concurrency or max(args.concurrency)
+    for concurrency in args.concurrency:
+        print(f"🚀 Stage: {concurrency} concurrent user(s) for {args.stage_seconds:.0f}s...")
+        stage_start = time.perf_counter() - sampler.started_at
+        stage = run_stage(args.url, payloads, concurrency, args.stage_seconds, timeout=args.timeout,
+                          shed_backoff=args.shed_backoff)
+        stage["peak_rss_mb"] = sampler.peak_between(stage_start, time.perf_counter() - sampler.started_at)
+        stage["slo_violations"] = (
+            check_slo(stage, args.slo_p95_ms, args.max_error_rate, args.max_shed_rate)
+            if concurrency <= slo_limit else []
+        )
+        stages.append(stage)
+    sampler.stop()
+
+    print_curve(stages)
+    passed = all(not stage["slo_violations"] for stage in stages)
+    report = {
+        "config": {
+            "url": args.url,
+            "concurrency": args.concurrency,
+            "stage_seconds": args.stage_seconds,
+            "payloads": len(payloads),
+            "payloads_with_roi": with_roi,
+            "images": args.images or "synthetic",
+        },
+        "slo": {
+            "p95_ms": args.slo_p95_ms,
+            "max_error_rate": args.max_error_rate,
+            "max_shed_rate": args.max_shed_rate,
+            "up_to_concurrency": slo_limit,
+            "passed": passed,
+        },
+        "stages": stages,
+        "memory_timeline": sampler.samples,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nReport saved to {args.output}")
+
+    if not passed:
+        print("\n❌ SLO check failed")
+        sys.exit(1)
+    print("\n✅ SLO check passed")
+
+if __name__ == "__main__":
+    main()
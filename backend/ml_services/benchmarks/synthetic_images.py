@@ -0,0 +1,51 @@
+import os
+import cv2
+import numpy as np
+
+# Synthetic wound photos for benchmarks and load tests (OpenCV + NumPy only, no TensorFlow).
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+# Synthetic photo sizes (w, h): small upload, typical phone photo, oversized photo that gets downscaled
+SYNTHETIC_SIZES = ((640, 480), (1280, 960), (3000, 4000))
+
+def synthetic_wound_image(rng, size):
+    """Skin-toned background with an irregular wound blob made of red, yellow and dark patches."""
+    w, h = size
+    skin = np.array([150, 180, 225], dtype=np.float32)  # BGR
+    image = skin + rng.normal(0, 12, (h, w, 3))
+    center = (int(w * rng.uniform(0.35, 0.65)), int(h * rng.uniform(0.35, 0.65)))
+    axes = (int(w * rng.uniform(0.1, 0.25)), int(h * rng.uniform(0.1, 0.25)))
+    wound = np.zeros((h, w), dtype=np.uint8)
+    cv2.ellipse(wound, center, axes, rng.uniform(0, 180), 0, 360, 255, -1)
+    image[wound > 0] = (60, 60, 170)  # granulation red
+    for color in ((80, 200, 220), (30, 30, 40)):  # slough yellow, necrotic dark
+        patch_center = (center[0] + int(rng.uniform(-0.5, 0.5) * axes[0]),
+                        center[1] + int(rng.uniform(-0.5, 0.5) * axes[1]))
+        patch = np.zeros_like(wound)
+        cv2.circle(patch, patch_center, max(2, int(min(axes) * rng.uniform(0.2, 0.4))), 255, -1)
+        image[(patch > 0) & (wound > 0)] = color
+    image = cv2.GaussianBlur(np.clip(image, 0, 255).astype(np.uint8), (5, 5), 0)
+    # ROI polygon around the wound, in full-resolution pixel coordinates like the editor sends
+    roi = [{"x": int(center[0] + 1.3 * axes[0] * np.cos(t)), "y": int(center[1] + 1.3 * axes[1] * np.sin(t))}
+           for t in np.linspace(0, 2 * np.pi, 12, endpoint=False)]
+    return image, roi
+
+def make_synthetic_images(out_dir, count, seed=0):
+    """Writes count JPEGs cycling through SYNTHETIC_SIZES. Returns (paths, rois)."""
+    rng = np.random.default_rng(seed)
+    paths, rois = [], []
+    for i in range(count):
+        image, roi = synthetic_wound_image(rng, SYNTHETIC_SIZES[i % len(SYNTHETIC_SIZES)])
+        path = os.path.join(out_dir, f"synthetic_{i:03d}.jpg")
+        cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        paths.append(path)
+        rois.append(roi)
+    return paths, rois
+
+def list_images(image_dir, limit=None):
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(image_dir)
+        for name in files if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
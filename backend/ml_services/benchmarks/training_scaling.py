@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Data-parallel scaling report for the training scripts.
+# Runs train_classifier.py / train_segmentation.py with --workers 1, 2, 4 ... in scratch working
+# directories (the dataset and compiled cache are symlinked in, so models/ and checkpoints/ of the
+# real tree are never touched) and compares the cluster-wide images/sec each run reports in its
+# throughput profile.
+# Run from the ml_services root:  python -m benchmarks.training_scaling --model segmentation
+
+ML_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    "classifier": ("train_classifier.py", "training_profile.json"),
+    "segmentation": ("train_segmentation.py", "segmentation_profile.json"),
+}
+SHARED_INPUTS = ("dataset", "dataset_masks", "cache")
+
+def run_training(model, workers, epochs, batch_size, scratch_dir, data_root=ML_ROOT):
+    script, profile_name = SCRIPTS[model]
+    os.makedirs(scratch_dir, exist_ok=True)
+    for name in SHARED_INPUTS:
+        source = os.path.join(os.path.abspath(data_root), name)
+        if os.path.exists(source):
+            os.symlink(source, os.path.join(scratch_dir, name))
+
+    env = dict(os.environ, PYTHONPATH=ML_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    cmd = [sys.executable, os.path.join(ML_ROOT, script), "--workers", str(workers),
+           "--epochs", str(epochs), "--batch-size", str(batch_size)]
+    print(f"\n▶️ {model}: {workers} worker(s)")
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=scratch_dir, env=env)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} --workers {workers} failed with exit code {proc.returncode}")
+
+    with open(os.path.join(scratch_dir, profile_name)) as f:
+        profile = json.load(f)
+    # Skip the first epoch (graph tracing) when there is more than one
+    steady = profile["epochs"][1:] or profile["epochs"]
+    return {
+        "workers": workers,
+        "global_images_per_sec": profile["summary"]["steady_state_global_images_per_sec"],
+        "epoch_seconds": round(sorted(e["epoch_seconds"] for e in steady)[len(steady) // 2], 2),
+        "input_wait_fraction": profile["summary"]["mean_input_wait_fraction"],
+        "peak_rss_mb_per_worker": profile["summary"]["peak_rss_mb"],
+        "wall_seconds": round(wall, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure data-parallel training speedup across local workers.")
+    parser.add_argument("--model", choices=sorted(SCRIPTS), default="segmentation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare.")
+    parser.add_argument("--epochs", type=int, default=2, help="Epochs per run (the first is treated as warm-up).")
+    parser.add_argument("--batch-size", type=int, default=16, help="Global batch size, constant across runs.")
+    parser.add_argument("--data-root", type=str, default=ML_ROOT,
+                        help="Directory holding dataset/, dataset_masks/ and cache/ (default: ml_services root).")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON output path.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="training_scaling_") as scratch:
+        for workers in args.workers:
+            results.append(run_training(args.model, workers, args.epochs, args.batch_size,
+                                        os.path.join(scratch, f"workers_{workers}"), args.data_root))
+
+    baseline = results[0]["global_images_per_sec"] or 0
+    print(f"\n{'Workers':>8}{'images/sec':>12}{'speedup':>10}{'efficiency':>12}{'epoch s':>10}{'input wait':>12}")
+    for r in results:
+        speedup = r["global_images_per_sec"] / baseline if baseline else 0.0
+        r["speedup"] = round(speedup, 2)
+        r["efficiency"] = round(speedup * results[0]["workers"] / r["workers"], 2)
+        print(f"{r['workers']:>8}{r['global_images_per_sec']:>12.1f}{speedup:>9.2f}x{r['efficiency']:>12.0%}"
+              f"{r['epoch_seconds']:>10.1f}{r['input_wait_fraction']:>12.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "batch_size": args.batch_size, "epochs": args.epochs,
+                       "cpus": os.cpu_count(), "runs": results}, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+import tensorflow as tf
+
+# Crash-safe training.
+# BackupAndRestore snapshots model + optimizer state every epoch and resumes from it on the
+# next fit() with the same directory. ResumableEarlyStopping keeps its own patience/best-epoch
+# state and best weights next to that backup, so a resumed run stops at the same point an
+# uninterrupted one would have.
+
+STATE_NAME = "early_stopping.json"
+BEST_WEIGHTS_NAME = "best.weights.h5"
+
+class ResumableEarlyStopping(tf.keras.callbacks.Callback):
+    """
+    Early stopping + best-model selection whose state survives a restart.
+    At the end of training the best weights are restored into the model and a summary of the
+    compute saved by stopping early (and by resuming instead of restarting) is printed and,
+    if report_path is set, written as JSON.
+    """
+    def __init__(self, state_dir, max_epochs, monitor="val_loss", mode="min", patience=5, min_delta=1e-4,
+                 report_path=None):
+        super().__init__()
+        if mode not in ("min", "max"):
+            raise ValueError(f"mode must be 'min' or 'max', got {mode!r}")
+        self.state_dir = state_dir
+        self.max_epochs = max_epochs
+        self.monitor = monitor
+        self.mode = mode
+        self.patience = patience
+        self.min_delta = min_delta
+        self.report_path = report_path
+        self.state_path = os.path.join(state_dir, STATE_NAME)
+        self.best_weights_path = os.path.join(state_dir, BEST_WEIGHTS_NAME)
+        self.summary = None
+
+    def _improved(self, current):
+        if self.best is None:
+            return True
+        if self.mode == "min":
+            return current < self.best - self.min_delta
+        return current > self.best + self.min_delta
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "monitor": self.monitor,
+                "best": self.best,
+                "best_epoch": self.best_epoch,
+                "wait": self.wait,
+                "epoch_seconds": self.epoch_seconds,
+            }, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def on_train_begin(self, logs=None):
+        self.best, self.best_epoch, self.wait = None, None, 0
+        self.epoch_seconds = []
+        self.stopped_epoch = None
+        self.resumed_from_epoch = None
+        self._last_epoch = 0
+
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            if state.get("monitor") == self.monitor:
+                self.best = state["best"]
+                self.best_epoch = state["best_epoch"]
+                self.wait = state["wait"]
+                self.epoch_seconds = state["epoch_seconds"]
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if self.resumed_from_epoch is None:
+            self.resumed_from_epoch = epoch
+            if epoch > 0:
+                print(f"♻️ Resumed from checkpoint at epoch {epoch + 1}/{self.max_epochs} "
+                      f"(best {self.monitor} so far: {self.best})")
+        self._epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self._epoch_start)
+        self._last_epoch = epoch + 1
+
+        current = (logs or {}).get(self.monitor)
+        if current is None:
+            print(f"⚠️ Early stopping metric '{self.monitor}' not in logs ({', '.join(logs or {})}); skipping.")
+            return
+        current = float(current)
+
+        if self._improved(current):
+            self.best, self.best_epoch, self.wait = current, epoch + 1, 0
+            os.makedirs(self.state_dir, exist_ok=True)
+            self.model.save_weights(self.best_weights_path)
+        else:
+            self.wait += 1
+            if self.wait >= self.patience:
+                self.stopped_epoch = epoch + 1
+                self.model.stop_training = True
+                print(f"🛑 Early stopping: no {self.monitor} improvement for {self.patience} epoch(s)")
+        self._save_state()
+
+    def on_train_end(self, logs=None):
+        if os.path.exists(self.best_weights_path):
+            self.model.load_weights(self.best_weights_path)
+            print(f"🏆 Restored best weights from epoch {self.best_epoch} ({self.monitor}={self.best:.4f})")
+
+        mean_epoch = float(np.mean(self.epoch_seconds)) if self.epoch_seconds else 0.0
+        epochs_skipped = max(0, self.max_epochs - self._last_epoch) if self.stopped_epoch else 0
+        resumed_from = self.resumed_from_epoch or 0
+        self.summary = {
+            "monitor": self.monitor,
+            "max_epochs": self.max_epochs,
+            "epochs_completed": self._last_epoch,
+            "resumed_from_epoch": resumed_from,
+            "stopped_early": self.stopped_epoch is not None,
+            "best_epoch": self.best_epoch,
+            "best_value": self.best,
+            "mean_epoch_seconds": round(mean_epoch, 2),
+            "epochs_skipped": epochs_skipped,
+            "estimated_seconds_saved": round(epochs_skipped * mean_epoch, 1),
+            "estimated_seconds_recovered_by_resume": round(resumed_from * mean_epoch, 1),
+        }
+        print(f"💾 Training summary: {self.summary['epochs_completed']}/{self.max_epochs} epochs, "
+              f"best epoch {self.best_epoch}, ~{self.summary['estimated_seconds_saved']}s saved by early stopping, "
+              f"~{self.summary['estimated_seconds_recovered_by_resume']}s recovered by resuming")
+
+        if self.report_path:
+            os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+            with open(self.report_path, "w") as f:
+                json.dump(self.summary, f, indent=2)
+
+        # Training finished; the next run starts fresh (BackupAndRestore drops its backup the same way)
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+def checkpoint_callbacks(run_name, max_epochs, checkpoint_dir="checkpoints", monitor="val_loss", mode="min",
+                         patience=5, save_freq="epoch", report_path=None):
+    """
+    Callbacks for resumable training: periodic model + optimizer backups (save_freq is "epoch" or
+    a number of batches), automatic resume, early stopping and best-model restore.
+    Re-running the same script after a crash continues from the last backup.
+    """
+    run_dir = os.path.join(checkpoint_dir, run_name)
+    return [
+        tf.keras.callbacks.BackupAndRestore(os.path.join(run_dir, "backup"), save_freq=save_freq),
+        ResumableEarlyStopping(os.path.join(run_dir, "early_stopping"), max_epochs, monitor=monitor, mode=mode,
+                               patience=patience, report_path=report_path),
+    ]
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import numpy as np
+import tensorflow as tf
+
+# Knowledge distillation of the MobileNetV2 wound classifier into a compact student,
+# plus the teacher-vs-student measurements (accuracy, latency, memory) used to decide
+# whether the student is good enough to serve on constrained instances.
+
+EPSILON = 1e-7
+
+def _soften(probabilities, temperature):
+    # Both models end in softmax; log-probabilities are logits up to a constant, so
+    # re-applying softmax at temperature T gives the usual softened distribution
+    return tf.nn.softmax(tf.math.log(probabilities + EPSILON) / temperature, axis=-1)
+
+class Distiller(tf.keras.Model):
+    """
+    Trains `student` on a mix of the hard labels and the frozen `teacher`'s softened predictions:
+        loss = alpha * CE(labels, student) + (1 - alpha) * T^2 * KL(teacher_T || student_T)
+    Calling the distiller runs the student only, so evaluate()/predict() measure the student.
+    """
+    def __init__(self, student, teacher, temperature=4.0, alpha=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.student = student
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.temperature = temperature
+        self.alpha = alpha
+        self.student_loss_fn = tf.keras.losses.SparseCategoricalCrossentropy()
+        self.distillation_loss_fn = tf.keras.losses.KLDivergence()
+
+    def call(self, inputs, training=False):
+        return self.student(inputs, training=training)
+
+    def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+        student_loss = self.student_loss_fn(y, y_pred)
+        teacher_pred = self.teacher(x, training=False)
+        distillation_loss = self.distillation_loss_fn(
+            _soften(teacher_pred, self.temperature), _soften(y_pred, self.temperature)
+        ) * (self.temperature ** 2)
+        return self.alpha * student_loss + (1.0 - self.alpha) * distillation_loss
+
+def evaluate_accuracy(model, dataset):
+    """Top-1 accuracy of a softmax classifier over a (images, labels) dataset."""
+    correct = total = 0
+    for images, labels in dataset:
+        preds = np.argmax(model(images, training=False).numpy(), axis=-1)
+        correct += int(np.sum(preds == labels.numpy()))
+        total += int(labels.shape[0])
+    return correct / total if total else None
+
+def measure_latency(model, input_shape=(224, 224, 3), batch_size=1, runs=50, warmup=5):
+    """Per-call latency (ms) of a direct model call, as WoundAnalyzer runs it for one image."""
+    batch = np.random.rand(batch_size, *input_shape).astype(np.float32)
+    for _ in range(warmup):
+        model(batch, training=False)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(batch, training=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+        "mean_ms": round(float(np.mean(timings)), 2),
+    }
+
+def _rss_mb():
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def _footprint(model_path):
+    """Child-process half of measure_memory(): prints the RSS cost of loading + running one model."""
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    import resource
+    import tensorflow as tf_child
+
+    # Initialise the TF runtime first so only the model itself is counted
+    tf_child.constant(0.0) + 1.0
+    baseline = _rss_mb()
+    model = tf_child.keras.models.load_model(model_path, compile=False)
+    after_load = _rss_mb()
+    model(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), training=False)
+    after_predict = _rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "load_mb": round(after_load - baseline, 1),
+        "load_and_predict_mb": round(after_predict - baseline, 1),
+        "process_peak_mb": round(peak, 1),
+    }))
+
+def measure_memory(model_path, timeout=300):
+    """Loads the model in a fresh interpreter and reports how much RSS it adds (MB)."""
+    proc = subprocess.run(
+        [sys.executable, "-m", "classification.distillation", os.path.abspath(model_path)],
+        capture_output=True, text=True, timeout=timeout,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        print(f"⚠️ Memory measurement failed for {model_path}: {proc.stderr[-500:]}")
+        return None
+
+def compare_models(models, val_ds, input_shape=(224, 224, 3), runs=50):
+    """
+    Builds the teacher/student comparison. models maps a name to (keras model, saved file path).
+    Returns {name: {accuracy, params, file_size_mb, latency, memory}}.
+    """
+    report = {}
+    for name, (model, path) in models.items():
+        print(f"📏 Measuring {name}...")
+        report[name] = {
+            "accuracy": evaluate_accuracy(model, val_ds),
+            "params": int(model.count_params()),
+            "file_size_mb": round(os.path.getsize(path) / (1024 * 1024), 2) if path and os.path.exists(path) else None,
+            "latency": measure_latency(model, input_shape, runs=runs),
+            "memory": measure_memory(path) if path and os.path.exists(path) else None,
+        }
+    return report
+
+if __name__ == "__main__":
+    _footprint(sys.argv[1])
@@ -3,15 +3,19 @@ from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
 from tensorflow.keras.models import Model
 
-def create_wound_classifier(input_shape=(224, 224, 3), num_classes=5):
+def create_wound_classifier(input_shape=(224, 224, 3), num_classes=5, alpha=1.0, weights='imagenet'):
     """
     Creates a Transfer Learning model using MobileNetV2 for wound classification.
+    alpha is the MobileNetV2 width multiplier (0.35, 0.5, 0.75, 1.0 have ImageNet weights);
+    smaller widths and input sizes give the cheaper serving variants (see analysis/model_variants.py).
+    weights=None builds a randomly initialized network (benchmarks, offline tests).
     """
     # Load the base model with pre-trained ImageNet weights
     base_model = MobileNetV2(
-        weights='imagenet', 
+        weights=weights, 
         include_top=False, 
-        input_shape=input_shape
+        input_shape=input_shape,
+        alpha=alpha
     )
     
     # Freeze the base layers initially
@@ -34,3 +38,41 @@ def create_wound_classifier(input_shape=(224, 224, 3), num_classes=5):
     )
     
     return model
+
+def create_student_classifier(input_shape=(224, 224, 3), num_classes=5, architecture="mobilenet_v2_035"):
+    """
+    Compact classifier for knowledge distillation (see distill_classifier.py).
+
+    architecture:
+      "mobilenet_v2_035" - MobileNetV2 at width 0.35 (ImageNet weights, fine-tuned) with a softmax head,
+                            roughly 1/6 of the teacher's parameters.
+      "tiny_cnn"         - four conv blocks trained from scratch, for the most constrained instances.
+    Outputs softmax probabilities like create_wound_classifier, so it is a drop-in replacement at serving time.
+    Returned uncompiled; the distiller compiles it.
+    """
+    if architecture == "mobilenet_v2_035":
+        base_model = MobileNetV2(
+            weights='imagenet',
+            include_top=False,
+            input_shape=input_shape,
+            alpha=0.35
+        )
+        x = GlobalAveragePooling2D()(base_model.output)
+        x = Dropout(0.2)(x)
+        predictions = Dense(num_classes, activation='softmax')(x)
+        return Model(inputs=base_model.input, outputs=predictions, name="wound_student_mobilenet_v2_035")
+
+    if architecture == "tiny_cnn":
+        inputs = tf.keras.Input(shape=input_shape)
+        x = inputs
+        for filters in (16, 32, 64, 128):
+            x = tf.keras.layers.Conv2D(filters, 3, strides=2, padding='same', use_bias=False)(x)
+            x = tf.keras.layers.BatchNormalization()(x)
+            x = tf.keras.layers.ReLU()(x)
+            x = tf.keras.layers.SeparableConv2D(filters, 3, padding='same', activation='relu')(x)
+        x = GlobalAveragePooling2D()(x)
+        x = Dropout(0.2)(x)
+        predictions = Dense(num_classes, activation='softmax')(x)
+        return Model(inputs=inputs, outputs=predictions, name="wound_student_tiny_cnn")
+
+    raise ValueError(f"Unknown student architecture: {architecture}")
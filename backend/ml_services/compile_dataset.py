@@ -0,0 +1,20 @@
+import argparse
+from preprocessing.dataset import load_wound_dataset
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the wound dataset into memory-mappable uint8 shards.")
+    parser.add_argument("--dataset", type=str, default="dataset", help="Dataset root with one folder per class.")
+    parser.add_argument("--output", type=str, default="cache/compiled", help="Directory for shards and manifest.")
+    parser.add_argument("--image-size", type=int, default=224, help="Square side length images are resized to.")
+    parser.add_argument("--shard-size", type=int, default=512, help="Images per shard file.")
+    parser.add_argument("--with-masks", action="store_true", help="Also compile segmentation masks.")
+    parser.add_argument("--annotations", type=str, default="dataset_masks",
+                        help="Annotated masks mirroring the dataset layout; override the placeholders.")
+    args = parser.parse_args()
+
+    image_size = (args.image_size, args.image_size)
+    load_wound_dataset(args.dataset, image_size, compiled_dir=args.output, with_masks=args.with_masks,
+                       annotations_dir=args.annotations, shard_size=args.shard_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import gzip
+import time
+import numpy as np
+
+# Quality / size / speed measurements shared by every export candidate. Keras models and
+# TFLiteModel wrappers are both driven through predict(), the call WoundAnalyzer makes.
+
+def classification_metrics(model, dataset):
+    """Top-1 accuracy over a (images, labels) dataset."""
+    correct = total = 0
+    for images, labels in dataset:
+        preds = np.argmax(model.predict(images.numpy(), verbose=0), axis=-1)
+        correct += int(np.sum(preds == labels.numpy()))
+        total += int(labels.shape[0])
+    return {"accuracy": round(correct / total, 4) if total else None}
+
+def segmentation_metrics(model, dataset, threshold=0.5):
+    """Mean per-image Dice and IoU (plus pixel accuracy) of thresholded masks over an (images, masks) dataset."""
+    dice, iou, pixel_acc = [], [], []
+    for images, masks in dataset:
+        pred = model.predict(images.numpy(), verbose=0) > threshold
+        true = masks.numpy() > 0.5
+        for p, t in zip(pred, true):
+            intersection = np.logical_and(p, t).sum()
+            union = np.logical_or(p, t).sum()
+            total = p.sum() + t.sum()
+            # An empty prediction of an empty mask counts as a perfect match
+            dice.append(2.0 * intersection / total if total else 1.0)
+            iou.append(intersection / union if union else 1.0)
+            pixel_acc.append(float(np.mean(p == t)))
+    if not dice:
+        return {"dice": None, "iou": None, "pixel_accuracy": None}
+    return {
+        "dice": round(float(np.mean(dice)), 4),
+        "iou": round(float(np.mean(iou)), 4),
+        "pixel_accuracy": round(float(np.mean(pixel_acc)), 4),
+    }
+
+def cpu_latency(model, input_shape, runs=30, warmup=3):
+    """Single-image predict() latency in ms (p50/p95/mean)."""
+    batch = np.random.rand(1, *input_shape).astype(np.float32)
+    for _ in range(warmup):
+        model.predict(batch, verbose=0)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.predict(batch, verbose=0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+        "mean_ms": round(float(np.mean(timings)), 2),
+    }
+
+def file_sizes(path):
+    """On-disk size and gzip-compressed size in MB (pruned zeros only pay off once compressed)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return {
+        "size_mb": round(len(data) / (1024 * 1024), 3),
+        "gzip_mb": round(len(gzip.compress(data, compresslevel=6)) / (1024 * 1024), 3),
+    }
@@ -0,0 +1,83 @@
+import numpy as np
+import tensorflow as tf
+
+# One-shot magnitude pruning.
+# The smallest-magnitude weights of every large Conv2D / Dense kernel are set to zero, then an
+# optional short fine-tune (with the zeros held in place) recovers most of the lost accuracy.
+# Zeros don't make a dense kernel faster on CPU, but they compress very well, so the gain shows
+# up in the gzipped model size (and in TFLite files, which are usually shipped compressed).
+
+PRUNABLE_LAYERS = (tf.keras.layers.Conv2D, tf.keras.layers.Dense)
+MIN_PRUNABLE_WEIGHTS = 1024
+
+def _all_layers(model):
+    for layer in model.layers:
+        if hasattr(layer, "layers"):
+            yield from _all_layers(layer)
+        else:
+            yield layer
+
+def prunable_kernels(model, min_weights=MIN_PRUNABLE_WEIGHTS):
+    """
+    Kernels worth pruning: Conv2D / Dense (pointwise convs included) with at least min_weights
+    entries. Depthwise kernels, biases and normalization parameters are tiny and left alone.
+    """
+    kernels = []
+    for layer in _all_layers(model):
+        # DepthwiseConv2D subclasses Conv2D in some Keras versions; its weights are too few to matter
+        if isinstance(layer, tf.keras.layers.DepthwiseConv2D) or not isinstance(layer, PRUNABLE_LAYERS):
+            continue
+        kernel = getattr(layer, "kernel", None)
+        if kernel is not None and int(np.prod(kernel.shape)) >= min_weights:
+            kernels.append(kernel)
+    return kernels
+
+def prune_model(model, sparsity):
+    """
+    Returns (pruned copy of model, masks). Each prunable kernel keeps its largest (1 - sparsity)
+    fraction of weights by magnitude. masks holds one 0/1 array per kernel, in prunable_kernels() order.
+    """
+    if not 0.0 <= sparsity < 1.0:
+        raise ValueError(f"sparsity must be in [0, 1), got {sparsity}")
+    pruned = tf.keras.models.clone_model(model)
+    pruned.set_weights(model.get_weights())
+
+    masks = []
+    for kernel in prunable_kernels(pruned):
+        values = kernel.numpy()
+        threshold = np.quantile(np.abs(values), sparsity)
+        mask = (np.abs(values) > threshold).astype(values.dtype)
+        kernel.assign(values * mask)
+        masks.append(mask)
+    return pruned, masks
+
+def model_sparsity(model):
+    """Fraction of zero weights across the prunable kernels."""
+    kernels = prunable_kernels(model)
+    total = sum(int(np.prod(k.shape)) for k in kernels)
+    zeros = sum(int(np.sum(k.numpy() == 0)) for k in kernels)
+    return zeros / total if total else 0.0
+
+class KeepPruned(tf.keras.callbacks.Callback):
+    """Re-applies the pruning masks after every training batch so fine-tuning can't regrow pruned weights."""
+    def __init__(self, masks):
+        super().__init__()
+        self.masks = masks
+
+    def on_train_batch_end(self, batch, logs=None):
+        for kernel, mask in zip(prunable_kernels(self.model), self.masks):
+            kernel.assign(kernel * mask)
+
+def fine_tune_pruned(model, masks, train_ds, loss, epochs=2, val_ds=None, learning_rate=1e-5):
+    """Briefly retrains a pruned model at a low learning rate with its masks enforced."""
+    if epochs <= 0:
+        return model
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss=loss,
+        metrics=["accuracy"]
+    )
+    model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=[KeepPruned(masks)], verbose=2)
+    # Fresh optimizer, so the saved model doesn't carry the fine-tuning Adam slots
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss=loss, metrics=["accuracy"])
+    return model
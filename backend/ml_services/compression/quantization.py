@@ -0,0 +1,90 @@
+import threading
+import numpy as np
+import tensorflow as tf
+
+# Post-training quantization to TFLite.
+#   "float32" - plain conversion, the reference for the quantized files
+#   "dynamic" - int8 weights, float activations (no calibration needed)
+#   "float16" - float16 weights
+#   "int8"    - int8 weights and activations; activation ranges come from a calibration set
+#               drawn from the training data. Inputs/outputs stay float32 so the model is a
+#               drop-in replacement for the Keras one.
+
+QUANTIZATION_MODES = ("float32", "dynamic", "float16", "int8")
+
+def quantize_model(model, mode, calibration_images=None):
+    """
+    Converts a Keras model to TFLite bytes. calibration_images (an iterable of float32
+    (H, W, 3) arrays in [0, 1]) is required for "int8".
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}' (choose from {', '.join(QUANTIZATION_MODES)})")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if mode != "float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        if calibration_images is None:
+            raise ValueError("int8 quantization needs calibration_images")
+        images = list(calibration_images)
+
+        def representative_dataset():
+            for image in images:
+                yield [np.expand_dims(image, 0).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+    return converter.convert()
+
+def _interpreter_class():
+    # LiteRT is the standalone successor of tf.lite's interpreter; use it when installed
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        return tf.lite.Interpreter
+
+class TFLiteModel:
+    """
+    Runs a .tflite model behind the subset of the Keras model API the analyzer and the export
+    report use: predict(batch) and input_shape. Batches are run one image at a time; the
+    interpreter isn't thread-safe, so calls are serialized.
+    """
+    def __init__(self, model_path=None, model_content=None, num_threads=None):
+        self.interpreter = _interpreter_class()(model_path=model_path, model_content=model_content,
+                                                num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in self._input["shape"][1:])
+        self._lock = threading.Lock()
+
+    def _quantize(self, batch, details):
+        scale, zero_point = details["quantization"]
+        if details["dtype"] in (np.int8, np.uint8) and scale:
+            return np.round(batch / scale + zero_point).astype(details["dtype"])
+        return batch.astype(details["dtype"])
+
+    def _dequantize(self, values, details):
+        scale, zero_point = details["quantization"]
+        if details["dtype"] in (np.int8, np.uint8) and scale:
+            return (values.astype(np.float32) - zero_point) * scale
+        return values
+
+    def predict(self, batch, verbose=0):
+        outputs = []
+        with self._lock:
+            for image in np.asarray(batch, dtype=np.float32):
+                self.interpreter.set_tensor(self._input["index"], self._quantize(image[None], self._input))
+                self.interpreter.invoke()
+                outputs.append(self._dequantize(self.interpreter.get_tensor(self._output["index"]), self._output)[0])
+        return np.stack(outputs)
+
+    def __call__(self, batch, training=False):
+        return self.predict(batch)
+
+def load_model(path):
+    """Loads a Keras model, or a TFLiteModel for .tflite files."""
+    if path.endswith(".tflite"):
+        return TFLiteModel(model_path=path)
+    return tf.keras.models.load_model(path)
@@ -0,0 +1,84 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from preprocessing.dataset import load_wound_dataset, split_indices, sample_stream
+from preprocessing.augmentation import batch_augment_fn
+from classification.model import create_student_classifier
+from classification.distillation import Distiller, compare_models
+from training_profiler import profiler_from_env
+from checkpointing import checkpoint_callbacks
+
+def print_comparison(report):
+    print(f"\n{'Model':<10}{'accuracy':>10}{'params':>12}{'size MB':>10}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>10}")
+    for name, r in report.items():
+        memory = r["memory"]["load_and_predict_mb"] if r["memory"] else float("nan")
+        print(f"{name:<10}{r['accuracy']:>10.3f}{r['params']:>12,}{r['file_size_mb'] or 0:>10.1f}"
+              f"{r['latency']['p50_ms']:>10.1f}{r['latency']['p95_ms']:>10.1f}{memory:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the wound classifier into a compact student model.")
+    parser.add_argument("--teacher", type=str, default="models/wound_classifier.keras", help="Trained teacher model.")
+    parser.add_argument("--student", choices=["mobilenet_v2_035", "tiny_cnn"], default="mobilenet_v2_035",
+                        help="Student architecture.")
+    parser.add_argument("--output", type=str, default="models/wound_classifier_student.keras",
+                        help="Where to save the trained student.")
+    parser.add_argument("--epochs", type=int, default=30, help="Maximum epochs (early stopping usually ends sooner).")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--temperature", type=float, default=4.0, help="Softening temperature for teacher/student.")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Weight of the hard-label loss (rest is distillation).")
+    parser.add_argument("--report", type=str, default="distillation_report.json", help="Teacher vs student report.")
+    parser.add_argument("--latency-runs", type=int, default=50)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.teacher):
+        print(f"Teacher model {args.teacher} not found. Please run train_classifier.py first.")
+        return
+
+    store = load_wound_dataset("dataset", image_size=(224, 224), with_masks=False, save_classes=False)
+    train_idx, val_idx = split_indices(store)
+    train_ds = sample_stream(store, train_idx, batch_size=args.batch_size, training=True, targets="label",
+                             augment_fn=batch_augment_fn())
+    val_ds = sample_stream(store, val_idx, batch_size=args.batch_size, targets="label")
+
+    print(f"\nLoading teacher from {args.teacher}...")
+    teacher = tf.keras.models.load_model(args.teacher)
+    print(f"Building {args.student} student...")
+    student = create_student_classifier(input_shape=(224, 224, 3), num_classes=len(store.classes),
+                                        architecture=args.student)
+
+    distiller = Distiller(student, teacher, temperature=args.temperature, alpha=args.alpha)
+    distiller.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=args.learning_rate),
+        metrics=['accuracy']
+    )
+    # Build before fit so BackupAndRestore can restore into it
+    distiller(np.zeros((1, 224, 224, 3), dtype=np.float32))
+
+    profiler = profiler_from_env("distillation_profile.json")
+    distiller.fit(
+        profiler.instrument(train_ds),
+        validation_data=val_ds,
+        epochs=args.epochs,
+        callbacks=[profiler] + checkpoint_callbacks("student", args.epochs, patience=5,
+                                                    report_path="distillation_summary.json")
+    )
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    student.save(args.output)
+    print(f"\nStudent model saved at {args.output}")
+
+    report = compare_models(
+        {"teacher": (teacher, args.teacher), "student": (student, args.output)},
+        val_ds, runs=args.latency_runs
+    )
+    print_comparison(report)
+    with open(args.report, "w") as f:
+        json.dump({"student_architecture": args.student, "temperature": args.temperature, "alpha": args.alpha,
+                   "models": report}, f, indent=4)
+    print(f"\nReport saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
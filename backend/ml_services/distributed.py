@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import socket
+import tempfile
+import subprocess
+import numpy as np
+import tensorflow as tf
+from preprocessing.dataset import sample_stream
+
+# Local multi-process data-parallel training.
+# launch_local_workers() re-runs a training script as N processes on this machine, each with a
+# TF_CONFIG describing a localhost cluster, so MultiWorkerMirroredStrategy all-reduces gradients
+# between them. Each worker reads only its own shard of the sample indices, and gets
+# cpus / N intra-op threads (via ML_WORKERS, see thread_tuning.py).
+# Keras 3's fit() doesn't handle MultiWorkerMirroredStrategy, so fit_distributed() runs the
+# epochs itself while still driving the usual Keras callbacks.
+
+WORKER_ENV = "TF_CONFIG"
+
+def worker_info():
+    """Returns (worker_index, num_workers) from TF_CONFIG, or (0, 1) for a plain single-process run."""
+    config = os.environ.get(WORKER_ENV)
+    if not config:
+        return 0, 1
+    config = json.loads(config)
+    return int(config["task"]["index"]), len(config["cluster"]["worker"])
+
+def is_distributed_worker():
+    return worker_info()[1] > 1
+
+def is_chief():
+    return worker_info()[0] == 0
+
+def worker_path(path):
+    """Chief writes to path; other workers write to a private scratch copy so files don't collide."""
+    index, _ = worker_info()
+    if index == 0:
+        return path
+    return os.path.join(tempfile.gettempdir(), f"wound_care_worker_{index}", path)
+
+def get_strategy():
+    """MultiWorkerMirroredStrategy inside a launched worker, the default strategy otherwise."""
+    if is_distributed_worker():
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    return tf.distribute.get_strategy()
+
+def shard_indices(indices, worker_index, num_workers):
+    """
+    Deterministic, equal-length shards. Every worker must run the same number of steps or the
+    collectives deadlock, so the remainder (< num_workers samples) is dropped.
+    """
+    indices = np.asarray(indices)
+    per_worker = len(indices) // num_workers
+    if per_worker == 0:
+        raise ValueError(f"Cannot shard {len(indices)} samples across {num_workers} workers")
+    return indices[worker_index * per_worker:(worker_index + 1) * per_worker]
+
+def distribute_stream(strategy, make_dataset, global_batch_size):
+    """
+    Builds one input pipeline per worker: make_dataset(shard_index, num_shards, per_replica_batch)
+    must return a dataset over that worker's shard. Auto-sharding is off because the shards are
+    cut by sample index before anything is read.
+    """
+    def _dataset_fn(input_context):
+        ds = make_dataset(input_context.input_pipeline_id, input_context.num_input_pipelines,
+                          input_context.get_per_replica_batch_size(global_batch_size))
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+        return ds.with_options(options)
+
+    return strategy.distribute_datasets_from_function(_dataset_fn)
+
+def build_streams(strategy, store, train_idx, val_idx, batch_size, targets, augment_fn=None, instrument=None):
+    """
+    Train/validation streams for the current process. batch_size is the global batch; under a
+    multi-worker strategy each worker streams its own shard at batch_size / num_workers.
+    instrument (e.g. ThroughputProfiler.instrument) is applied to the training stream.
+    """
+    instrument = instrument or (lambda ds: ds)
+    if strategy.num_replicas_in_sync == 1:
+        train_ds = sample_stream(store, train_idx, batch_size=batch_size, training=True, targets=targets,
+                                 augment_fn=augment_fn)
+        return instrument(train_ds), sample_stream(store, val_idx, batch_size=batch_size, targets=targets)
+
+    def _train(shard, num_shards, per_replica_batch):
+        return instrument(sample_stream(store, shard_indices(train_idx, shard, num_shards), per_replica_batch,
+                                        training=True, targets=targets, augment_fn=augment_fn))
+
+    def _val(shard, num_shards, per_replica_batch):
+        return sample_stream(store, shard_indices(val_idx, shard, num_shards), per_replica_batch, targets=targets)
+
+    return distribute_stream(strategy, _train, batch_size), distribute_stream(strategy, _val, batch_size)
+
+def train_model(model, strategy, train_ds, val_ds, epochs, callbacks):
+    """model.fit() for a single process, fit_distributed() for a multi-worker cluster."""
+    if strategy.num_replicas_in_sync == 1:
+        return model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=callbacks)
+    return fit_distributed(model, strategy, train_ds, val_ds, epochs=epochs, callbacks=callbacks)
+
+def _free_ports(count):
+    sockets, ports = [], []
+    for _ in range(count):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("localhost", 0))
+        sockets.append(s)
+        ports.append(s.getsockname()[1])
+    for s in sockets:
+        s.close()
+    return ports
+
+def launch_local_workers(argv, num_workers):
+    """
+    Runs `python <argv>` as num_workers cooperating processes and waits for them.
+    If any worker fails the others are terminated. Returns the first non-zero exit code, or 0.
+    """
+    ports = _free_ports(num_workers)
+    cluster = {"worker": [f"localhost:{port}" for port in ports]}
+    print(f"🚀 Launching {num_workers} local training workers on ports {ports}")
+
+    procs = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env[WORKER_ENV] = json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}})
+        env["ML_WORKERS"] = str(num_workers)
+        procs.append(subprocess.Popen([sys.executable] + list(argv), env=env))
+
+    exit_code = 0
+    try:
+        for proc in procs:
+            code = proc.wait()
+            if code != 0 and exit_code == 0:
+                exit_code = code
+                print(f"❌ Training worker exited with code {code}; stopping the others")
+                for other in procs:
+                    if other.poll() is None:
+                        other.terminate()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+        raise
+    return exit_code
+
+def _per_example(values):
+    # Segmentation losses/accuracies come back per pixel; average them down to one value per image
+    values = tf.cast(values, tf.float32)
+    return tf.reduce_mean(tf.reshape(values, [tf.shape(values)[0], -1]), axis=1)
+
+def _accuracy(y_true, y_pred):
+    """Same dispatch as compile(metrics=["accuracy"]): binary for one output channel, sparse categorical otherwise."""
+    if y_pred.shape[-1] == 1:
+        correct = tf.equal(tf.cast(y_pred > 0.5, tf.float32), tf.cast(y_true, tf.float32))
+    else:
+        correct = tf.equal(tf.cast(tf.argmax(y_pred, axis=-1), tf.int32), tf.cast(tf.reshape(y_true, [-1]), tf.int32))
+    return _per_example(correct)
+
+def fit_distributed(model, strategy, train_ds, val_ds=None, epochs=1, callbacks=None, verbose=1):
+    """
+    Data-parallel equivalent of model.fit() for a compiled single-output model created under
+    strategy.scope(), fed by distribute_stream() datasets. Logs loss/accuracy (and val_*) reduced
+    over all workers, so callbacks such as early stopping make the same decision everywhere.
+    Only compile(metrics=["accuracy"]) (or no metrics) is supported; anything else raises
+    ValueError rather than silently disappearing from the logs and History.
+    Returns the History callback.
+    """
+    compile_config = model.get_compile_config() or {}
+    metrics = compile_config.get("metrics") or []
+    unsupported = [m for m in metrics if m not in ("accuracy", "acc")] + list(compile_config.get("weighted_metrics") or [])
+    if unsupported:
+        raise ValueError(f"fit_distributed only reports loss and accuracy; unsupported metrics: {unsupported}")
+    track_accuracy = bool(metrics)
+
+    loss_fn = tf.keras.losses.get(model.loss)
+    with strategy.scope():
+        model.optimizer.build(model.trainable_variables)
+
+    def _sums(per_loss, per_acc):
+        # Sum over the whole cluster so every worker sees global numbers
+        return tf.distribute.get_replica_context().all_reduce(
+            "SUM", [tf.reduce_sum(per_loss), tf.reduce_sum(per_acc), tf.cast(tf.shape(per_loss)[0], tf.float32)]
+        )
+
+    def _train_step(images, targets):
+        with tf.GradientTape() as tape:
+            predictions = model(images, training=True)
+            per_loss = _per_example(loss_fn(targets, predictions))
+            loss = tf.nn.compute_average_loss(per_loss)
+        grads = tape.gradient(loss, model.trainable_variables)
+        model.optimizer.apply_gradients(zip(grads, model.trainable_variables))
+        return _sums(per_loss, _accuracy(targets, predictions))
+
+    def _test_step(images, targets):
+        predictions = model(images, training=False)
+        return _sums(_per_example(loss_fn(targets, predictions)), _accuracy(targets, predictions))
+
+    @tf.function
+    def train_function(batch):
+        results = strategy.run(_train_step, args=batch)
+        return [strategy.experimental_local_results(r)[0] for r in results]
+
+    @tf.function
+    def test_function(batch):
+        results = strategy.run(_test_step, args=batch)
+        return [strategy.experimental_local_results(r)[0] for r in results]
+
+    callback_list = tf.keras.callbacks.CallbackList(
+        callbacks, add_history=True, add_progbar=verbose > 0 and is_chief(), model=model,
+        epochs=epochs, steps=None, verbose=verbose
+    )
+    model.stop_training = False
+    callback_list.on_train_begin()
+    # BackupAndRestore reports the epoch to resume from the same way it does for fit()
+    initial_epoch = getattr(model, "_initial_epoch", None) or 0
+
+    for epoch in range(initial_epoch, epochs):
+        callback_list.on_epoch_begin(epoch)
+        loss_sum = acc_sum = count = 0.0
+        iterator, step = iter(train_ds), 0
+        while True:
+            # Fetch inside the step, as fit() does, so input wait counts towards step time
+            callback_list.on_train_batch_begin(step)
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            batch_loss, batch_acc, batch_count = (float(v) for v in train_function(batch))
+            loss_sum, acc_sum, count = loss_sum + batch_loss, acc_sum + batch_acc, count + batch_count
+            callback_list.on_train_batch_end(step, {"loss": batch_loss / max(batch_count, 1.0)})
+            step += 1
+        logs = {"loss": loss_sum / max(count, 1.0)}
+        if track_accuracy:
+            logs["accuracy"] = acc_sum / max(count, 1.0)
+
+        if val_ds is not None:
+            loss_sum = acc_sum = count = 0.0
+            for batch in val_ds:
+                batch_loss, batch_acc, batch_count = (float(v) for v in test_function(batch))
+                loss_sum, acc_sum, count = loss_sum + batch_loss, acc_sum + batch_acc, count + batch_count
+            logs["val_loss"] = loss_sum / max(count, 1.0)
+            if track_accuracy:
+                logs["val_accuracy"] = acc_sum / max(count, 1.0)
+
+        callback_list.on_epoch_end(epoch, logs)
+        if model.stop_training:
+            break
+
+    callback_list.on_train_end()
+    return model.history
@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import argparse
+import numpy as np
+import tensorflow as tf
+from preprocessing.dataset import load_wound_dataset, split_indices, sample_stream, compiled_dir_for
+from compression.pruning import prune_model, fine_tune_pruned, model_sparsity
+from compression.quantization import quantize_model, TFLiteModel, QUANTIZATION_MODES
+from compression.evaluation import classification_metrics, segmentation_metrics, cpu_latency, file_sizes
+
+# Shrinks the trained models for deployment and reports what each option costs.
+# For every model, candidates are built from the trained file:
+#   keras                  - the original, as the reference
+#   tflite_<mode>          - post-training quantization (dynamic / float16 / int8 with calibration)
+#   pruned<NN>             - magnitude-pruned to NN% sparsity, then briefly fine-tuned
+#   pruned<NN>_tflite_<m>  - pruning followed by quantization
+# Each candidate is scored on the validation split (accuracy for the classifier, Dice/IoU for the
+# U-Net), its file size (raw and gzipped) and single-image CPU latency, and written to models/export/.
+
+TARGETS = {
+    "classifier": {
+        "default_path": "models/wound_classifier.keras",
+        "target": "label",
+        "loss": "sparse_categorical_crossentropy",
+        "metrics": classification_metrics,
+        "primary": "accuracy",
+    },
+    "segmentation": {
+        "default_path": "models/wound_segmentation_model.h5",
+        "target": "mask",
+        "loss": "binary_crossentropy",
+        "metrics": segmentation_metrics,
+        "primary": "dice",
+    },
+}
+
+def calibration_images(store, train_idx, count, seed=42):
+    """A fixed random sample of training images, normalized like the model inputs, for int8 calibration."""
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(train_idx, size=min(count, len(train_idx)), replace=False)
+    return [img.astype(np.float32) / 255.0 for img in store.images(np.sort(chosen))]
+
+def evaluate_candidate(model, path, spec, val_ds, input_shape, latency_runs):
+    result = {"file": path}
+    result.update(spec["metrics"](model, val_ds))
+    result.update(file_sizes(path))
+    result["latency"] = cpu_latency(model, input_shape, runs=latency_runs)
+    return result
+
+def export_target(name, args):
+    spec = TARGETS[name]
+    model_path = getattr(args, name) or spec["default_path"]
+    if not os.path.exists(model_path):
+        print(f"⚠️ {model_path} not found, skipping {name}. Train it first.")
+        return None
+
+    print(f"\n📦 Exporting {name} from {model_path}...")
+    model = tf.keras.models.load_model(model_path)
+    input_shape = tuple(int(d) for d in model.input_shape[1:])
+    image_size = (input_shape[1], input_shape[0])
+
+    store = load_wound_dataset(args.dataset, image_size=image_size, compiled_dir=compiled_dir_for(image_size),
+                               with_masks=spec["target"] == "mask", save_classes=False)
+    train_idx, val_idx = split_indices(store)
+    val_ds = sample_stream(store, val_idx, batch_size=args.batch_size, targets=spec["target"])
+    calibration = calibration_images(store, train_idx, args.calibration_samples)
+
+    out_dir = os.path.join(args.output_dir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    # WoundAnalyzer reads class names from the classifier's directory
+    classes_path = os.path.join(os.path.dirname(model_path), "classes.json")
+    if os.path.exists(classes_path):
+        shutil.copy(classes_path, out_dir)
+    candidates = {}
+
+    def add_tflite(label, source_model):
+        for mode in args.quantize:
+            tflite_path = os.path.join(out_dir, f"{stem}_{label}tflite_{mode}.tflite")
+            print(f"🔧 Quantizing {label or ''}{name} ({mode})...")
+            with open(tflite_path, "wb") as f:
+                f.write(quantize_model(source_model, mode, calibration if mode == "int8" else None))
+            candidates[f"{label}tflite_{mode}"] = (TFLiteModel(model_path=tflite_path), tflite_path)
+
+    candidates["keras"] = (model, model_path)
+    add_tflite("", model)
+
+    for sparsity in args.prune:
+        label = f"pruned{int(round(sparsity * 100))}"
+        print(f"✂️ Pruning {name} to {sparsity:.0%} sparsity...")
+        pruned, masks = prune_model(model, sparsity)
+        if args.finetune_epochs > 0:
+            train_ds = sample_stream(store, train_idx, batch_size=args.batch_size, training=True,
+                                     targets=spec["target"])
+            fine_tune_pruned(pruned, masks, train_ds, loss=spec["loss"], epochs=args.finetune_epochs, val_ds=val_ds)
+        pruned_path = os.path.join(out_dir, f"{stem}_{label}{os.path.splitext(model_path)[1]}")
+        pruned.save(pruned_path)
+        candidates[label] = (pruned, pruned_path)
+        add_tflite(f"{label}_", pruned)
+
+    report = {}
+    for label, (candidate, path) in candidates.items():
+        print(f"📏 Evaluating {name}/{label}...")
+        report[label] = evaluate_candidate(candidate, path, spec, val_ds, input_shape, args.latency_runs)
+        if label.startswith("pruned") and "tflite" not in label:
+            report[label]["sparsity"] = round(model_sparsity(candidate), 3)
+    return report
+
+def print_report(name, report):
+    primary = TARGETS[name]["primary"]
+    extra = "iou" if name == "segmentation" else None
+    baseline = report["keras"]
+    print(f"\n{name}")
+    print(f"{'candidate':<28}{primary:>10}{'Δ':>8}" + (f"{extra:>8}" if extra else "") +
+          f"{'size MB':>10}{'gzip MB':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>9}")
+    for label, r in report.items():
+        delta = (r[primary] - baseline[primary]) if r[primary] is not None and baseline[primary] is not None else 0.0
+        speedup = baseline["latency"]["p50_ms"] / r["latency"]["p50_ms"] if r["latency"]["p50_ms"] else 0.0
+        print(f"{label:<28}{r[primary] or 0:>10.4f}{delta:>+8.4f}" + (f"{r[extra] or 0:>8.4f}" if extra else "") +
+              f"{r['size_mb']:>10.2f}{r['gzip_mb']:>10.2f}{r['latency']['p50_ms']:>10.1f}{r['latency']['p95_ms']:>10.1f}"
+              f"{speedup:>8.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and/or quantize the trained models and compare the results.")
+    parser.add_argument("--models", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--classifier", type=str, default=None, help=f"Default: {TARGETS['classifier']['default_path']}")
+    parser.add_argument("--segmentation", type=str, default=None,
+                        help=f"Default: {TARGETS['segmentation']['default_path']}")
+    parser.add_argument("--dataset", type=str, default="dataset")
+    parser.add_argument("--prune", type=float, nargs="*", default=[0.5], help="Sparsity levels to try (0 disables).")
+    parser.add_argument("--quantize", nargs="*", choices=QUANTIZATION_MODES, default=["dynamic", "float16", "int8"])
+    parser.add_argument("--finetune-epochs", type=int, default=2, help="Fine-tuning epochs after pruning.")
+    parser.add_argument("--calibration-samples", type=int, default=100, help="Training images used to calibrate int8.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--latency-runs", type=int, default=30)
+    parser.add_argument("--output-dir", type=str, default="models/export")
+    parser.add_argument("--report", type=str, default="export_report.json")
+    args = parser.parse_args()
+    args.prune = [s for s in args.prune if s > 0]
+
+    reports = {}
+    for name in args.models:
+        report = export_target(name, args)
+        if report:
+            reports[name] = report
+            print_report(name, report)
+
+    with open(args.report, "w") as f:
+        json.dump({"calibration_samples": args.calibration_samples, "finetune_epochs": args.finetune_epochs,
+                   "models": reports}, f, indent=4)
+    print(f"\nReport saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
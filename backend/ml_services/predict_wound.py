@@ -1,17 +1,35 @@
 import os
 import argparse
 import json
-from analysis.wound_analyzer import WoundAnalyzer
+# TensorFlow (via WoundAnalyzer) is imported inside main(): batch tissue workers re-import this
+# module on spawn and only need OpenCV.
 
 def main():
-    parser = argparse.ArgumentParser(description="Analyze a wound image using MediWound AI pipeline.")
-    parser.add_argument("--image", type=str, required=True, help="Path to the wound image.")
+    parser = argparse.ArgumentParser(description="Analyze wound images using MediWound AI pipeline.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", type=str, help="Path to the wound image.")
+    source.add_argument("--input", type=str,
+                        help="Batch mode: directory (searched recursively) or glob pattern, e.g. 'photos/**/*.jpg'.")
+    parser.add_argument("--models", type=str, default="models", help="Directory with the trained models.")
+    parser.add_argument("--no-visualize", action="store_true", help="Single image: skip the overlay plot.")
+    # Batch mode
+    parser.add_argument("--output", type=str, default="analysis_results.jsonl",
+                        help="Batch mode: JSONL results file, appended to as images finish.")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Batch mode: overwrite --output instead of skipping images already in it.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch mode: images per inference call.")
+    parser.add_argument("--prefetch", type=int, default=32, help="Batch mode: images decoded ahead of inference.")
+    parser.add_argument("--decode-workers", type=int, default=4, help="Batch mode: image decoding threads.")
+    parser.add_argument("--tissue-workers", type=int, default=max(0, (os.cpu_count() or 1) - 1),
+                        help="Batch mode: processes for tissue analysis (0 = in the main process).")
     args = parser.parse_args()
 
     # Paths to the trained models
     # Assumes run from mediwound_ai root folder
-    model_dir = "models"
-    classifier_path = os.path.join(model_dir, "wound_classifier.h5")
+    model_dir = args.models
+    classifier_path = os.path.join(model_dir, "wound_classifier.keras")
+    if not os.path.exists(classifier_path):
+        classifier_path = os.path.join(model_dir, "wound_classifier.h5")
     segmentation_path = os.path.join(model_dir, "wound_segmentation_model.h5")
 
     # Check if models exist
@@ -20,11 +38,17 @@ def main():
         print("Please train the models first using train_classifier.py and train_segmentation.py.")
         return
 
-    # Check image
-    if not os.path.exists(args.image):
+    if args.input:
+        from analysis.batch import resolve_images
+        image_paths = resolve_images(args.input)
+        if not image_paths:
+            print(f"Error: No images match {args.input}.")
+            return
+    elif not os.path.exists(args.image):
         print(f"Error: Image {args.image} not found.")
         return
 
+    from analysis.wound_analyzer import WoundAnalyzer
     try:
         # Initialize analyzer
         analyzer = WoundAnalyzer(
@@ -32,6 +56,10 @@ def main():
             segmentation_path=segmentation_path
         )
 
+        if args.input:
+            run_batch_mode(analyzer, image_paths, args)
+            return
+
         # Analyze
         print(f"Analyzing {args.image} ...\n")
         results, img, mask = analyzer.analyze_wound(args.image)
@@ -42,11 +70,27 @@ def main():
         print("#######################")
 
         # Visualize prediction and mask overlay
-        print("Opening visualization dashboard...")
-        analyzer.visualize_result(img, mask, results)
+        if not args.no_visualize:
+            print("Opening visualization dashboard...")
+            analyzer.visualize_result(img, mask, results)
 
     except Exception as e:
         print(f"An error occurred during analysis: {e}")
 
+def run_batch_mode(analyzer, image_paths, args):
+    from analysis.batch import run_batch
+    print(f"Analyzing {len(image_paths)} images -> {args.output} "
+          f"(batch {args.batch_size}, {args.decode_workers} decode threads, {args.tissue_workers} tissue workers)")
+    summary = run_batch(
+        analyzer, image_paths, args.output,
+        batch_size=args.batch_size,
+        prefetch_depth=args.prefetch,
+        decode_workers=args.decode_workers,
+        tissue_workers=args.tissue_workers,
+        resume=not args.no_resume,
+    )
+    print(f"Done: {summary['analyzed']} analyzed, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {summary['elapsed_s']}s ({summary['images_per_sec']} images/sec)")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+import math
+import tensorflow as tf
+
+# Batched, in-graph geometric augmentation.
+# Mirrors the ImageDataGenerator settings used for training (rotation 20°, zoom 0.15,
+# horizontal flip, nearest fill) but transforms a whole batch with one projective-transform
+# op instead of one scipy affine_transform call per image in Python.
+
+def random_affine_transforms(batch_size, height, width, rotation_range=20, zoom_range=0.15, horizontal_flip=True,
+                             seed=None, rng=None):
+    """
+    Samples one random rotation/zoom/flip per image, centred on the image.
+    Returns a (batch, 8) float32 tensor in the output->input form ImageProjectiveTransformV3 expects.
+    Draws come from rng (a tf.random.Generator), else a generator seeded with seed, else the global
+    generator; successive draws from one generator are independent, so theta, zx, zy and the flip
+    are uncorrelated even when seeded.
+    """
+    if rng is None:
+        rng = tf.random.Generator.from_seed(seed) if seed is not None else tf.random.get_global_generator()
+    theta = rng.uniform([batch_size], -rotation_range, rotation_range) * (math.pi / 180.0)
+    zx = rng.uniform([batch_size], 1.0 - zoom_range, 1.0 + zoom_range)
+    zy = rng.uniform([batch_size], 1.0 - zoom_range, 1.0 + zoom_range)
+    if horizontal_flip:
+        flip = tf.where(rng.uniform([batch_size]) < 0.5, -1.0, 1.0)
+    else:
+        flip = tf.ones([batch_size])
+
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    # M = R(theta) @ diag(zx * flip, zy), applied about the image centre
+    a0, a1 = cos * zx * flip, -sin * zy
+    b0, b1 = sin * zx * flip, cos * zy
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    a2 = cx - a0 * cx - a1 * cy
+    b2 = cy - b0 * cx - b1 * cy
+    zeros = tf.zeros([batch_size])
+    return tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+def apply_transforms(images, transforms, interpolation="BILINEAR", fill_mode="NEAREST"):
+    """Warps a float batch (B, H, W, C) with per-image projective transforms in a single op."""
+    shape = tf.shape(images)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation=interpolation,
+        fill_mode=fill_mode
+    )
+
+def batch_augment_fn(rotation_range=20, zoom_range=0.15, horizontal_flip=True, with_masks=False, seed=None):
+    """
+    Builds a tf.data map function over normalized (images, targets) batches.
+    With with_masks=True the same transform is applied to the mask (nearest-neighbour, so it stays binary);
+    otherwise targets (class labels) pass through unchanged. Dict targets (see preprocessing.dataset)
+    have their "mask" entry transformed and everything else passed through.
+    A seed makes the sequence of batch transforms reproducible (the generator is created once here
+    and advances with every batch).
+    """
+    rng = tf.random.Generator.from_seed(seed) if seed is not None else tf.random.get_global_generator()
+
+    def _augment(images, targets):
+        shape = tf.shape(images)
+        transforms = random_affine_transforms(
+            shape[0], tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32),
+            rotation_range, zoom_range, horizontal_flip, rng=rng
+        )
+        images = apply_transforms(images, transforms, interpolation="BILINEAR")
+        if isinstance(targets, dict):
+            if "mask" in targets:
+                targets = dict(targets, mask=apply_transforms(targets["mask"], transforms, interpolation="NEAREST"))
+        elif with_masks:
+            targets = apply_transforms(targets, transforms, interpolation="NEAREST")
+        return images, targets
+
+    return _augment
@@ -1,6 +1,8 @@
 import os
+import hashlib
 import cv2
 import numpy as np
+import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from sklearn.model_selection import train_test_split
 
@@ -19,91 +21,214 @@ def _find_dataset_dir(base_dir):
 
 import json
 
-def load_and_preprocess_dataset(dataset_dir="dataset", image_size=(224, 224), test_size=0.2, random_state=42):
+# ---------------------------------------------------------------------------
+# Streaming tf.data pipeline
+# Images are decoded in parallel, cached as uint8 and only normalized to
+# float32 per batch, so memory no longer grows with the dataset size.
+# ---------------------------------------------------------------------------
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff')
+
+def list_dataset_files(dataset_dir="dataset", save_classes=True):
     """
-    Dynamically loads wound images from all class folders, resizes, normalizes,
-    and splits them into training and validation sets.
+    Walks the class folders and returns (paths, labels, classes) without decoding anything.
+    Classes with no images are skipped.
     """
     actual_dir = _find_dataset_dir(dataset_dir)
-    
-    # Detect folders
-    potential_classes = [d for d in os.listdir(actual_dir) if os.path.isdir(os.path.join(actual_dir, d))]
-    potential_classes.sort()
-    
-    valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff')
-    
-    X = []
-    y = []
-    classes = []
-    
-    print(f"Loading data from {actual_dir} ...")
-    total_images_loaded = 0
-    class_idx = 0
-    
+    potential_classes = sorted(d for d in os.listdir(actual_dir) if os.path.isdir(os.path.join(actual_dir, d)))
+
+    paths, labels, classes = [], [], []
     for class_name in potential_classes:
         class_dir = os.path.join(actual_dir, class_name)
-        images_in_class = 0
-        current_class_images = []
-        
-        for img_name in os.listdir(class_dir):
-            if not img_name.lower().endswith(valid_extensions):
-                continue
-                
-            img_path = os.path.join(class_dir, img_name)
-            img = cv2.imread(img_path)
-            if img is None:
-                continue
-                
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img = cv2.resize(img, image_size)
-            
-            current_class_images.append((img, class_idx))
-            images_in_class += 1
-            
-        if images_in_class > 0:
-            for img, idx in current_class_images:
-                X.append(img)
-                y.append(idx)
-            classes.append(class_name)
-            total_images_loaded += images_in_class
-            class_idx += 1
-            print(f" - {class_name}: loaded {images_in_class} images")
-            
-    # Save the detected classes to JSON so the API can use them
-    os.makedirs("models", exist_ok=True)
-    with open("models/classes.json", "w") as f:
-        json.dump(classes, f)
-            
-    X = np.array(X, dtype='float32') / 255.0  
-    y = np.array(y)
-    
-    print(f"\nSuccessfully loaded a total of {total_images_loaded} images across {len(classes)} classes.")
-    
-    # Split dataset
-    if total_images_loaded == 0:
+        class_files = sorted(
+            os.path.join(class_dir, f) for f in os.listdir(class_dir)
+            if f.lower().endswith(VALID_EXTENSIONS)
+        )
+        if not class_files:
+            continue
+        paths.extend(class_files)
+        labels.extend([len(classes)] * len(class_files))
+        classes.append(class_name)
+        print(f" - {class_name}: found {len(class_files)} images")
+
+    if not paths:
         raise ValueError("No images found! Please check your dataset directory.")
-        
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
-    print(f"Dataset Split -> Training set: {len(X_train)} samples, Validation set: {len(X_val)} samples.")
-    
-    return X_train, X_val, y_train, y_val, classes
 
-def get_data_generators(X_train, X_val, y_train, y_val, batch_size=32):
+    if save_classes:
+        # Save the detected classes to JSON so the API can use them
+        os.makedirs("models", exist_ok=True)
+        with open("models/classes.json", "w") as f:
+            json.dump(classes, f)
+
+    return paths, np.array(labels, dtype=np.int32), classes
+
+def split_dataset_files(paths, labels, test_size=0.2, random_state=42):
+    """Stratified train/validation split on file paths (no pixels are loaded)."""
+    train_paths, val_paths, train_labels, val_labels = train_test_split(
+        paths, labels, test_size=test_size, random_state=random_state, stratify=labels
+    )
+    print(f"Dataset Split -> Training set: {len(train_paths)} samples, Validation set: {len(val_paths)} samples.")
+    return train_paths, val_paths, train_labels, val_labels
+
+def file_sha1(path, chunk_size=1 << 20):
+    """Hashes the raw source bytes so edits are detected even when mtimes are unreliable."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class DatasetIndex:
     """
-    Creates ImageDataGenerators with augmentation (rotation, zoom, horizontal flip)
+    Result of one pass over the dataset folders: file paths, paths relative to the dataset root,
+    labels, class names and content hashes. Shared by mask generation and shard compilation so
+    the folders are only walked and hashed once per run.
     """
-    # Data augmentation for training
-    train_datagen = ImageDataGenerator(
+    def __init__(self, root, paths, labels, classes, digests):
+        self.root = root
+        self.paths = list(paths)
+        self.rels = [os.path.relpath(p, root) for p in self.paths]
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.classes = classes
+        self.digests = list(digests)
+
+    def __len__(self):
+        return len(self.paths)
+
+def index_dataset(dataset_dir="dataset", save_classes=True, workers=None):
+    """Walks the class folders once and hashes every image (in parallel threads)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    print(f"Indexing images in {dataset_dir} ...")
+    paths, labels, classes = list_dataset_files(dataset_dir, save_classes=save_classes)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(file_sha1, paths))
+    return DatasetIndex(_find_dataset_dir(dataset_dir), paths, labels, classes, digests)
+
+def _read_image_uint8(path, image_size):
+    """Decodes and resizes with OpenCV, exactly like WoundAnalyzer.preprocess_image does at inference."""
+    if isinstance(path, bytes):
+        path = path.decode("utf-8")
+    img = cv2.imread(path)
+    if img is None:
+        # Keep the stream going; unreadable files become black frames and are reported
+        print(f"⚠️ Could not decode {path}")
+        return np.zeros((image_size[1], image_size[0], 3), dtype=np.uint8)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return cv2.resize(img, image_size)
+
+def _decode_fn(image_size, mask_fn=None):
+    """Builds the per-file map function: path -> uint8 image (and uint8 mask when mask_fn is given)."""
+    height, width = image_size[1], image_size[0]
+
+    def _decode(path):
+        img = _read_image_uint8(path, image_size)
+        if mask_fn is None:
+            return img
+        mask = mask_fn(img)
+        return img, np.round(np.asarray(mask, dtype=np.float32) * 255.0).astype(np.uint8)
+
+    def _map(path, target):
+        # cv2 releases the GIL, so num_parallel_calls decodes on several cores
+        if mask_fn is None:
+            img = tf.numpy_function(_decode, [path], tf.uint8)
+            img.set_shape((height, width, 3))
+            return img, target
+        img, mask = tf.numpy_function(_decode, [path], (tf.uint8, tf.uint8))
+        img.set_shape((height, width, 3))
+        mask.set_shape((height, width, 1))
+        return img, mask
+
+    return _map
+
+def _normalize_target(target):
+    # uint8 targets are masks stored as 0..255; class labels are int32 and pass through
+    if target.dtype == tf.uint8:
+        return tf.cast(target, tf.float32) / 255.0
+    return target
+
+def _normalize_batch(images, targets):
+    images = tf.cast(images, tf.float32) / 255.0
+    if isinstance(targets, dict):
+        return images, {k: _normalize_target(v) for k, v in targets.items()}
+    return images, _normalize_target(targets)
+
+def build_image_dataset(paths, labels, image_size=(224, 224), batch_size=32, training=False,
+                        mask_fn=None, cache=None, augment_fn=None, shuffle_buffer=1024, seed=42):
+    """
+    Streams (image, label) batches — or (image, mask) when mask_fn is given — from file paths.
+
+    cache: None streams from disk every epoch, "memory" keeps the uint8 frames in RAM,
+           any other string is used as an on-disk cache file prefix.
+    augment_fn: optional (images, targets) -> (images, targets) map applied to whole training batches
+                after normalization, e.g. preprocessing.augmentation.batch_augment_fn().
+    """
+    ds = tf.data.Dataset.from_tensor_slices((list(paths), np.asarray(labels)))
+    ds = ds.map(_decode_fn(image_size, mask_fn), num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+
+    if cache == "memory":
+        ds = ds.cache()
+    elif cache:
+        os.makedirs(os.path.dirname(cache) or ".", exist_ok=True)
+        ds = ds.cache(cache)
+
+    if training:
+        ds = ds.shuffle(min(shuffle_buffer, len(paths)), seed=seed, reshuffle_each_iteration=True)
+
+    ds = ds.batch(batch_size).map(_normalize_batch, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if training and augment_fn is not None:
+        ds = ds.map(augment_fn, num_parallel_calls=tf.data.AUTOTUNE)
+
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+def legacy_augment_fn(image_size=(224, 224)):
+    """
+    Wraps the original ImageDataGenerator augmentation (rotation, zoom, horizontal flip) as a batch
+    map function. It still transforms one image at a time in Python and is kept as the baseline for
+    benchmarks/augmentation_throughput.py; training uses preprocessing.augmentation instead.
+    """
+    datagen = ImageDataGenerator(
         rotation_range=20,
         zoom_range=0.15,
         horizontal_flip=True,
         fill_mode="nearest"
     )
-    
-    # Validation data should not be augmented
-    val_datagen = ImageDataGenerator()
-    
-    train_generator = train_datagen.flow(X_train, y_train, batch_size=batch_size)
-    val_generator = val_datagen.flow(X_val, y_val, batch_size=batch_size)
-    
-    return train_generator, val_generator
+    height, width = image_size[1], image_size[0]
+
+    def _transform(batch):
+        return np.stack([datagen.random_transform(x) for x in batch]).astype(np.float32)
+
+    def _augment(images, targets):
+        images = tf.numpy_function(_transform, [images], tf.float32)
+        images.set_shape((None, height, width, 3))
+        return images, targets
+
+    return _augment
+
+def create_training_datasets(dataset_dir="dataset", image_size=(224, 224), batch_size=32, test_size=0.2,
+                             random_state=42, mask_fn=None, augment_fn=None, cache_dir=None, save_classes=True):
+    """
+    Lists, splits and wraps the dataset into train/validation tf.data pipelines that decode straight
+    from the image files. The training scripts use the compiled, single-decode path in
+    preprocessing.dataset instead; this remains for ad-hoc runs on raw folders.
+    Returns (train_ds, val_ds, classes, train_count, val_count).
+    """
+    print(f"Indexing images in {dataset_dir} ...")
+    paths, labels, classes = list_dataset_files(dataset_dir, save_classes=save_classes)
+    train_paths, val_paths, train_labels, val_labels = split_dataset_files(paths, labels, test_size, random_state)
+
+    train_cache = val_cache = None
+    if cache_dir:
+        # Key the cache on the file list so adding/removing images invalidates it
+        digest = hashlib.md5("\n".join(paths).encode("utf-8")).hexdigest()[:10]
+        suffix = "seg" if mask_fn is not None else "cls"
+        prefix = f"{suffix}_{image_size[0]}x{image_size[1]}_{digest}"
+        train_cache = os.path.join(cache_dir, f"train_{prefix}")
+        val_cache = os.path.join(cache_dir, f"val_{prefix}")
+
+    train_ds = build_image_dataset(train_paths, train_labels, image_size, batch_size, training=True,
+                                   mask_fn=mask_fn, cache=train_cache, augment_fn=augment_fn, seed=random_state)
+    val_ds = build_image_dataset(val_paths, val_labels, image_size, batch_size, training=False,
+                                 mask_fn=mask_fn, cache=val_cache)
+    return train_ds, val_ds, classes, len(train_paths), len(val_paths)
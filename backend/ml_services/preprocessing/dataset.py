@@ -0,0 +1,90 @@
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from preprocessing.data_loader import index_dataset, _normalize_batch
+from preprocessing.dataset_cache import compile_dataset, CompiledDataset
+from preprocessing.masks import prepare_masks
+
+# Unified wound dataset shared by the classifier and segmentation trainers.
+# One indexed pass over the class folders feeds both mask preparation and shard
+# compilation; every image is decoded once into the compiled shards and then
+# streamed as (image, {"label", "mask"}) samples that either trainer (or both
+# at once, see train_joint.py) can consume.
+
+def compiled_dir_for(image_size, base_dir="cache/compiled"):
+    """Compiled shards are per input size; 224x224 keeps the original location."""
+    if tuple(image_size) == (224, 224):
+        return base_dir
+    return f"{base_dir}_{image_size[0]}x{image_size[1]}"
+
+def load_wound_dataset(dataset_dir="dataset", image_size=(224, 224), compiled_dir="cache/compiled", with_masks=True,
+                       mask_cache_dir="cache/masks", annotations_dir="dataset_masks", save_classes=True, shard_size=512,
+                       workers=None):
+    """
+    Indexes the dataset once, prepares masks (if requested) and brings the compiled shards up to date.
+    Returns a CompiledDataset over the shards.
+    """
+    index = index_dataset(dataset_dir, save_classes=save_classes, workers=workers)
+
+    mask_lookup, mask_key = None, None
+    if with_masks:
+        mask_lookup, mask_key = prepare_masks(dataset_dir, mask_cache_dir, image_size, annotations_dir,
+                                              workers=workers, index=index)
+
+    compile_dataset(dataset_dir, compiled_dir, image_size, shard_size=shard_size, mask_key=mask_key, mask_lookup=mask_lookup,
+                    workers=workers, index=index)
+    return CompiledDataset(compiled_dir)
+
+def split_indices(store, test_size=0.2, random_state=42):
+    """Stratified train/validation split over compiled sample indices."""
+    train_idx, val_idx = train_test_split(
+        np.arange(len(store)), test_size=test_size, random_state=random_state, stratify=store.labels
+    )
+    print(f"Dataset Split -> Training set: {len(train_idx)} samples, Validation set: {len(val_idx)} samples.")
+    return train_idx, val_idx
+
+def sample_stream(store, indices, batch_size=32, training=False, targets=("label", "mask"),
+                  augment_fn=None, seed=42):
+    """
+    Streams normalized batches straight from the memory-mapped shards.
+
+    targets selects what each batch carries: a single name ("label" or "mask") yields
+    (images, target) for a single-model trainer; a tuple yields (images, {name: target}),
+    which a multi-output model consumes directly.
+    """
+    names = (targets,) if isinstance(targets, str) else tuple(targets)
+    if "mask" in names and not store.has_masks:
+        raise ValueError("Compiled dataset has no masks; load it with with_masks=True.")
+
+    indices = np.asarray(indices, dtype=np.int64)
+    height, width = store.image_size[1], store.image_size[0]
+    dtypes = {"label": tf.int32, "mask": tf.uint8}
+    shapes = {"label": (None,), "mask": (None, height, width, 1)}
+
+    def _gather(batch_idx):
+        out = [store.images(batch_idx)]
+        for name in names:
+            out.append(store.labels[batch_idx] if name == "label" else store.masks(batch_idx))
+        return out
+
+    def _map(batch_idx):
+        tensors = tf.numpy_function(_gather, [batch_idx], [tf.uint8] + [dtypes[n] for n in names])
+        images = tensors[0]
+        images.set_shape((None, height, width, 3))
+        for name, tensor in zip(names, tensors[1:]):
+            tensor.set_shape(shapes[name])
+        if isinstance(targets, str):
+            return images, tensors[1]
+        return images, dict(zip(names, tensors[1:]))
+
+    ds = tf.data.Dataset.from_tensor_slices(indices)
+    if training:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(_map, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+    ds = ds.map(_normalize_batch, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if training and augment_fn is not None:
+        ds = ds.map(augment_fn, num_parallel_calls=tf.data.AUTOTUNE)
+
+    return ds.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,210 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from preprocessing.data_loader import _read_image_uint8, index_dataset
+
+# Compiled dataset cache: resized uint8 images, labels and (optionally) masks
+# stored in fixed-size .npy shards that training opens with np.load(mmap_mode='r').
+# A manifest of source-file hashes lets re-runs recompile only new or changed images.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def _shard_file(output_dir, shard, kind):
+    return os.path.join(output_dir, f"{shard}_{kind}.npy")
+
+def _empty_manifest(image_size, classes):
+    return {
+        "version": MANIFEST_VERSION,
+        "image_size": list(image_size),
+        "classes": classes,
+        "mask_key": None,
+        "next_shard": 0,
+        "shards": {},
+        "entries": {},
+    }
+
+def _load_manifest(output_dir, image_size, classes):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        # Label ids and shard shapes depend on these, so any change means a full rebuild
+        if (manifest.get("version") == MANIFEST_VERSION
+                and manifest.get("image_size") == list(image_size)
+                and manifest.get("classes") == classes):
+            return manifest
+        print("♻️ Compiled dataset settings changed, rebuilding from scratch...")
+        for shard in manifest.get("shards", {}):
+            _delete_shard(output_dir, shard)
+    return _empty_manifest(image_size, classes)
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def _delete_shard(output_dir, shard):
+    for kind in ("images", "labels", "masks"):
+        path = _shard_file(output_dir, shard, kind)
+        if os.path.exists(path):
+            os.remove(path)
+
+def _write_array(path, shape, dtype, fill_rows):
+    """Writes an .npy through a memmap (bounded memory) and atomically moves it into place."""
+    tmp_path = path[:-4] + ".tmp.npy"
+    arr = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+    fill_rows(arr)
+    arr.flush()
+    del arr
+    os.replace(tmp_path, path)
+
+def _write_masks(output_dir, shard, mask_fn=None, mask_lookup=None, rows=None):
+    """
+    Writes the mask shard either by running mask_fn on each compiled image, or by asking
+    mask_lookup(rel_path, sha1) for a precomputed mask (rows lists (rel_path, sha1) per shard row).
+    """
+    images = np.load(_shard_file(output_dir, shard, "images"), mmap_mode="r")
+
+    def _fill(arr):
+        for i in range(len(images)):
+            if mask_lookup is not None:
+                mask = mask_lookup(*rows[i])
+            else:
+                mask = mask_fn(np.array(images[i]))
+            mask = np.asarray(mask, dtype=np.float32)
+            arr[i] = np.round(mask * 255.0).astype(np.uint8).reshape(arr.shape[1:])
+
+    _write_array(_shard_file(output_dir, shard, "masks"), images.shape[:3] + (1,), np.uint8, _fill)
+
+def compile_dataset(dataset_dir="dataset", output_dir="cache/compiled", image_size=(224, 224), shard_size=512,
+                    mask_fn=None, mask_key=None, save_classes=True, workers=None, mask_lookup=None, index=None):
+    """
+    Decodes and resizes the dataset once into memory-mappable shards.
+
+    Unchanged images (same relative path, same SHA-1) keep their existing shard rows; only new or
+    modified files are decoded. Shards whose rows are mostly stale are recompiled so the cache
+    doesn't fragment. When mask_fn (or mask_lookup, see preprocessing.masks.prepare_masks) is given,
+    masks are written for any shard that lacks them or was built with a different mask_key.
+    Pass an existing DatasetIndex to skip re-walking and re-hashing the folders.
+    Returns the manifest dict.
+    """
+    if index is None:
+        index = index_dataset(dataset_dir, save_classes=save_classes, workers=workers)
+    actual_dir = index.root
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir, image_size, index.classes)
+    old_entries = manifest["entries"]
+
+    live, pending = {}, []
+    for rel, path, label, digest in zip(index.rels, index.paths, index.labels, index.digests):
+        old = old_entries.get(rel)
+        if old and old["sha1"] == digest and old["label"] == int(label) and old["shard"] in manifest["shards"]:
+            live[rel] = old
+        else:
+            pending.append((rel, path, int(label), digest))
+
+    # Drop empty shards and recompile the live rows of mostly-stale ones
+    rows_per_shard = {}
+    for entry in live.values():
+        rows_per_shard[entry["shard"]] = rows_per_shard.get(entry["shard"], 0) + 1
+    for shard, info in list(manifest["shards"].items()):
+        live_rows = rows_per_shard.get(shard, 0)
+        if live_rows * 2 < info["count"]:
+            for rel, entry in list(live.items()):
+                if entry["shard"] == shard:
+                    pending.append((rel, os.path.join(actual_dir, rel), entry["label"], entry["sha1"]))
+                    del live[rel]
+            _delete_shard(output_dir, shard)
+            del manifest["shards"][shard]
+
+    if pending:
+        print(f"🗜️ Compiling {len(pending)} image(s) into shards ({len(live)} unchanged)...")
+    height, width = image_size[1], image_size[0]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(pending), shard_size):
+            chunk = pending[start:start + shard_size]
+            shard = f"shard_{manifest['next_shard']:05d}"
+            manifest["next_shard"] += 1
+
+            def _fill(arr, chunk=chunk):
+                # cv2 releases the GIL, so decoding overlaps across threads
+                for i, img in enumerate(pool.map(lambda item: _read_image_uint8(item[1], image_size), chunk)):
+                    arr[i] = img
+
+            _write_array(_shard_file(output_dir, shard, "images"), (len(chunk), height, width, 3), np.uint8, _fill)
+            np.save(_shard_file(output_dir, shard, "labels"), np.array([item[2] for item in chunk], dtype=np.int32))
+            manifest["shards"][shard] = {"count": len(chunk), "mask_key": None}
+            for row, (rel, _, label, digest) in enumerate(chunk):
+                live[rel] = {"sha1": digest, "label": label, "shard": shard, "row": row}
+
+    if mask_fn is not None or mask_lookup is not None:
+        shard_rows = {}
+        for rel, entry in live.items():
+            shard_rows.setdefault(entry["shard"], {})[entry["row"]] = (rel, entry["sha1"])
+        for shard, info in manifest["shards"].items():
+            if info.get("mask_key") != mask_key or not os.path.exists(_shard_file(output_dir, shard, "masks")):
+                print(f"🎭 Writing masks for {shard}...")
+                rows = shard_rows.get(shard, {})
+                # Stale rows (no live entry) still need a placeholder row in the shard
+                rows = [rows.get(i, (None, None)) for i in range(info["count"])]
+                lookup = mask_lookup
+                if lookup is not None:
+                    empty = np.zeros(tuple(image_size[::-1]) + (1,), dtype=np.float32)
+                    lookup = lambda rel, sha1: empty if rel is None else mask_lookup(rel, sha1)
+                _write_masks(output_dir, shard, mask_fn, lookup, rows)
+                info["mask_key"] = mask_key
+        manifest["mask_key"] = mask_key
+
+    manifest["entries"] = live
+    _save_manifest(output_dir, manifest)
+    print(f"✅ Compiled dataset ready: {len(live)} images in {len(manifest['shards'])} shard(s) at {output_dir}")
+    return manifest
+
+class CompiledDataset:
+    """
+    Read-only view over compiled shards. Arrays are opened with mmap_mode='r', so rows are paged in
+    from the OS page cache on demand instead of being decoded or held in the Python heap.
+    """
+    def __init__(self, output_dir="cache/compiled"):
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r") as f:
+            manifest = json.load(f)
+        self.output_dir = output_dir
+        self.classes = manifest["classes"]
+        self.image_size = tuple(manifest["image_size"])
+        self.mask_key = manifest.get("mask_key")
+
+        self.shards = sorted(manifest["shards"])
+        self._images = [np.load(_shard_file(output_dir, s, "images"), mmap_mode="r") for s in self.shards]
+        mask_paths = [_shard_file(output_dir, s, "masks") for s in self.shards]
+        self._masks = None
+        if self.shards and all(os.path.exists(p) for p in mask_paths):
+            self._masks = [np.load(p, mmap_mode="r") for p in mask_paths]
+
+        shard_index = {s: i for i, s in enumerate(self.shards)}
+        rels = sorted(manifest["entries"])
+        entries = [manifest["entries"][r] for r in rels]
+        self.paths = rels
+        self.labels = np.array([e["label"] for e in entries], dtype=np.int32)
+        self._locations = np.array([(shard_index[e["shard"]], e["row"]) for e in entries], dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def has_masks(self):
+        return self._masks is not None
+
+    def _gather(self, arrays, indices):
+        return np.stack([arrays[s][r] for s, r in self._locations[np.asarray(indices)]])
+
+    def images(self, indices):
+        return self._gather(self._images, indices)
+
+    def masks(self, indices):
+        if self._masks is None:
+            raise ValueError("Compiled dataset has no masks; compile it with a mask_fn.")
+        return self._gather(self._masks, indices)
@@ -0,0 +1,136 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from preprocessing.data_loader import _read_image_uint8, file_sha1, index_dataset
+
+# Pseudo-mask generation for segmentation training.
+# Placeholder masks are computed once by a process pool and stored in a cache keyed by
+# (image content hash, generator parameters, size). Real annotated masks, when present,
+# override the placeholder for that image.
+
+PLACEHOLDER_PARAMS = {"method": "otsu", "blur": 7, "invert": True, "version": 1}
+MASK_EXTENSIONS = ('.png', '.bmp', '.jpg', '.jpeg', '.tiff')
+
+def otsu_placeholder_mask(image, blur=7, invert=True):
+    """
+    Rough wound mask from Otsu thresholding on a blurred grayscale copy of an RGB uint8 image.
+    Returns a uint8 (H, W) mask with values 0/255.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    blurred = cv2.GaussianBlur(gray, (blur, blur), 0)
+    mode = cv2.THRESH_BINARY_INV if invert else cv2.THRESH_BINARY
+    _, mask = cv2.threshold(blurred, 0, 255, mode + cv2.THRESH_OTSU)
+    return mask
+
+def mask_cache_key(image_sha1, image_size, params=PLACEHOLDER_PARAMS):
+    payload = json.dumps({"image": image_sha1, "size": list(image_size), "params": params}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class MaskCache:
+    """On-disk store of generated masks as PNGs, sharded by the first two hex digits of the key."""
+    def __init__(self, cache_dir="cache/masks"):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        return cv2.imread(self.path(key), cv2.IMREAD_GRAYSCALE)
+
+    def put(self, key, mask):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path[:-4] + f".{os.getpid()}.tmp.png"
+        cv2.imwrite(tmp_path, mask)
+        os.replace(tmp_path, path)
+
+def _generate_placeholder(job):
+    """Process-pool worker: decode, resize and threshold one image, then write it to the cache."""
+    image_path, cache_dir, key, image_size, params = job
+    img = _read_image_uint8(image_path, image_size)
+    mask = otsu_placeholder_mask(img, blur=params["blur"], invert=params["invert"])
+    MaskCache(cache_dir).put(key, mask)
+    return key
+
+def find_annotated_mask(rel_path, annotations_dir):
+    """Looks for <annotations_dir>/<Class>/<image stem>.<ext> mirroring the dataset layout."""
+    if not annotations_dir:
+        return None
+    stem = os.path.splitext(rel_path)[0]
+    for ext in MASK_EXTENSIONS:
+        candidate = os.path.join(annotations_dir, stem + ext)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def load_annotated_mask(path, image_size):
+    mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        raise ValueError(f"Could not load annotated mask at {path}")
+    mask = cv2.resize(mask, image_size, interpolation=cv2.INTER_NEAREST)
+    return ((mask > 127).astype(np.uint8)) * 255
+
+def prepare_masks(dataset_dir="dataset", cache_dir="cache/masks", image_size=(224, 224), annotations_dir=None,
+                  params=PLACEHOLDER_PARAMS, workers=None, index=None):
+    """
+    Batch job that makes sure every dataset image has a mask.
+
+    Annotated masks under annotations_dir win; every other image gets an Otsu placeholder that is
+    generated in parallel over a process pool only if it isn't cached yet.
+    Returns (mask_lookup, mask_key): mask_lookup(rel_path, image_sha1) -> float32 (H, W, 1) mask in [0, 1],
+    and mask_key identifies this mask set (changes when params or annotations change).
+    Pass an existing DatasetIndex to skip re-walking and re-hashing the folders.
+    """
+    if index is None:
+        index = index_dataset(dataset_dir, save_classes=False, workers=workers)
+    actual_dir = index.root
+    rels, paths, digests = index.rels, index.paths, index.digests
+
+    cache = MaskCache(cache_dir)
+    annotated, jobs = {}, []
+    for rel, path, digest in zip(rels, paths, digests):
+        annotation = find_annotated_mask(rel, annotations_dir)
+        if annotation:
+            annotated[rel] = annotation
+            continue
+        key = mask_cache_key(digest, image_size, params)
+        if key not in cache:
+            jobs.append((path, cache_dir, key, tuple(image_size), params))
+
+    print(f"🎭 Masks: {len(annotated)} annotated, {len(rels) - len(annotated) - len(jobs)} cached, "
+          f"{len(jobs)} to generate")
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(_generate_placeholder, jobs, chunksize=16):
+                pass
+
+    # Annotation edits must invalidate masks compiled into dataset shards
+    annotation_digest = hashlib.sha1()
+    for rel in sorted(annotated):
+        annotation_digest.update(rel.encode("utf-8"))
+        annotation_digest.update(file_sha1(annotated[rel]).encode("utf-8"))
+    mask_key = hashlib.sha1(
+        json.dumps({"params": params, "size": list(image_size), "annotations": annotation_digest.hexdigest()},
+                   sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+    def mask_lookup(rel_path, image_sha1):
+        if rel_path in annotated:
+            mask = load_annotated_mask(annotated[rel_path], image_size)
+        else:
+            key = mask_cache_key(image_sha1, image_size, params)
+            mask = cache.get(key)
+            if mask is None:
+                # Image appeared after prepare_masks ran; generate inline
+                mask = otsu_placeholder_mask(_read_image_uint8(os.path.join(actual_dir, rel_path), image_size),
+                                             blur=params["blur"], invert=params["invert"])
+                cache.put(key, mask)
+        return np.expand_dims(mask.astype(np.float32) / 255.0, axis=-1)
+
+    return mask_lookup, mask_key
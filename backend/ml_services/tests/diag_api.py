@@ -1,20 +1,41 @@
-import requests
 import os
+import sys
+import json
+import argparse
+import tempfile
+import requests
 
-url = "http://localhost:8001/api/predict"
-# Use a sample image from the backend media if possible, or any valid jpg
-image_path = r"d:\wound care\wound_analysis\backend\Ai_wound\media\assessment_images\test_wound.jpg"
+# Manual smoke check against a running AI API: posts one image to /api/predict and prints the reply.
+# Not part of the unit suite (needs a live server). For offline latency/throughput numbers use
+# python -m benchmarks.analyzer_benchmark instead.
+#   python tests/diag_api.py --url http://localhost:8001 --image path/to/wound.jpg
 
-# Create a dummy image if not exists
-if not os.path.exists(image_path):
-    import cv2
-    import numpy as np
-    dummy_img = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
-    cv2.imwrite(image_path, dummy_img)
+def main():
+    parser = argparse.ArgumentParser(description="Post one image to a running AI API.")
+    parser.add_argument("--url", type=str, default=os.environ.get("ML_API_URL", "http://localhost:8001"))
+    parser.add_argument("--image", type=str, default=None, help="Image to send (default: a synthetic wound image).")
+    parser.add_argument("--roi", action="store_true", help="Send an ROI polygon with the synthetic image.")
+    args = parser.parse_args()
 
-with open(image_path, "rb") as f:
-    files = {"image": ("test.jpg", f, "image/jpeg")}
-    response = requests.post(url, files=files)
+    editor_metadata = None
+    with tempfile.TemporaryDirectory() as scratch:
+        image_path = args.image
+        if image_path is None:
+            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            from benchmarks.synthetic_images import make_synthetic_images
+            paths, rois = make_synthetic_images(scratch, 1)
+            image_path = paths[0]
+            if args.roi:
+                editor_metadata = {"boundary_coordinates": rois[0]}
+
+        with open(image_path, "rb") as f:
+            data = {"editor_metadata": json.dumps(editor_metadata)} if editor_metadata else {}
+            response = requests.post(f"{args.url.rstrip('/')}/api/predict",
+                                     files={"image": (os.path.basename(image_path), f, "image/jpeg")},
+                                     data=data, timeout=120)
     print(f"Status Code: {response.status_code}")
     print(f"Response Body: {response.text}")
+    sys.exit(0 if response.ok else 1)
+
+if __name__ == "__main__":
+    main()
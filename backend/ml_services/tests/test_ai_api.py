@@ -0,0 +1,128 @@
+import unittest
+import tempfile
+import threading
+import sys
+import os
+import cv2
+from io import BytesIO
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import ai_api
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ai_api
+from analysis.wound_analyzer import WoundAnalyzer
+
+def tiny_pair(size):
+    classifier = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(5, activation="softmax")
+    ])
+    segmenter = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Conv2D(1, 1, activation="sigmoid")
+    ])
+    return classifier, segmenter
+
+def hold_inference(analyzer, wait):
+    """Makes every variant's classifier call wait() first, so concurrent requests overlap in the worker."""
+    for variant in analyzer.selector.variants:
+        predict = variant.classifier.predict
+        def gated(*args, _predict=predict, **kwargs):
+            wait()
+            return _predict(*args, **kwargs)
+        variant.classifier.predict = gated
+
+class ConcurrentRequestsTest(unittest.TestCase):
+    """Requests served concurrently by one worker process, as under gunicorn's gthread worker (see Dockerfile)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        for name, size in (("full", 32), ("fast", 16)):
+            classifier, segmenter = tiny_pair(size)
+            classifier.save(os.path.join(cls.tmp.name, f"cls_{name}.keras"))
+            segmenter.save(os.path.join(cls.tmp.name, f"seg_{name}.keras"))
+        image = np.full((120, 160, 3), 200, dtype=np.uint8)
+        cv2.circle(image, (80, 60), 30, (40, 40, 180), -1)
+        cls.image = cv2.imencode(".jpg", image)[1].tobytes()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.analyzer = WoundAnalyzer(
+            classifier_path=os.path.join(self.tmp.name, "cls_full.keras"),
+            segmentation_path=os.path.join(self.tmp.name, "seg_full.keras"),
+            variants=[
+                {"name": "full", "classifier": "cls_full.keras", "segmenter": "seg_full.keras"},
+                {"name": "fast", "classifier": "cls_fast.keras", "segmenter": "seg_fast.keras"},
+            ],
+            latency_slo_ms=1000,
+        )
+        self.saved_analyzer = ai_api.analyzer
+        ai_api.analyzer = self.analyzer
+
+    def tearDown(self):
+        ai_api.analyzer = self.saved_analyzer
+
+    def post(self, responses):
+        with ai_api.app.test_client() as client:
+            response = client.post("/api/predict", data={"image": (BytesIO(self.image), "wound.jpg")},
+                                   content_type="multipart/form-data")
+            responses.append((response.status_code, response.get_json(), response.headers.get("X-Model-Variant")))
+
+    def run_concurrently(self, count):
+        responses = []
+        threads = [threading.Thread(target=self.post, args=(responses,)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, responses
+
+    def test_variant_selection_sees_concurrent_requests(self):
+        selector = self.analyzer.selector
+        selector.headroom = 1.0
+        selector.service_ms.update({"full": 400.0, "fast": 100.0})
+        # Nobody finishes until all four requests are inside the worker
+        barrier = threading.Barrier(4, timeout=30)
+        hold_inference(self.analyzer, barrier.wait)
+
+        threads, responses = self.run_concurrently(4)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([status for status, _, _ in responses], [200] * 4)
+        depths = sorted(body["variant_selection"]["queue_depth"] for _, body, _ in responses)
+        self.assertEqual(depths, [0, 1, 2, 3])
+        # full fits the SLO at depth 0 and 1 ((depth + 1) * 400 ms <= 1000 ms), fast takes the rest
+        by_depth = {body["variant_selection"]["queue_depth"]: variant for _, body, variant in responses}
+        self.assertEqual([by_depth[d] for d in range(4)], ["full", "full", "fast", "fast"])
+
+    def test_requests_beyond_max_in_flight_are_shed(self):
+        saved = (ai_api.MAX_IN_FLIGHT, ai_api.admission, ai_api.shed_requests)
+        def restore():
+            ai_api.MAX_IN_FLIGHT, ai_api.admission, ai_api.shed_requests = saved
+        self.addCleanup(restore)
+        ai_api.MAX_IN_FLIGHT, ai_api.admission, ai_api.shed_requests = 2, threading.BoundedSemaphore(2), 0
+        entered, release = threading.Semaphore(0), threading.Event()
+        hold_inference(self.analyzer, lambda: (entered.release(), release.wait(30)))
+
+        threads, responses = self.run_concurrently(2)
+        for _ in range(2):
+            self.assertTrue(entered.acquire(timeout=30))
+        # Both admission slots are taken: the next requests are turned away at once, and /health still answers
+        with ai_api.app.test_client() as client:
+            shed = [client.post("/api/predict", data={"image": (BytesIO(self.image), "wound.jpg")},
+                                content_type="multipart/form-data") for _ in range(2)]
+            health = client.get("/health").get_json()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in shed], [503, 503])
+        self.assertEqual([r.headers.get("Retry-After") for r in shed], ["1", "1"])
+        self.assertEqual([status for status, _, _ in responses], [200, 200])
+        self.assertEqual(health["load"], {"in_flight": 2, "max_in_flight": 2})
+        self.assertEqual(health["load_shedding"], {"shed_requests": 2})
+
+if __name__ == '__main__':
+    unittest.main()
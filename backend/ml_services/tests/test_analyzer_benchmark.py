@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import copy
+import sys
+import os
+import tensorflow as tf
+
+# Add parent directory to path to import benchmarks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis.wound_analyzer import WoundAnalyzer, PIPELINE_STAGES
+from benchmarks.analyzer_benchmark import (make_synthetic_images, run_latency, run_throughput, compare_to_baseline,
+                                           _roi)
+
+def save_tiny_models(out_dir, size=32):
+    classifier = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(5, activation="softmax")
+    ])
+    segmenter = tf.keras.Sequential([tf.keras.Input((size, size, 3)), tf.keras.layers.Conv2D(1, 1, activation="sigmoid")])
+    classifier_path, segmenter_path = os.path.join(out_dir, "cls.keras"), os.path.join(out_dir, "seg.keras")
+    classifier.save(classifier_path)
+    segmenter.save(segmenter_path)
+    return classifier_path, segmenter_path
+
+class TestAnalyzerBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.paths, cls.rois = make_synthetic_images(cls.tmp.name, 4)
+        cls.analyzer = WoundAnalyzer(*save_tiny_models(cls.tmp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_batch_matches_single_image_results(self):
+        batch = self.analyzer.analyze_batch(self.paths, editor_metadata=[_roi(self.rois, i) for i in range(4)])
+        for i, (results, _, mask) in enumerate(batch):
+            single, _, single_mask = self.analyzer.analyze_wound(self.paths[i], editor_metadata=_roi(self.rois, i))
+            for key in ("wound_type", "wound_area_cm2", "tissue_composition", "severity", "model_variant"):
+                self.assertEqual(results[key], single[key], key)
+            self.assertEqual(mask.shape, single_mask.shape)
+
+    def test_latency_reports_every_stage(self):
+        report = run_latency(self.analyzer, self.paths, self.rois, warmup=1)
+        self.assertEqual(set(report), {"total", *PIPELINE_STAGES})
+        for stats in report.values():
+            self.assertLessEqual(stats["p50_ms"], stats["p95_ms"])
+            self.assertLessEqual(stats["p95_ms"], stats["p99_ms"])
+        stage_sum = sum(report[stage]["mean_ms"] for stage in PIPELINE_STAGES)
+        self.assertLessEqual(stage_sum, report["total"]["mean_ms"] * 1.05)
+
+    def test_throughput_per_batch_size(self):
+        throughput = run_throughput(self.analyzer, self.paths, None, [1, 3])
+        self.assertEqual(set(throughput), {"1", "3"})
+        self.assertTrue(all(v > 0 for v in throughput.values()))
+
+class TestBaselineComparison(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            "latency": {"total": {"p50_ms": 100.0, "p95_ms": 150.0, "p99_ms": 200.0},
+                        "measure": {"p50_ms": 1.0, "p95_ms": 1.5, "p99_ms": 2.0}},
+            "throughput_images_per_sec": {"1": 10.0, "8": 20.0},
+            "memory": {"peak_rss_mb": 500.0},
+        }
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_to_baseline(copy.deepcopy(self.baseline), self.baseline), [])
+
+    def test_detects_regressions(self):
+        current = copy.deepcopy(self.baseline)
+        current["latency"]["total"]["p95_ms"] = 200.0          # +33% slower
+        current["throughput_images_per_sec"]["8"] = 12.0       # -40% throughput
+        current["memory"]["peak_rss_mb"] = 520.0               # +4%, within tolerance
+        current["latency"]["measure"]["p50_ms"] = 3.0          # noisy sub-5ms stage, ignored
+        regressions = {r["metric"] for r in compare_to_baseline(current, self.baseline, tolerance=0.2)}
+        self.assertEqual(regressions, {"latency.total.p95_ms", "throughput.batch_8"})
+
+    def test_improvements_are_not_regressions(self):
+        current = copy.deepcopy(self.baseline)
+        current["latency"]["total"]["p50_ms"] = 50.0
+        current["throughput_images_per_sec"]["1"] = 30.0
+        self.assertEqual(compare_to_baseline(current, self.baseline), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+import tensorflow as tf
+
+# Add parent directory to path to import analysis
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis.wound_analyzer import WoundAnalyzer
+from analysis.batch import run_batch, resolve_images, completed_images
+from benchmarks.synthetic_images import make_synthetic_images
+
+def save_tiny_models(out_dir, size=32):
+    classifier = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(5, activation="softmax")
+    ])
+    segmenter = tf.keras.Sequential([tf.keras.Input((size, size, 3)), tf.keras.layers.Conv2D(1, 1, activation="sigmoid")])
+    classifier_path, segmenter_path = os.path.join(out_dir, "cls.keras"), os.path.join(out_dir, "seg.keras")
+    classifier.save(classifier_path)
+    segmenter.save(segmenter_path)
+    return classifier_path, segmenter_path
+
+def read_jsonl(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f]
+
+class TestBatchAnalysis(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.image_dir = os.path.join(cls.tmp.name, "images")
+        os.makedirs(os.path.join(cls.image_dir, "nested"))
+        cls.paths, _ = make_synthetic_images(cls.image_dir, 5)
+        cls.broken = os.path.join(cls.image_dir, "nested", "broken.jpg")
+        with open(cls.broken, "w") as f:
+            f.write("not an image")
+        cls.analyzer = WoundAnalyzer(*save_tiny_models(cls.tmp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.output = os.path.join(self.tmp.name, "results.jsonl")
+        if os.path.exists(self.output):
+            os.remove(self.output)
+
+    def test_resolve_directory_and_glob(self):
+        self.assertEqual(resolve_images(self.image_dir), sorted(self.paths + [self.broken]))
+        self.assertEqual(resolve_images(os.path.join(self.image_dir, "*.jpg")), sorted(self.paths))
+        self.assertEqual(resolve_images(os.path.join(self.image_dir, "**", "broken.*")), [self.broken])
+
+    def test_matches_single_image_analysis(self):
+        summary = run_batch(self.analyzer, self.paths, self.output, batch_size=2, decode_workers=2)
+        self.assertEqual((summary["analyzed"], summary["failed"]), (5, 0))
+        records = {r["image"]: r for r in read_jsonl(self.output)}
+        for path in self.paths:
+            single, _, _ = self.analyzer.analyze_wound(path)
+            for key in ("wound_type", "wound_area_cm2", "tissue_composition", "severity", "model_variant"):
+                self.assertEqual(records[os.path.abspath(path)][key], single[key], key)
+
+    def test_resume_after_interrupted_run(self):
+        run_batch(self.analyzer, self.paths[:3], self.output)
+        # Simulate a crash halfway through writing the third record
+        with open(self.output, "r") as f:
+            content = f.read()
+        with open(self.output, "w") as f:
+            f.write(content[:content.rindex("{") + 20])
+        self.assertEqual(len(completed_images(self.output)), 2)
+
+        summary = run_batch(self.analyzer, self.paths, self.output)
+        self.assertEqual((summary["skipped"], summary["analyzed"]), (2, 3))
+        with open(self.output, "r") as f:
+            lines = f.read().splitlines()
+        valid = [json.loads(line) for line in lines if line.endswith("}")]
+        self.assertEqual(sorted(r["image"] for r in valid), sorted(os.path.abspath(p) for p in self.paths))
+
+    def test_unreadable_image_is_recorded_and_retried(self):
+        summary = run_batch(self.analyzer, [self.broken, self.paths[0]], self.output)
+        self.assertEqual((summary["analyzed"], summary["failed"]), (1, 1))
+        self.assertIn("Could not load image", read_jsonl(self.output)[0]["error"])
+        summary = run_batch(self.analyzer, [self.broken, self.paths[0]], self.output)
+        self.assertEqual((summary["skipped"], summary["failed"]), (1, 1))
+
+    def test_tissue_worker_processes(self):
+        summary = run_batch(self.analyzer, self.paths, self.output, batch_size=4, tissue_workers=2)
+        self.assertEqual(summary["analyzed"], 5)
+        self.assertEqual(len(completed_images(self.output)), 5)
+
+if __name__ == '__main__':
+    unittest.main()
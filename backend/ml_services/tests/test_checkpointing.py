@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import checkpointing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpointing import checkpoint_callbacks
+
+class Crash(tf.keras.callbacks.Callback):
+    def __init__(self, at_epoch):
+        super().__init__()
+        self.at_epoch = at_epoch
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if epoch == self.at_epoch:
+            raise RuntimeError("simulated preemption")
+
+class ScriptedValLoss(tf.keras.callbacks.Callback):
+    """Overrides val_loss so the plateau is deterministic: improves for 3 epochs, then flat."""
+    def on_epoch_end(self, epoch, logs=None):
+        logs["val_loss"] = max(1.0 - 0.2 * epoch, 0.6)
+
+def make_model():
+    model = tf.keras.Sequential([tf.keras.Input((4,)), tf.keras.layers.Dense(1)])
+    model.compile(optimizer="adam", loss="mse")
+    return model
+
+class TestCheckpointedTraining(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.x = np.random.rand(32, 4).astype(np.float32)
+        self.y = np.random.rand(32, 1).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _fit(self, model, extra=()):
+        callbacks = list(extra) + [ScriptedValLoss()] + checkpoint_callbacks(
+            "test", max_epochs=20, checkpoint_dir=self.tmp.name, patience=2,
+            report_path=os.path.join(self.tmp.name, "summary.json")
+        )
+        return model.fit(self.x, self.y, epochs=20, verbose=0, callbacks=callbacks)
+
+    def test_resume_then_early_stop(self):
+        first = make_model()
+        with self.assertRaises(RuntimeError):
+            self._fit(first, [Crash(at_epoch=2)])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "test", "backup")))
+
+        second = make_model()
+        history = self._fit(second)
+        # Epochs 1-2 ran before the crash; the rerun starts at epoch 3
+        self.assertEqual(len(history.history["loss"]), 3)
+
+        with open(os.path.join(self.tmp.name, "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary["resumed_from_epoch"], 2)
+        self.assertTrue(summary["stopped_early"])
+        self.assertEqual(summary["epochs_completed"], 5)
+        self.assertEqual(summary["best_epoch"], 3)
+        self.assertEqual(summary["epochs_skipped"], 15)
+        # State is cleared once training finishes
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "test", "early_stopping")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "test", "backup")))
+
+if __name__ == '__main__':
+    unittest.main()
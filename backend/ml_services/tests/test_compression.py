@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import compression
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compression.pruning import prune_model, fine_tune_pruned, model_sparsity, prunable_kernels
+from compression.quantization import quantize_model, TFLiteModel, load_model
+from compression.evaluation import classification_metrics, segmentation_metrics, file_sizes
+
+INPUT_SHAPE = (32, 32, 3)
+
+def tiny_classifier():
+    return tf.keras.Sequential([
+        tf.keras.Input(INPUT_SHAPE),
+        tf.keras.layers.Conv2D(32, 3, activation="relu"),
+        tf.keras.layers.DepthwiseConv2D(3),
+        tf.keras.layers.Conv2D(64, 1, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(3, activation="softmax"),
+    ])
+
+class TestPruning(unittest.TestCase):
+    def test_prune_reaches_sparsity_without_touching_original(self):
+        model = tiny_classifier()
+        pruned, masks = prune_model(model, 0.5)
+        self.assertEqual(len(masks), len(prunable_kernels(pruned)))
+        # Small layers (first conv, depthwise, head) are skipped; the 1x1 conv is pruned
+        self.assertEqual(len(masks), 1)
+        self.assertAlmostEqual(model_sparsity(pruned), 0.5, delta=0.01)
+        self.assertLess(model_sparsity(model), 0.01)
+
+    def test_fine_tune_keeps_pruned_weights_zero(self):
+        pruned, masks = prune_model(tiny_classifier(), 0.75)
+        x = np.random.rand(16, *INPUT_SHAPE).astype(np.float32)
+        y = np.random.randint(0, 3, size=16)
+        ds = tf.data.Dataset.from_tensor_slices((x, y)).batch(8)
+        fine_tune_pruned(pruned, masks, ds, loss="sparse_categorical_crossentropy", epochs=1, learning_rate=1e-2)
+        self.assertGreaterEqual(model_sparsity(pruned), 0.75 - 0.01)
+
+    def test_invalid_sparsity(self):
+        with self.assertRaises(ValueError):
+            prune_model(tiny_classifier(), 1.0)
+
+class TestQuantization(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model = tiny_classifier()
+        self.images = np.random.rand(8, *INPUT_SHAPE).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_modes_match_keras_outputs(self):
+        expected = self.model.predict(self.images, verbose=0)
+        for mode in ("float32", "dynamic", "float16", "int8"):
+            content = quantize_model(self.model, mode, calibration_images=list(self.images))
+            path = os.path.join(self.tmp.name, f"{mode}.tflite")
+            with open(path, "wb") as f:
+                f.write(content)
+            tflite = load_model(path)
+            self.assertIsInstance(tflite, TFLiteModel)
+            self.assertEqual(tflite.input_shape, (None,) + INPUT_SHAPE)
+            outputs = tflite.predict(self.images)
+            self.assertEqual(outputs.shape, expected.shape)
+            np.testing.assert_allclose(outputs, expected, atol=0.1, err_msg=mode)
+            self.assertGreater(file_sizes(path)["size_mb"], 0)
+
+    def test_int8_requires_calibration(self):
+        with self.assertRaises(ValueError):
+            quantize_model(self.model, "int8")
+
+class TestEvaluation(unittest.TestCase):
+    def test_perfect_segmentation_scores_one(self):
+        masks = np.zeros((4, 8, 8, 1), dtype=np.float32)
+        masks[:, 2:6, 2:6] = 1.0
+        identity = tf.keras.Sequential([tf.keras.Input((8, 8, 1)), tf.keras.layers.Identity()])
+        metrics = segmentation_metrics(identity, tf.data.Dataset.from_tensor_slices((masks, masks)).batch(2))
+        self.assertEqual(metrics, {"dice": 1.0, "iou": 1.0, "pixel_accuracy": 1.0})
+
+    def test_classification_accuracy(self):
+        images = np.eye(3, dtype=np.float32)
+        labels = np.array([0, 1, 2])
+        identity = tf.keras.Sequential([tf.keras.Input((3,)), tf.keras.layers.Identity()])
+        metrics = classification_metrics(identity, tf.data.Dataset.from_tensor_slices((images, labels)).batch(2))
+        self.assertEqual(metrics["accuracy"], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import sys
+import os
+import cv2
+import numpy as np
+
+# Add parent directory to path to import preprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing.dataset import load_wound_dataset, split_indices, sample_stream
+
+class TestWoundDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_dir = os.path.join(self.tmp.name, "dataset")
+        for class_name in ("Burns", "Cut"):
+            os.makedirs(os.path.join(self.dataset_dir, class_name))
+            for i in range(4):
+                img = np.full((40, 40, 3), 220, dtype=np.uint8)
+                cv2.circle(img, (20, 20), 8 + i, (30, 30, 30), -1)
+                cv2.imwrite(os.path.join(self.dataset_dir, class_name, f"{i}.png"), img)
+        self.store = load_wound_dataset(
+            self.dataset_dir, (32, 32),
+            compiled_dir=os.path.join(self.tmp.name, "compiled"),
+            mask_cache_dir=os.path.join(self.tmp.name, "masks"),
+            annotations_dir=None, save_classes=False, workers=2
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_one_pass_serves_labels_and_masks(self):
+        self.assertEqual(len(self.store), 8)
+        self.assertTrue(self.store.has_masks)
+        train_idx, val_idx = split_indices(self.store, test_size=0.25)
+
+        images, targets = next(iter(sample_stream(self.store, val_idx, batch_size=4)))
+        self.assertEqual(images.shape, (2, 32, 32, 3))
+        self.assertEqual(sorted(targets), ["label", "mask"])
+        self.assertEqual(targets["mask"].shape, (2, 32, 32, 1))
+        self.assertEqual(float(targets["mask"][0, 16, 16, 0]), 1.0)
+        np.testing.assert_array_equal(targets["label"].numpy(), self.store.labels[val_idx])
+
+        # Single-model trainers get a bare target
+        _, labels = next(iter(sample_stream(self.store, train_idx, batch_size=6, targets="label")))
+        self.assertEqual(labels.shape, (6,))
+
+    def test_masks_required_for_mask_target(self):
+        store = load_wound_dataset(
+            self.dataset_dir, (32, 32), compiled_dir=os.path.join(self.tmp.name, "labels_only"),
+            with_masks=False, save_classes=False
+        )
+        with self.assertRaises(ValueError):
+            sample_stream(store, [0, 1], targets="mask")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import tempfile
+import sys
+import os
+import cv2
+import numpy as np
+
+# Add parent directory to path to import preprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing.dataset_cache import compile_dataset, CompiledDataset
+
+def half_mask(img):
+    mask = np.zeros(img.shape[:2] + (1,), dtype=np.float32)
+    mask[: img.shape[0] // 2] = 1.0
+    return mask
+
+class TestCompiledDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_dir = os.path.join(self.tmp.name, "dataset")
+        self.output_dir = os.path.join(self.tmp.name, "compiled")
+        rng = np.random.default_rng(0)
+        for class_name in ("Burns", "Cut"):
+            os.makedirs(os.path.join(self.dataset_dir, class_name))
+            for i in range(3):
+                img = rng.integers(0, 255, (40, 50, 3), dtype=np.uint8)
+                cv2.imwrite(os.path.join(self.dataset_dir, class_name, f"{i}.png"), img)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _compile(self, **kwargs):
+        return compile_dataset(self.dataset_dir, self.output_dir, (32, 32), shard_size=4,
+                               save_classes=False, **kwargs)
+
+    def test_shards_are_memory_mapped(self):
+        self._compile()
+        store = CompiledDataset(self.output_dir)
+        self.assertEqual(len(store), 6)
+        self.assertEqual(store.classes, ["Burns", "Cut"])
+        self.assertEqual(sorted(store.labels.tolist()), [0, 0, 0, 1, 1, 1])
+        self.assertIsInstance(store._images[0], np.memmap)
+        batch = store.images([0, 5])
+        self.assertEqual(batch.shape, (2, 32, 32, 3))
+        self.assertEqual(batch.dtype, np.uint8)
+
+    def test_only_changed_images_recompile(self):
+        first = self._compile()
+        changed = os.path.join(self.dataset_dir, "Cut", "1.png")
+        cv2.imwrite(changed, np.full((40, 50, 3), 7, dtype=np.uint8))
+        second = self._compile()
+
+        rel = os.path.join("Cut", "1.png")
+        self.assertNotEqual(first["entries"][rel]["sha1"], second["entries"][rel]["sha1"])
+        self.assertEqual(second["entries"][rel]["shard"], "shard_00002")
+        unchanged = os.path.join("Burns", "0.png")
+        self.assertEqual(first["entries"][unchanged], second["entries"][unchanged])
+
+        store = CompiledDataset(self.output_dir)
+        idx = store.paths.index(rel)
+        self.assertTrue(np.all(store.images([idx]) == 7))
+
+    def test_masks_generated_for_existing_shards(self):
+        self._compile()
+        self.assertFalse(CompiledDataset(self.output_dir).has_masks)
+        self._compile(mask_fn=half_mask, mask_key="half")
+        store = CompiledDataset(self.output_dir)
+        self.assertTrue(store.has_masks)
+        masks = store.masks([0])
+        self.assertEqual(masks.shape, (1, 32, 32, 1))
+        self.assertEqual(int(masks[0, 0, 0, 0]), 255)
+        self.assertEqual(int(masks[0, -1, 0, 0]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
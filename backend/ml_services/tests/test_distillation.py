@@ -0,0 +1,65 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import classification
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classification.model import create_student_classifier
+from classification.distillation import Distiller, evaluate_accuracy, measure_latency, measure_memory
+
+INPUT_SHAPE = (32, 32, 3)
+
+class TestDistillation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.images = rng.random((16,) + INPUT_SHAPE).astype(np.float32)
+        self.labels = rng.integers(0, 3, size=16).astype(np.int32)
+        self.ds = tf.data.Dataset.from_tensor_slices((self.images, self.labels)).batch(8)
+        self.teacher = tf.keras.Sequential([
+            tf.keras.Input(INPUT_SHAPE), tf.keras.layers.Flatten(), tf.keras.layers.Dense(3, activation="softmax")
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_student_architectures(self):
+        student = create_student_classifier(INPUT_SHAPE, num_classes=3, architecture="tiny_cnn")
+        self.assertEqual(student.output_shape, (None, 3))
+        with self.assertRaises(ValueError):
+            create_student_classifier(INPUT_SHAPE, num_classes=3, architecture="resnet")
+
+    def test_distiller_trains_student_only(self):
+        student = create_student_classifier(INPUT_SHAPE, num_classes=3, architecture="tiny_cnn")
+        teacher_weights = [w.copy() for w in self.teacher.get_weights()]
+        distiller = Distiller(student, self.teacher, temperature=4.0, alpha=0.1)
+        distiller.compile(optimizer="adam", metrics=["accuracy"])
+
+        history = distiller.fit(self.ds, epochs=1, verbose=0)
+        self.assertTrue(np.isfinite(history.history["loss"][0]))
+        for before, after in zip(teacher_weights, self.teacher.get_weights()):
+            np.testing.assert_array_equal(before, after)
+
+        # The distiller's forward pass is the student's
+        np.testing.assert_allclose(distiller(self.images[:2]).numpy(), student(self.images[:2]).numpy(), rtol=1e-5)
+
+    def test_measurements(self):
+        accuracy = evaluate_accuracy(self.teacher, self.ds)
+        self.assertGreaterEqual(accuracy, 0.0)
+        self.assertLessEqual(accuracy, 1.0)
+
+        latency = measure_latency(self.teacher, INPUT_SHAPE, runs=5, warmup=1)
+        self.assertGreater(latency["p50_ms"], 0)
+        self.assertLessEqual(latency["p50_ms"], latency["p95_ms"])
+
+        path = os.path.join(self.tmp.name, "teacher.keras")
+        self.teacher.save(path)
+        memory = measure_memory(path)
+        self.assertIsNotNone(memory)
+        self.assertIn("load_and_predict_mb", memory)
+
+if __name__ == '__main__':
+    unittest.main()
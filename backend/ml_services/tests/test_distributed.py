@@ -0,0 +1,101 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+import textwrap
+from unittest import mock
+import numpy as np
+
+# Add parent directory to path to import distributed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from distributed import worker_info, is_chief, worker_path, shard_indices, launch_local_workers, fit_distributed
+
+def tf_config(index, workers=2):
+    cluster = {"worker": [f"localhost:{2000 + i}" for i in range(workers)]}
+    return {"TF_CONFIG": json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}})}
+
+class TestWorkerInfo(unittest.TestCase):
+    def test_single_process_defaults(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(worker_info(), (0, 1))
+            self.assertTrue(is_chief())
+            self.assertEqual(worker_path("models/x.h5"), "models/x.h5")
+
+    def test_non_chief_writes_to_scratch(self):
+        with mock.patch.dict(os.environ, tf_config(1, workers=4)):
+            self.assertEqual(worker_info(), (1, 4))
+            self.assertFalse(is_chief())
+            path = worker_path("checkpoints")
+            self.assertNotEqual(path, "checkpoints")
+            self.assertTrue(path.endswith(os.path.join("wound_care_worker_1", "checkpoints")))
+
+class TestShardIndices(unittest.TestCase):
+    def test_equal_disjoint_shards(self):
+        indices = np.arange(10)
+        shards = [shard_indices(indices, i, 3) for i in range(3)]
+        self.assertEqual({len(s) for s in shards}, {3})
+        self.assertEqual(len(set(np.concatenate(shards))), 9)
+
+    def test_too_few_samples(self):
+        with self.assertRaises(ValueError):
+            shard_indices(np.arange(2), 0, 4)
+
+ML_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Training script each launched worker runs: a tiny classifier, 2 epochs over its own shard
+WORKER_SCRIPT = textwrap.dedent(f"""
+    import os, sys, json
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    sys.path.insert(0, {ML_ROOT!r})
+    import numpy as np
+    import tensorflow as tf
+    from distributed import get_strategy, distribute_stream, fit_distributed, shard_indices, worker_info
+
+    strategy = get_strategy()
+    with strategy.scope():
+        model = tf.keras.Sequential([tf.keras.Input((4,)), tf.keras.layers.Dense(3, activation="softmax")])
+        model.compile(optimizer="sgd", loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=(32, 4)).astype("float32"), rng.integers(0, 3, size=32)
+
+    def make(shard, num_shards, batch):
+        idx = shard_indices(np.arange(32), shard, num_shards)
+        return tf.data.Dataset.from_tensor_slices((x[idx], y[idx])).batch(batch)
+
+    stream = distribute_stream(strategy, make, 8)
+    history = fit_distributed(model, strategy, stream, stream, epochs=2, verbose=0)
+    result = {{key: [float(v) for v in values] for key, values in history.history.items()}}
+    result["replicas"] = strategy.num_replicas_in_sync
+    with open(os.path.join(sys.argv[1], f"worker_{{worker_info()[0]}}.json"), "w") as f:
+        json.dump(result, f)
+""")
+
+class TestFitDistributed(unittest.TestCase):
+    def test_two_local_workers_train_in_lockstep(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            script = os.path.join(scratch, "worker.py")
+            with open(script, "w") as f:
+                f.write(WORKER_SCRIPT)
+            self.assertEqual(launch_local_workers([script, scratch], 2), 0)
+            results = []
+            for index in range(2):
+                with open(os.path.join(scratch, f"worker_{index}.json")) as f:
+                    results.append(json.load(f))
+        chief, other = results
+        self.assertEqual(chief["replicas"], 2)
+        self.assertEqual(set(chief), {"loss", "accuracy", "val_loss", "val_accuracy", "replicas"})
+        self.assertEqual(len(chief["loss"]), 2)
+        # Logs are reduced over the cluster, so every worker sees the same numbers
+        for key in ("loss", "accuracy", "val_loss"):
+            np.testing.assert_allclose(chief[key], other[key], rtol=1e-5)
+
+    def test_unsupported_metrics_are_rejected(self):
+        import tensorflow as tf
+        model = tf.keras.Sequential([tf.keras.Input((4,)), tf.keras.layers.Dense(2, activation="softmax")])
+        model.compile(optimizer="sgd", loss="sparse_categorical_crossentropy", metrics=["accuracy", tf.keras.metrics.AUC()])
+        with self.assertRaises(ValueError):
+            fit_distributed(model, tf.distribute.get_strategy(), None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import threading
+import json
+import sys
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add parent directory to path to import benchmarks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.http_load_test import (build_payloads, run_stage, check_slo, MemorySampler, wait_until_ready,
+                                       summarize_stage)
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Stands in for ai_api: admits at most max_in_flight predictions and sheds the rest with 503."""
+    max_in_flight = 1
+    in_flight = 0
+    lock = threading.Lock()
+    uploads_with_roi = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with StubAPI.lock:
+            admitted = StubAPI.in_flight < StubAPI.max_in_flight
+            if admitted:
+                StubAPI.in_flight += 1
+            if b'name="editor_metadata"' in body:
+                StubAPI.uploads_with_roi += 1
+        if not admitted:
+            return self._reply(503, {"error": "overloaded"})
+        threading.Event().wait(0.02)
+        with StubAPI.lock:
+            StubAPI.in_flight -= 1
+        self._reply(200, {"wound_type": "Cut"}, {"X-Model-Variant": "default"})
+
+    def do_GET(self):
+        self._reply(200, {"analyzer_initialized": True, "memory": {"rss_mb": 321.0}})
+
+    def _reply(self, status, payload, headers=None):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+class TestHTTPLoadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.payloads = build_payloads(count=3, roi_fraction=1.0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_payload_mix(self):
+        sizes = {p.size for p in self.payloads}
+        self.assertEqual(len(sizes), 3)
+        self.assertTrue(all(p.editor_metadata["boundary_coordinates"] for p in self.payloads))
+        self.assertEqual(build_payloads(count=3, roi_fraction=0.0)[0].form(), {})
+
+    def test_single_user_is_never_shed(self):
+        stage = run_stage(self.url, self.payloads, concurrency=1, duration=0.3)
+        self.assertGreater(stage["ok"], 0)
+        self.assertEqual((stage["shed"], stage["errors"]), (0, 0))
+        self.assertEqual(stage["model_variants"], {"default": stage["ok"]})
+        self.assertLessEqual(stage["latency"]["p50_ms"], stage["latency"]["p99_ms"])
+        self.assertGreater(StubAPI.uploads_with_roi, 0)
+        self.assertEqual(check_slo(stage, p95_ms=10_000, max_error_rate=0.0, max_shed_rate=0.0), [])
+
+    def test_overload_is_counted_as_shed_not_error(self):
+        stage = run_stage(self.url, self.payloads, concurrency=4, duration=0.3, shed_backoff=0.01)
+        self.assertGreater(stage["shed"], 0)
+        self.assertEqual(stage["errors"], 0)
+        self.assertEqual(stage["status_codes"]["503"], stage["shed"])
+        violations = check_slo(stage, max_error_rate=0.0, max_shed_rate=0.0)
+        self.assertEqual(len(violations), 1)
+        self.assertIn("shed rate", violations[0])
+
+    def test_unreachable_server_counts_errors(self):
+        stage = run_stage("http://127.0.0.1:9", self.payloads, concurrency=1, duration=0.1, timeout=1)
+        self.assertEqual(stage["ok"], 0)
+        self.assertEqual(stage["error_rate"], 1.0)
+        self.assertIn("no successful requests", check_slo(stage, p95_ms=1000))
+
+    def test_memory_sampler_and_readiness(self):
+        self.assertTrue(wait_until_ready(self.url, timeout=5)["analyzer_initialized"])
+        sampler = MemorySampler(self.url, interval=0.05)
+        sampler.start()
+        threading.Event().wait(0.2)
+        sampler.stop()
+        self.assertGreater(len(sampler.samples), 0)
+        self.assertEqual(sampler.peak_between(0, 60), 321.0)
+
+    def test_empty_stage(self):
+        stage = summarize_stage(2, [], 1.0)
+        self.assertEqual((stage["requests"], stage["error_rate"], stage["latency"]["p95_ms"]), (0, 0.0, None))
+
+if __name__ == '__main__':
+    unittest.main()
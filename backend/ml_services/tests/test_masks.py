@@ -0,0 +1,59 @@
+import unittest
+import tempfile
+import sys
+import os
+import cv2
+import numpy as np
+
+# Add parent directory to path to import preprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing.masks import prepare_masks, MaskCache, mask_cache_key
+from preprocessing.data_loader import file_sha1
+
+class TestPrepareMasks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_dir = os.path.join(self.tmp.name, "dataset")
+        self.annotations_dir = os.path.join(self.tmp.name, "dataset_masks")
+        self.cache_dir = os.path.join(self.tmp.name, "masks")
+        os.makedirs(os.path.join(self.dataset_dir, "Cut"))
+        os.makedirs(os.path.join(self.annotations_dir, "Cut"))
+        for i in range(3):
+            # Dark wound blob on bright skin -> inverted Otsu marks the blob
+            img = np.full((48, 48, 3), 220, dtype=np.uint8)
+            cv2.circle(img, (24, 24), 10 + i, (30, 30, 30), -1)
+            cv2.imwrite(os.path.join(self.dataset_dir, "Cut", f"{i}.jpg"), img)
+        # Image 2 has a real annotation covering only the top rows
+        annotation = np.zeros((48, 48), dtype=np.uint8)
+        annotation[:8] = 255
+        cv2.imwrite(os.path.join(self.annotations_dir, "Cut", "2.png"), annotation)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_placeholders_cached_and_annotations_override(self):
+        lookup, key = prepare_masks(self.dataset_dir, self.cache_dir, (32, 32), self.annotations_dir, workers=2)
+
+        path0 = os.path.join(self.dataset_dir, "Cut", "0.jpg")
+        sha0 = file_sha1(path0)
+        self.assertIn(mask_cache_key(sha0, (32, 32)), MaskCache(self.cache_dir))
+
+        placeholder = lookup(os.path.join("Cut", "0.jpg"), sha0)
+        self.assertEqual(placeholder.shape, (32, 32, 1))
+        self.assertEqual(placeholder[16, 16, 0], 1.0)  # Blob centre
+        self.assertEqual(placeholder[0, 0, 0], 0.0)    # Skin corner
+
+        path2 = os.path.join(self.dataset_dir, "Cut", "2.jpg")
+        annotated = lookup(os.path.join("Cut", "2.jpg"), file_sha1(path2))
+        self.assertEqual(annotated[0, 0, 0], 1.0)
+        self.assertEqual(annotated[16, 16, 0], 0.0)
+
+        # Same inputs give the same key; a new annotation changes it
+        _, same_key = prepare_masks(self.dataset_dir, self.cache_dir, (32, 32), self.annotations_dir)
+        self.assertEqual(key, same_key)
+        cv2.imwrite(os.path.join(self.annotations_dir, "Cut", "1.png"), np.zeros((48, 48), dtype=np.uint8))
+        _, new_key = prepare_masks(self.dataset_dir, self.cache_dir, (32, 32), self.annotations_dir)
+        self.assertNotEqual(key, new_key)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import tempfile
+import sys
+import os
+import cv2
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import analysis
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis.model_variants import ModelVariant, VariantSelector
+from analysis.wound_analyzer import WoundAnalyzer
+
+def tiny_pair(size):
+    classifier = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(5, activation="softmax")
+    ])
+    segmenter = tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)), tf.keras.layers.Conv2D(1, 1, activation="sigmoid")
+    ])
+    return classifier, segmenter
+
+class TestVariantSelector(unittest.TestCase):
+    def setUp(self):
+        self.full = ModelVariant("full", *tiny_pair(32))
+        self.fast = ModelVariant("fast", *tiny_pair(16))
+        self.selector = VariantSelector([self.full, self.fast], slo_ms=1000, headroom=1.0)
+        self.selector.observe("full", 400.0)
+        self.selector.observe("fast", 100.0)
+
+    def test_idle_uses_best_variant(self):
+        variant, decision = self.selector.acquire()
+        self.assertIs(variant, self.full)
+        self.assertEqual(decision["queue_depth"], 0)
+        self.assertFalse(decision["degraded"])
+
+    def test_degrades_as_queue_grows(self):
+        # full: (depth + 1) * 400ms fits 1000ms for depth 0 and 1 only
+        chosen = [self.selector.acquire()[0].name for _ in range(4)]
+        self.assertEqual(chosen, ["full", "full", "fast", "fast"])
+        self.assertEqual(self.selector.stats()["degraded_requests"], 2)
+
+    def test_cheapest_when_nothing_fits(self):
+        for _ in range(20):
+            variant, _ = self.selector.acquire()
+        self.assertIs(variant, self.fast)
+
+    def test_release_updates_estimate_and_depth(self):
+        variant, decision = self.selector.acquire()
+        self.selector.release(decision, 1500.0)
+        stats = self.selector.stats()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["variants"][0]["served"], 1)
+        self.assertEqual(stats["variants"][0]["slo_misses"], 1)
+        self.assertGreater(self.selector.service_ms["full"], 400.0)
+
+    def test_requested_variant(self):
+        variant, decision = self.selector.acquire("fast")
+        self.assertIs(variant, self.fast)
+        with self.assertRaises(KeyError):
+            self.selector.acquire("missing")
+
+class TestAnalyzerVariants(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, size in (("full", 32), ("fast", 16)):
+            classifier, segmenter = tiny_pair(size)
+            classifier.save(os.path.join(self.tmp.name, f"cls_{name}.keras"))
+            segmenter.save(os.path.join(self.tmp.name, f"seg_{name}.keras"))
+        self.image_path = os.path.join(self.tmp.name, "wound.jpg")
+        image = np.full((120, 160, 3), 200, dtype=np.uint8)
+        cv2.circle(image, (80, 60), 30, (40, 40, 180), -1)
+        cv2.imwrite(self.image_path, image)
+        self.analyzer = WoundAnalyzer(
+            classifier_path=os.path.join(self.tmp.name, "cls_full.keras"),
+            segmentation_path=os.path.join(self.tmp.name, "seg_full.keras"),
+            variants=[
+                {"name": "full", "classifier": "cls_full.keras", "segmenter": "seg_full.keras"},
+                {"name": "fast", "classifier": "cls_fast.keras", "segmenter": "seg_fast.keras"},
+                {"name": "absent", "classifier": "nope.keras", "segmenter": "nope.keras"},
+            ],
+            warm_up=True,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_variant_skipped(self):
+        self.assertEqual([v.name for v in self.analyzer.selector.variants], ["full", "fast"])
+
+    def test_each_variant_reports_itself(self):
+        roi = {"boundary_coordinates": [{"x": 40, "y": 20}, {"x": 120, "y": 20}, {"x": 80, "y": 100}]}
+        for name, size in (("full", 32), ("fast", 16)):
+            results, image, mask = self.analyzer.analyze_wound(self.image_path, editor_metadata=roi, variant=name)
+            self.assertEqual(results["model_variant"], name)
+            self.assertEqual(image.shape[:2], (size, size))
+            self.assertEqual(mask.shape[:2], (size, size))
+            self.assertIn(results["severity"], ("Low", "Medium", "High"))
+        self.assertEqual(self.analyzer.selector.stats()["in_flight"], 0)
+
+    def test_single_pair_without_variants(self):
+        analyzer = WoundAnalyzer(
+            classifier_path=os.path.join(self.tmp.name, "cls_fast.keras"),
+            segmentation_path=os.path.join(self.tmp.name, "seg_fast.keras"),
+        )
+        results, _, _ = analyzer.analyze_wound(self.image_path)
+        self.assertEqual(results["model_variant"], "default")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import thread_tuning
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from unittest import mock
+
+from thread_tuning import get_cgroup_cpu_limit, compute_thread_settings, tune_thread_pools
+
+class TestCgroupCpuLimit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.missing = os.path.join(self.tmp.name, "missing")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_cgroup_v2_quota(self):
+        """cpu.max of '150000 100000' means 1.5 cores."""
+        cpu_max = self._write("cpu.max", "150000 100000\n")
+        self.assertAlmostEqual(get_cgroup_cpu_limit(cpu_max, self.missing, self.missing), 1.5)
+
+    def test_cgroup_v2_unlimited(self):
+        cpu_max = self._write("cpu.max", "max 100000\n")
+        self.assertIsNone(get_cgroup_cpu_limit(cpu_max, self.missing, self.missing))
+
+    def test_cgroup_v1_quota(self):
+        quota = self._write("quota", "200000\n")
+        period = self._write("period", "100000\n")
+        self.assertAlmostEqual(get_cgroup_cpu_limit(self.missing, quota, period), 2.0)
+
+    def test_cgroup_v1_unlimited(self):
+        quota = self._write("quota", "-1\n")
+        period = self._write("period", "100000\n")
+        self.assertIsNone(get_cgroup_cpu_limit(self.missing, quota, period))
+
+class TestComputeThreadSettings(unittest.TestCase):
+    def test_fractional_quota_gets_one_thread(self):
+        """Render free tier (0.1 CPU) must still get a single thread."""
+        settings = compute_thread_settings(0.1, workers=1)
+        self.assertEqual(settings, {"intra_op_threads": 1, "inter_op_threads": 1, "cv2_threads": 1})
+
+    def test_cores_split_between_workers(self):
+        settings = compute_thread_settings(8, workers=2)
+        self.assertEqual(settings["intra_op_threads"], 4)
+        self.assertEqual(settings["cv2_threads"], 4)
+        self.assertEqual(settings["inter_op_threads"], 2)
+
+    def test_more_workers_than_cores(self):
+        settings = compute_thread_settings(2, workers=4)
+        self.assertEqual(settings["intra_op_threads"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
+
+class TestTuneThreadPools(unittest.TestCase):
+    def tune(self, calibration):
+        base = compute_thread_settings(2, 1)
+        with mock.patch("thread_tuning.calibrate_thread_settings", return_value=(dict(base), calibration)), \
+                mock.patch.dict(os.environ, {}, clear=False):
+            for key in ("TF_INTRA_OP_THREADS", "TF_INTER_OP_THREADS", "CV2_NUM_THREADS"):
+                os.environ.pop(key, None)
+            return tune_thread_pools(calibrate=True)
+
+    def test_failed_calibration_is_not_reported_as_calibrated(self):
+        self.assertEqual(self.tune([])["source"], "calibration_failed")
+
+    def test_successful_calibration(self):
+        timings = [{"intra_op_threads": 1, "inter_op_threads": 1, "cv2_threads": 1, "latency_ms": 3.0}]
+        self.assertEqual(self.tune(timings)["source"], "calibrated")
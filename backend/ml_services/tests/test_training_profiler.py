@@ -0,0 +1,55 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+import numpy as np
+import tensorflow as tf
+
+# Add parent directory to path to import training_profiler
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from training_profiler import ThroughputProfiler, parse_step_window
+
+class TestThroughputProfiler(unittest.TestCase):
+    def test_parse_step_window(self):
+        self.assertIsNone(parse_step_window(None))
+        self.assertEqual(parse_step_window("10:20"), (10, 20))
+        with self.assertRaises(ValueError):
+            parse_step_window("20:10")
+        with self.assertRaises(ValueError):
+            parse_step_window("abc")
+
+    def test_report_per_epoch(self):
+        x = np.random.rand(40, 8, 8, 3).astype(np.float32)
+        y = np.random.randint(0, 2, 40).astype(np.int32)
+        ds = tf.data.Dataset.from_tensor_slices((x, y)).batch(8)
+
+        model = tf.keras.Sequential([
+            tf.keras.Input((8, 8, 3)),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(2, activation="softmax")
+        ])
+        model.compile(optimizer="adam", loss="sparse_categorical_crossentropy")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, "training_profile.json")
+            profiler = ThroughputProfiler(report_path=report_path)
+            model.fit(profiler.instrument(ds), epochs=2, verbose=0, callbacks=[profiler])
+
+            with open(report_path) as f:
+                report = json.load(f)
+
+        self.assertEqual(len(report["epochs"]), 2)
+        epoch = report["epochs"][1]
+        self.assertEqual(epoch["steps"], 5)
+        self.assertEqual(epoch["images"], 40)
+        self.assertGreater(epoch["images_per_sec"], 0)
+        self.assertGreaterEqual(epoch["input_wait_fraction"], 0)
+        self.assertLessEqual(epoch["input_wait_fraction"], 1)
+        self.assertGreater(epoch["peak_rss_mb"], 0)
+        self.assertIn("loss", epoch["metrics"])
+        self.assertIn(epoch["bound"], ("input", "compute"))
+        self.assertIsNotNone(report["summary"]["steady_state_images_per_sec"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# Thread-pool auto-tuning for TensorFlow and OpenCV.
+# TF only accepts intra/inter-op settings before its runtime is initialised,
+# so tune_thread_pools() must run before the first model is loaded.
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read_first_line(path):
+    try:
+        with open(path, "r") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def get_cgroup_cpu_limit(cpu_max_path=CGROUP_V2_CPU_MAX, quota_path=CGROUP_V1_QUOTA, period_path=CGROUP_V1_PERIOD):
+    """
+    Returns the container CPU quota in (possibly fractional) cores, or None if unlimited.
+    Supports cgroup v2 (cpu.max) and cgroup v1 (cfs_quota_us / cfs_period_us).
+    """
+    line = _read_first_line(cpu_max_path)
+    if line:
+        parts = line.split()
+        if len(parts) == 2 and parts[0] != "max":
+            try:
+                quota, period = int(parts[0]), int(parts[1])
+                if quota > 0 and period > 0:
+                    return quota / period
+            except ValueError:
+                pass
+        return None
+
+    quota = _read_first_line(quota_path)
+    period = _read_first_line(period_path)
+    if quota and period:
+        try:
+            quota, period = int(quota), int(period)
+            if quota > 0 and period > 0:
+                return quota / period
+        except ValueError:
+            pass
+    return None
+
+
+def get_available_cpus():
+    """Number of cores this process may actually use (affinity mask capped by the cgroup quota)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = get_cgroup_cpu_limit()
+    if quota is not None:
+        cpus = min(cpus, quota)
+    return max(1.0, float(cpus))
+
+
+def get_worker_count():
+    """Number of serving processes sharing the machine (gunicorn honours WEB_CONCURRENCY)."""
+    for var in ("ML_WORKERS", "WEB_CONCURRENCY"):
+        value = os.environ.get(var)
+        if value:
+            try:
+                return max(1, int(value))
+            except ValueError:
+                pass
+    return 1
+
+
+def compute_thread_settings(cpus, workers=1):
+    """
+    Splits the available cores evenly between workers so they don't oversubscribe each other.
+    Inter-op parallelism only pays off once a worker owns several cores.
+    """
+    per_worker = max(1, int(cpus // max(1, workers)))
+    return {
+        "intra_op_threads": per_worker,
+        "inter_op_threads": 1 if per_worker <= 2 else 2,
+        "cv2_threads": per_worker,
+    }
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"⚠️ Ignoring invalid {name}={value!r}")
+        return None
+
+
+def _benchmark(settings, steps):
+    """Applies the candidate settings in this (fresh) process and times a small conv workload."""
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    import numpy as np
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(settings["intra_op_threads"])
+    tf.config.threading.set_inter_op_parallelism_threads(settings["inter_op_threads"])
+
+    inputs = tf.keras.Input((224, 224, 3))
+    x = tf.keras.layers.Conv2D(32, 3, strides=2, activation="relu")(inputs)
+    x = tf.keras.layers.DepthwiseConv2D(3, activation="relu")(x)
+    x = tf.keras.layers.Conv2D(64, 1, activation="relu")(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    model = tf.keras.Model(inputs, tf.keras.layers.Dense(10)(x))
+
+    batch = np.random.rand(1, 224, 224, 3).astype("float32")
+    model(batch, training=False)  # Warm-up / graph tracing
+    start = time.perf_counter()
+    for _ in range(steps):
+        model(batch, training=False)
+    return (time.perf_counter() - start) / steps
+
+
+def calibrate_thread_settings(base_settings, steps=20, timeout=120):
+    """
+    Benchmarks a few intra/inter-op candidates around the computed default and returns the fastest.
+    Each candidate runs in its own interpreter because TF cannot change its pools once initialised.
+    """
+    per_worker = base_settings["intra_op_threads"]
+    candidates = []
+    for intra in sorted({1, max(1, per_worker // 2), per_worker}):
+        for inter in sorted({1, 2}):
+            if inter <= intra:
+                candidates.append({"intra_op_threads": intra, "inter_op_threads": inter, "cv2_threads": intra})
+
+    best, best_latency, timings = base_settings, None, []
+    for candidate in candidates:
+        try:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), json.dumps(candidate), str(steps)],
+                capture_output=True, text=True, timeout=timeout
+            )
+            latency = float(proc.stdout.strip().splitlines()[-1])
+        except (subprocess.TimeoutExpired, ValueError, IndexError):
+            continue
+        timings.append({**candidate, "latency_ms": round(latency * 1000, 2)})
+        if best_latency is None or latency < best_latency:
+            best, best_latency = candidate, latency
+
+    print(f"⏱️ Thread calibration results: {timings}")
+    return dict(best), timings
+
+
+def tune_thread_pools(calibrate=None):
+    """
+    Detects the CPU budget, sizes the TF and OpenCV thread pools for it and applies them.
+    Explicit TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS / CV2_NUM_THREADS env vars always win.
+    Set ML_THREAD_CALIBRATE=1 (or pass calibrate=True) to benchmark candidates first.
+    Returns the applied configuration so it can be reported on /health.
+    """
+    cpus = get_available_cpus()
+    workers = get_worker_count()
+    settings = compute_thread_settings(cpus, workers)
+    source = "auto"
+
+    if calibrate is None:
+        calibrate = os.environ.get("ML_THREAD_CALIBRATE", "0") == "1"
+    calibration = None
+    if calibrate:
+        try:
+            settings, calibration = calibrate_thread_settings(settings)
+            # No candidate finished: calibrate_thread_settings fell back to the computed defaults
+            source = "calibrated" if calibration else "calibration_failed"
+        except Exception as e:
+            print(f"⚠️ Thread calibration failed, using computed defaults: {e}")
+
+    overrides = {
+        "intra_op_threads": _env_int("TF_INTRA_OP_THREADS"),
+        "inter_op_threads": _env_int("TF_INTER_OP_THREADS"),
+        "cv2_threads": _env_int("CV2_NUM_THREADS"),
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            settings[key] = value
+            source = "env"
+
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(settings["intra_op_threads"])
+        tf.config.threading.set_inter_op_parallelism_threads(settings["inter_op_threads"])
+    except RuntimeError as e:
+        # TF runtime already initialised — report what is actually in effect
+        print(f"⚠️ TF thread pools already initialised: {e}")
+        settings["intra_op_threads"] = tf.config.threading.get_intra_op_parallelism_threads()
+        settings["inter_op_threads"] = tf.config.threading.get_inter_op_parallelism_threads()
+
+    import cv2
+    cv2.setNumThreads(settings["cv2_threads"])
+
+    config = {
+        **settings,
+        "available_cpus": round(cpus, 2),
+        "workers": workers,
+        "source": source,
+    }
+    if calibration is not None:
+        config["calibration"] = calibration
+    print(f"🧵 Thread pools configured: {config}")
+    return config
+
+
+if __name__ == "__main__":
+    # Calibration child: thread_tuning.py '<settings json>' <steps>
+    print(_benchmark(json.loads(sys.argv[1]), int(sys.argv[2])))
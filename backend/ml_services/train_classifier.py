@@ -1,8 +1,17 @@
 import os
+import sys
+import argparse
 import matplotlib.pyplot as plt
 from utils import download_dataset
-from preprocessing.data_loader import load_and_preprocess_dataset, get_data_generators
+from preprocessing.dataset import load_wound_dataset, split_indices, compiled_dir_for
+from preprocessing.dataset_cache import CompiledDataset
+from preprocessing.augmentation import batch_augment_fn
 from classification.model import create_wound_classifier
+from training_profiler import profiler_from_env
+from checkpointing import checkpoint_callbacks
+from thread_tuning import tune_thread_pools
+from distributed import (worker_info, is_chief, worker_path, get_strategy, build_streams, train_model,
+                         launch_local_workers)
 
 def plot_history(history, save_path="classification_metrics.png"):
     """
@@ -36,42 +45,72 @@ def plot_history(history, save_path="classification_metrics.png"):
     print(f"Metrics plot saved to {save_path}")
 
 def main():
-    # 1. Download dataset (Put the actual Google Drive link here)
-    gdrive_url = "https://drive.google.com/file/d/1i0VJcrv2wNmmtCfTCxmD2wnkoYrzUJev/view?usp=sharing"
-    dataset_dir = download_dataset(gdrive_url, dest_folder="dataset")
-    
-    # 2. Load dataset
-    print("\nLoading and preprocessing data...")
-    X_train, X_val, y_train, y_val, classes = load_and_preprocess_dataset(dataset_dir)
+    parser = argparse.ArgumentParser(description="Train the MobileNetV2 wound classifier.")
+    parser.add_argument("--epochs", type=int, default=30, help="Maximum epochs (early stopping usually ends sooner).")
+    parser.add_argument("--batch-size", type=int, default=32, help="Global batch size, split across workers.")
+    parser.add_argument("--workers", type=int, default=1, help="Local data-parallel training processes.")
+    parser.add_argument("--image-size", type=int, default=224, help="Square input size (e.g. 160 for a fast variant).")
+    parser.add_argument("--alpha", type=float, default=1.0, help="MobileNetV2 width multiplier.")
+    parser.add_argument("--output", type=str, default="models/wound_classifier.keras", help="Where to save the model.")
+    args = parser.parse_args()
+    image_size = (args.image_size, args.image_size)
+    compiled_dir = compiled_dir_for(image_size)
+
+    _, num_workers = worker_info()
+    if num_workers > 1:
+        # Give each worker its share of the cores before TF starts; the launcher already
+        # downloaded and compiled the dataset, so workers only open the shards
+        tune_thread_pools()
+        store = CompiledDataset(compiled_dir)
+    else:
+        # 1. Download dataset (Put the actual Google Drive link here)
+        gdrive_url = "https://drive.google.com/file/d/1i0VJcrv2wNmmtCfTCxmD2wnkoYrzUJev/view?usp=sharing"
+        dataset_dir = download_dataset(gdrive_url, dest_folder="dataset")
+
+        # 2. Index + decode once into compiled shards
+        store = load_wound_dataset(dataset_dir, image_size=image_size, compiled_dir=compiled_dir, with_masks=False)
+
+    if args.workers > 1 and num_workers == 1:
+        sys.exit(launch_local_workers(sys.argv, args.workers))
+
+    # 3. Stream normalized batches with in-graph augmentation (one shard per worker)
+    print("\nBuilding streaming input pipeline...")
+    strategy = get_strategy()
+    train_idx, val_idx = split_indices(store)
+    # Records img/s, step time, input wait and peak RSS per epoch (ML_PROFILE_STEPS=START:END adds a TF trace)
+    profiler = profiler_from_env(worker_path("training_profile.json"), workers=num_workers)
+    train_gen, val_gen = build_streams(strategy, store, train_idx, val_idx, args.batch_size, targets="label",
+                                       augment_fn=batch_augment_fn(), instrument=profiler.instrument)
+    classes = store.classes
     num_classes = len(classes)
     
-    # 3. Augment data
-    print("\nApplying data augmentation...")
-    train_gen, val_gen = get_data_generators(X_train, X_val, y_train, y_val, batch_size=32)
-    
     # 4. Initialize model (MobileNetV2 based)
     print("\nInitializing MobileNetV2 Classification Model...")
-    model = create_wound_classifier(input_shape=(224, 224, 3), num_classes=num_classes)
-    model.summary()
+    with strategy.scope():
+        model = create_wound_classifier(input_shape=image_size + (3,), num_classes=num_classes, alpha=args.alpha)
+    if is_chief():
+        model.summary()
     
-    # 5. Train model
-    epochs = 30 # Change as needed
-    print(f"\nTraining for {epochs} epochs...")
-    history = model.fit(
-        train_gen,
-        validation_data=val_gen,
-        epochs=epochs,
+    # 5. Train model (checkpoints are kept per output model, so variants don't resume each other)
+    run_name = os.path.splitext(os.path.basename(args.output))[0]
+    print(f"\nTraining for up to {args.epochs} epochs...")
+    history = train_model(
+        model, strategy, train_gen, val_gen,
+        epochs=args.epochs,
+        # Backs up model + optimizer every epoch, resumes after a crash, stops once val_loss plateaus
+        callbacks=[profiler] + checkpoint_callbacks(run_name, args.epochs, patience=5,
+                                                    checkpoint_dir=worker_path("checkpoints"),
+                                                    report_path=worker_path("training_summary.json"))
     )
+    if not is_chief():
+        return
     
     # 6. Show / Save accuracy and loss plots
     plot_history(history, save_path="training_metrics.png")
     
     # 7. Save model
-    models_dir = "models"
-    if not os.path.exists(models_dir):
-        os.makedirs(models_dir)
-    
-    model_path = os.path.join(models_dir, "wound_classifier.keras")
+    model_path = args.output
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
     model.save(model_path)
     print(f"\nModel successfully saved at {model_path}")
 
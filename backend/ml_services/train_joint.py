@@ -0,0 +1,69 @@
+import os
+import argparse
+import tensorflow as tf
+from classification.model import create_wound_classifier
+from segmentation.model import unet_segmentation_model
+from preprocessing.dataset import load_wound_dataset, split_indices, sample_stream
+from preprocessing.augmentation import batch_augment_fn
+from train_classifier import plot_history
+from training_profiler import profiler_from_env
+from checkpointing import checkpoint_callbacks
+
+def build_joint_model(classifier, segmenter, input_shape=(224, 224, 3)):
+    """
+    Wraps the classifier and U-Net around one shared input so a single fit() step feeds both
+    from the same decoded (and augmented) batch. Weights stay in the two sub-models, which are
+    saved separately afterwards.
+    """
+    inputs = tf.keras.Input(shape=input_shape)
+    outputs = {"label": classifier(inputs), "mask": segmenter(inputs)}
+    model = tf.keras.Model(inputs=inputs, outputs=outputs, name="wound_joint")
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=1e-4),
+        loss={"label": "sparse_categorical_crossentropy", "mask": "binary_crossentropy"},
+        metrics={"label": ["accuracy"], "mask": ["accuracy"]}
+    )
+    return model
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the classifier and segmentation model together from one data pass.")
+    parser.add_argument("--dataset", type=str, default="dataset", help="Dataset root with one folder per class.")
+    parser.add_argument("--epochs", type=int, default=30, help="Training epochs.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size shared by both models.")
+    args = parser.parse_args()
+
+    print("Loading dataset (labels + masks from one indexed pass)...")
+    store = load_wound_dataset(args.dataset, image_size=(224, 224), annotations_dir="dataset_masks")
+    train_idx, val_idx = split_indices(store)
+    # Geometric augmentation is applied identically to the image and its mask; labels pass through
+    train_ds = sample_stream(store, train_idx, batch_size=args.batch_size, training=True,
+                             augment_fn=batch_augment_fn())
+    val_ds = sample_stream(store, val_idx, batch_size=args.batch_size)
+
+    print("\nInitializing MobileNetV2 classifier and U-Net segmenter on a shared input...")
+    classifier = create_wound_classifier(input_shape=(224, 224, 3), num_classes=len(store.classes))
+    segmenter = unet_segmentation_model(input_size=(224, 224, 3))
+    model = build_joint_model(classifier, segmenter)
+
+    print(f"\nTraining both models for {args.epochs} epochs...")
+    profiler = profiler_from_env("training_profile.json")
+    history = model.fit(profiler.instrument(train_ds), validation_data=val_ds, epochs=args.epochs,
+                        callbacks=[profiler] + checkpoint_callbacks("joint", args.epochs, patience=5,
+                                                                    report_path="training_summary.json"))
+
+    # Keras names the per-output metrics after the output keys, e.g. label_accuracy
+    history.history["accuracy"] = history.history.get("label_accuracy", [])
+    history.history["val_accuracy"] = history.history.get("val_label_accuracy", [])
+    plot_history(history, save_path="training_metrics.png")
+
+    models_dir = "models"
+    os.makedirs(models_dir, exist_ok=True)
+    classifier_path = os.path.join(models_dir, "wound_classifier.keras")
+    segmenter_path = os.path.join(models_dir, "wound_segmentation_model.h5")
+    classifier.save(classifier_path)
+    segmenter.save(segmenter_path)
+    print(f"\nClassifier saved at {classifier_path}")
+    print(f"Segmentation Model saved at {segmenter_path}")
+
+if __name__ == "__main__":
+    main()
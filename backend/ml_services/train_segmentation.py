@@ -1,104 +1,80 @@
 import os
-import cv2
-import numpy as np
+import sys
+import argparse
 import tensorflow as tf
-from sklearn.model_selection import train_test_split
 from segmentation.model import unet_segmentation_model
+from preprocessing.dataset import load_wound_dataset, split_indices, compiled_dir_for
+from preprocessing.dataset_cache import CompiledDataset
+from preprocessing.augmentation import batch_augment_fn
+from training_profiler import profiler_from_env
+from checkpointing import checkpoint_callbacks
+from thread_tuning import tune_thread_pools
+from distributed import (worker_info, is_chief, worker_path, get_strategy, build_streams, train_model,
+                         launch_local_workers)
 
-def get_placeholder_mask(image, image_size=(224, 224)):
-    """
-    Since bounding box / pixel-level mask dataset isn't provided, 
-    this function generates a rough placeholder mask using Otsu thresholding.
-    Replace this with real segmentation masks for production.
-    """
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    
-    # Resize and normalize
-    mask = cv2.resize(mask, image_size)
-    mask = mask.astype(np.float32) / 255.0
-    mask = np.expand_dims(mask, axis=-1)
-    return mask
-
-def create_segmentation_dataset(dataset_dir="dataset", image_size=(224, 224)):
-    """
-    Mock dataset generator for segmentation. Loads classification images 
-    and generates automated Otsu-threshold masks for training U-Net.
-    """
-    import json
-    # Try finding sub-folder if dataset was extracted there
-    if not any(os.path.exists(os.path.join(dataset_dir, c)) for c in ["Abrasions", "Bruises"]):
-        if os.path.exists(os.path.join(dataset_dir, "dataset")):
-            dataset_dir = os.path.join(dataset_dir, "dataset")
+def main():
+    parser = argparse.ArgumentParser(description="Train the U-Net wound segmentation model.")
+    parser.add_argument("--epochs", type=int, default=3, help="Maximum epochs (early stopping may end sooner).")
+    parser.add_argument("--batch-size", type=int, default=16, help="Global batch size, split across workers.")
+    parser.add_argument("--workers", type=int, default=1, help="Local data-parallel training processes.")
+    parser.add_argument("--image-size", type=int, default=224, help="Square input size (e.g. 160 for a fast variant).")
+    parser.add_argument("--base-filters", type=int, default=8, help="U-Net width (filters in the first level).")
+    parser.add_argument("--output", type=str, default="models/wound_segmentation_model.h5", help="Where to save the model.")
+    args = parser.parse_args()
+    image_size = (args.image_size, args.image_size)
+    compiled_dir = compiled_dir_for(image_size)
 
-    if os.path.exists("models/classes.json"):
-        with open("models/classes.json", "r") as f:
-            classes = json.load(f)
+    _, num_workers = worker_info()
+    if num_workers > 1:
+        # Give each worker its share of the cores before TF starts; the launcher already
+        # compiled the shards and masks, so workers only open them
+        tune_thread_pools()
+        store = CompiledDataset(compiled_dir)
     else:
-        classes = [d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d))]
-        classes.sort()
+        print("Loading dataset (annotated masks from dataset_masks/ override Otsu placeholders)...")
+        try:
+            store = load_wound_dataset(
+                "dataset",
+                image_size=image_size,
+                compiled_dir=compiled_dir,
+                annotations_dir="dataset_masks",
+                save_classes=False
+            )
+        except (ValueError, FileNotFoundError):
+            print("Dataset not found. Please run train_classifier.py first to download it.")
+            return
 
-    X, Y = [], []
-    
-    # Try finding sub-folder if dataset was extracted there
-    if not any(os.path.exists(os.path.join(dataset_dir, c)) for c in classes):
-        if os.path.exists(os.path.join(dataset_dir, "dataset")):
-            dataset_dir = os.path.join(dataset_dir, "dataset")
-
-    for class_name in classes:
-        class_dir = os.path.join(dataset_dir, class_name)
-        if not os.path.exists(class_dir):
-            continue
-            
-        for img_name in os.listdir(class_dir):
-            if not img_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                continue
-                
-            img_path = os.path.join(class_dir, img_name)
-            img = cv2.imread(img_path)
-            if img is None:
-                continue
-                
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img = cv2.resize(img, image_size)
-            
-            # Generate placeholder mask
-            mask = get_placeholder_mask(img, image_size)
-            
-            X.append(img.astype('float32') / 255.0)
-            Y.append(mask)
+    if args.workers > 1 and num_workers == 1:
+        sys.exit(launch_local_workers(sys.argv, args.workers))
 
-    return np.array(X), np.array(Y)
-
-def main():
-    print("Loading data and generating placeholder masks...")
-    X, Y = create_segmentation_dataset(dataset_dir="dataset")
-    
-    if len(X) == 0:
-        print("Dataset not found. Please run train_classifier.py first to download it.")
-        return
-
-    X_train, X_val, y_train, y_val = train_test_split(X, Y, test_size=0.2, random_state=42)
-    print(f"Training set: {len(X_train)} samples, Validation set: {len(X_val)} samples.")
+    strategy = get_strategy()
+    print("Building streaming input pipeline...")
+    train_idx, val_idx = split_indices(store)
+    # Records img/s, step time, input wait and peak RSS per epoch (ML_PROFILE_STEPS=START:END adds a TF trace)
+    profiler = profiler_from_env(worker_path("segmentation_profile.json"), workers=num_workers)
+    train_ds, val_ds = build_streams(strategy, store, train_idx, val_idx, args.batch_size, targets="mask",
+                                     augment_fn=batch_augment_fn(with_masks=True), instrument=profiler.instrument)
 
     print("\nInitializing U-Net Segmentation Model...")
-    model = unet_segmentation_model(input_size=(224, 224, 3))
+    with strategy.scope():
+        model = unet_segmentation_model(input_size=image_size + (3,), base_filters=args.base_filters)
     
     print("\nTraining U-Net for wound boundary detection...")
-    model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        batch_size=16,
-        epochs=3
+    # Checkpoints are kept per output model, so variants don't resume each other
+    run_name = os.path.splitext(os.path.basename(args.output))[0]
+    train_model(
+        model, strategy, train_ds, val_ds,
+        epochs=args.epochs,
+        callbacks=[profiler] + checkpoint_callbacks(run_name, args.epochs, patience=2,
+                                                    checkpoint_dir=worker_path("checkpoints"),
+                                                    report_path=worker_path("segmentation_summary.json"))
     )
+    if not is_chief():
+        return
     
     # Save model
-    models_dir = "models"
-    if not os.path.exists(models_dir):
-        os.makedirs(models_dir)
-        
-    model_path = os.path.join(models_dir, "wound_segmentation_model.h5")
+    model_path = args.output
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
     model.save(model_path)
     print(f"\nSegmentation Model successfully saved at {model_path}")
 
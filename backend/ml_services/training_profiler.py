@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import resource
+import numpy as np
+import tensorflow as tf
+
+# Per-epoch training throughput report.
+# Keras pulls batches inside its compiled train step (and fetches one batch ahead), so input
+# wait can't be timed from callbacks alone. instrument() appends a marker to the end of the
+# input pipeline that records when each batch comes out of it; batch k arriving after step k
+# began means step k was waiting for input for that long, the rest of the step is compute.
+
+def parse_step_window(value):
+    """Parses "START:END" (global training steps, END exclusive) into a tuple, or None."""
+    if not value:
+        return None
+    try:
+        start, end = (int(v) for v in value.split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid profiler step window {value!r}; expected START:END")
+    if start < 0 or end <= start:
+        raise ValueError(f"Invalid profiler step window {value!r}; expected 0 <= START < END")
+    return start, end
+
+def current_rss_bytes():
+    """Resident set size of this process right now (falls back to the lifetime peak off Linux)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+def peak_rss_bytes():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class ThroughputProfiler(tf.keras.callbacks.Callback):
+    """
+    Records images/sec, step time, input wait and peak RSS for every epoch and writes them
+    to a JSON report when training ends. Optionally captures a TF profiler trace for the
+    global steps in trace_steps=(start, end). In data-parallel runs each worker only sees its own
+    shard, so pass workers=N to also report the cluster-wide images/sec.
+    """
+    def __init__(self, report_path="training_profile.json", trace_steps=None, trace_dir="logs/profile",
+                 input_bound_threshold=0.2, workers=1):
+        super().__init__()
+        self.workers = workers
+        self.report_path = report_path
+        self.trace_steps = trace_steps
+        self.trace_dir = trace_dir
+        self.input_bound_threshold = input_bound_threshold
+        self.epochs = []
+        self._global_step = 0
+        self._tracing = False
+        self._arrivals = []
+
+    def instrument(self, dataset):
+        """Returns the training dataset with the batch-arrival marker appended (apply last, after prefetch)."""
+        def _mark(batch_size):
+            # Runs on the iterator's thread; list.append is atomic
+            self._arrivals.append((time.perf_counter(), int(batch_size)))
+            return np.int64(0)
+
+        def _map(images, targets):
+            stamp = tf.numpy_function(_mark, [tf.shape(images)[0]], tf.int64, stateful=True)
+            with tf.control_dependencies([stamp]):
+                images = tf.identity(images)
+            return images, targets
+
+        return dataset.map(_map)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._step_times, self._waits, self._images = [], [], 0
+        self._step_index = 0
+        self._arrivals = []
+        self._epoch_peak_rss = current_rss_bytes()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self._global_step == self.trace_steps[0] and not self._tracing:
+            tf.profiler.experimental.start(self.trace_dir)
+            self._tracing = True
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        end = time.perf_counter()
+        self._step_times.append(end - self._step_start)
+        if self._step_index < len(self._arrivals):
+            arrived_at, batch_size = self._arrivals[self._step_index]
+            self._waits.append(min(end, max(arrived_at, self._step_start)) - self._step_start)
+            self._images += batch_size
+        self._step_index += 1
+        self._epoch_peak_rss = max(self._epoch_peak_rss, current_rss_bytes())
+
+        self._global_step += 1
+        if self._tracing and self._global_step >= self.trace_steps[1]:
+            self._stop_trace()
+
+    def on_epoch_end(self, epoch, logs=None):
+        step_times = np.array(self._step_times) if self._step_times else np.zeros(1)
+        train_time = float(step_times.sum())
+        wait_time = float(sum(self._waits))
+        entry = {
+            "epoch": epoch + 1,
+            "steps": len(self._step_times),
+            "images": self._images,
+            "epoch_seconds": round(time.perf_counter() - self._epoch_start, 4),
+            "images_per_sec": round(self._images / train_time, 2) if train_time > 0 else None,
+            "global_images_per_sec": round(self._images * self.workers / train_time, 2) if train_time > 0 else None,
+            "step_time_ms": {
+                "mean": round(float(step_times.mean()) * 1000, 3),
+                "p50": round(float(np.percentile(step_times, 50)) * 1000, 3),
+                "p95": round(float(np.percentile(step_times, 95)) * 1000, 3),
+            },
+            "input_wait_seconds": round(wait_time, 4),
+            "input_wait_fraction": round(wait_time / train_time, 4) if train_time > 0 else None,
+            "peak_rss_mb": round(self._epoch_peak_rss / (1024 * 1024), 1),
+            "metrics": {k: float(v) for k, v in (logs or {}).items()},
+        }
+        entry["bound"] = "input" if (entry["input_wait_fraction"] or 0) > self.input_bound_threshold else "compute"
+        self.epochs.append(entry)
+        print(f"⏱️ Epoch {entry['epoch']}: {entry['images_per_sec']} img/s, "
+              f"step {entry['step_time_ms']['mean']} ms, input wait {entry['input_wait_fraction']}, "
+              f"peak RSS {entry['peak_rss_mb']} MB ({entry['bound']}-bound)")
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            self._stop_trace()
+        self.write_report()
+
+    def _stop_trace(self):
+        tf.profiler.experimental.stop()
+        self._tracing = False
+        print(f"📈 Profiler trace for steps {self.trace_steps[0]}-{self.trace_steps[1]} saved to {self.trace_dir}")
+
+    def summary(self):
+        # The first epoch includes graph tracing/compilation, so steady-state numbers skip it when possible
+        steady = self.epochs[1:] or self.epochs
+        rates = [e["images_per_sec"] for e in steady if e["images_per_sec"]]
+        return {
+            "epochs": len(self.epochs),
+            "workers": self.workers,
+            "steady_state_images_per_sec": round(float(np.median(rates)), 2) if rates else None,
+            "steady_state_global_images_per_sec": round(float(np.median(rates)) * self.workers, 2) if rates else None,
+            "mean_input_wait_fraction": round(float(np.mean([e["input_wait_fraction"] or 0 for e in steady])), 4)
+            if steady else None,
+            "peak_rss_mb": max((e["peak_rss_mb"] for e in self.epochs), default=None),
+            "process_peak_rss_mb": round(peak_rss_bytes() / (1024 * 1024), 1),
+        }
+
+    def write_report(self):
+        report = {
+            "model": self.model.name if self.model is not None else None,
+            "tensorflow": tf.__version__,
+            "cpus": os.cpu_count(),
+            "trace_dir": self.trace_dir if self.trace_steps else None,
+            "summary": self.summary(),
+            "epochs": self.epochs,
+        }
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        tmp_path = self.report_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, self.report_path)
+        print(f"Throughput report saved to {self.report_path}")
+        return report
+
+def profiler_from_env(report_path, workers=1):
+    """Builds a ThroughputProfiler; ML_PROFILE_STEPS=START:END also captures a TF profiler trace."""
+    return ThroughputProfiler(
+        report_path=report_path,
+        workers=workers,
+        trace_steps=parse_step_window(os.environ.get("ML_PROFILE_STEPS")),
+        trace_dir=os.environ.get("ML_PROFILE_DIR", "logs/profile"),
+    )
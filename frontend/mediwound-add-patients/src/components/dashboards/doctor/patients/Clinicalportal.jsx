@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Upload, X, Camera, Info, AlertCircle, Save, ChevronLeft, ZoomIn, ZoomOut, RotateCw } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { ANTERIOR_REGIONS, POSTERIOR_REGIONS } from './bodyRegions';
@@ -18,6 +18,8 @@ const WoundAssessmentDashboard = () => {
     const [patientData, setPatientData] = useState(null);
     const [isAnalyzing, setIsAnalyzing] = useState(false);
     const [analysisError, setAnalysisError] = useState(null);
+    // One key per assessment: re-submitting after a lost response returns the saved assessment instead of a duplicate
+    const idempotencyKeyRef = useRef(null);
     const [aiAnalysis, setAiAnalysis] = useState(null);
     const [showAnalysis, setShowAnalysis] = useState(false);
     const [previousArea, setPreviousArea] = useState(null);
@@ -377,13 +379,21 @@ const WoundAssessmentDashboard = () => {
                 }
             }
 
+            if (!idempotencyKeyRef.current) {
+                idempotencyKeyRef.current = crypto.randomUUID();
+            }
             const response = await AuthAPI.post('api/assessments/', uploadData, {
                 headers: {
-                    'Content-Type': 'multipart/form-data'
+                    'Content-Type': 'multipart/form-data',
+                    'Idempotency-Key': idempotencyKeyRef.current
                 }
             });
 
-            if (response.status === 201 || response.status === 200) {
+            if (response.status === 202) {
+                // Saved; AI analysis and the PDF report are generated in the background
+                alert("Assessment saved! AI analysis and the report will be ready shortly.");
+                navigate(`/patients/profile/${patientData.id}`);
+            } else if (response.status === 201 || response.status === 200) {
                 alert("Assessment saved successfully!");
                 navigate(`/patients/profile/${patientData.id}`);
             } else {